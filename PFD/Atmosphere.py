@@ -0,0 +1,85 @@
+import argparse
+import math
+import time
+import numpy as np
+
+# International Standard Atmosphere up to 65,000 ft, tabulated every 250 ft and linearly interpolated.
+# Every function takes scalars or NumPy arrays (broadcast together) and returns the same shape, so the
+# simulation and batch tools evaluating millions of states share one model. Speeds in knots, altitudes in
+# feet (geopotential), indicated airspeed treated as calibrated airspeed.
+SEA_LEVEL_TEMPERATURE = 288.15  # K
+SEA_LEVEL_PRESSURE = 101325.0  # Pa
+LAPSE_RATE = 0.0065  # K/m up to the tropopause
+TROPOPAUSE = 11000.0  # m
+GAS_CONSTANT = 287.05287  # J/(kg K), dry air
+GRAVITY = 9.80665
+GAMMA = 1.4
+FEET = 0.3048
+KNOT = 1852 / 3600  # m/s
+SEA_LEVEL_SPEED_OF_SOUND = math.sqrt(GAMMA * GAS_CONSTANT * SEA_LEVEL_TEMPERATURE) / KNOT  # 661.5 kt
+TABLE_STEP = 250.0  # ft
+TABLE_CEILING = 65000.0  # ft
+
+def isa_exact(altitude):
+    # Temperature (K) and pressure ratio to sea level, evaluated from the closed-form ISA layers
+    height = np.asarray(altitude, dtype=float) * FEET
+    troposphere = height <= TROPOPAUSE
+    temperature = np.where(troposphere, SEA_LEVEL_TEMPERATURE - LAPSE_RATE * height, SEA_LEVEL_TEMPERATURE - LAPSE_RATE * TROPOPAUSE)
+    exponent = GRAVITY / (LAPSE_RATE * GAS_CONSTANT)
+    tropopause_ratio = (1 - LAPSE_RATE * TROPOPAUSE / SEA_LEVEL_TEMPERATURE) ** exponent
+    pressure_ratio = np.where(troposphere, (temperature / SEA_LEVEL_TEMPERATURE) ** exponent,
+                              tropopause_ratio * np.exp(-GRAVITY * (height - TROPOPAUSE) / (GAS_CONSTANT * temperature)))
+    return temperature, pressure_ratio
+
+TABLE_ALTITUDES = np.arange(0.0, TABLE_CEILING + TABLE_STEP, TABLE_STEP)
+TABLE_TEMPERATURES, TABLE_PRESSURE_RATIOS = isa_exact(TABLE_ALTITUDES)
+TABLE_SPEEDS_OF_SOUND = np.sqrt(GAMMA * GAS_CONSTANT * TABLE_TEMPERATURES) / KNOT
+
+def temperature(altitude):
+    return np.interp(altitude, TABLE_ALTITUDES, TABLE_TEMPERATURES)
+
+def pressure_ratio(altitude):
+    return np.interp(altitude, TABLE_ALTITUDES, TABLE_PRESSURE_RATIOS)
+
+def speed_of_sound(altitude):
+    return np.interp(altitude, TABLE_ALTITUDES, TABLE_SPEEDS_OF_SOUND)
+
+def density(altitude):
+    return pressure_ratio(altitude) * SEA_LEVEL_PRESSURE / (GAS_CONSTANT * temperature(altitude))
+
+def mach_number(indicated_airspeed, altitude):
+    # Subsonic compressible flow: impact pressure from calibrated airspeed, then Mach from the static pressure
+    impact_pressure = (1 + 0.2 * (np.asarray(indicated_airspeed, dtype=float) / SEA_LEVEL_SPEED_OF_SOUND) ** 2) ** 3.5 - 1
+    return np.sqrt(5 * ((impact_pressure / pressure_ratio(altitude) + 1) ** (2 / 7) - 1))
+
+def true_airspeed(indicated_airspeed, altitude):
+    return mach_number(indicated_airspeed, altitude) * speed_of_sound(altitude)
+
+def turn_rate(roll, true_airspeed):
+    # Degrees per second, the model of Simulation.calculate_turn_rate: 1091 tan(roll) / (TAS * load factor),
+    # where the load factor 1 / cos(roll) cancels the cosine of the tangent
+    true_airspeed = np.asarray(true_airspeed, dtype=float)
+    rate = 1091 * np.sin(np.radians(roll)) / np.where(true_airspeed == 0, 1, true_airspeed)
+    return np.where(true_airspeed == 0, 0.0, rate)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ISA air data table and batch throughput')
+    parser.add_argument('--ias', type=float, default=250, help='Indicated airspeed for the table, knots')
+    parser.add_argument('--states', type=int, default=1000000, help='States evaluated in the throughput run')
+    args = parser.parse_args()
+
+    print(f"{'altitude':>8} {'temp K':>7} {'delta':>7} {'TAS kt':>7} {'Mach':>6} {'rate 25°':>9}")
+    for altitude in range(0, 45001, 5000):
+        tas = float(true_airspeed(args.ias, altitude))
+        print(f"{altitude:8d} {float(temperature(altitude)):7.2f} {float(pressure_ratio(altitude)):7.4f} {tas:7.1f} "
+              f"{float(mach_number(args.ias, altitude)):6.3f} {float(turn_rate(25, tas)):7.2f}°/s")
+
+    altitudes = np.random.default_rng(0).uniform(0, 45000, args.states)
+    speeds = np.random.default_rng(1).uniform(100, 350, args.states)
+    rolls = np.random.default_rng(2).uniform(-30, 30, args.states)
+    start = time.perf_counter()
+    rates = turn_rate(rolls, true_airspeed(speeds, altitudes))
+    elapsed = time.perf_counter() - start
+    error = np.abs(pressure_ratio(altitudes) - isa_exact(altitudes)[1]).max()
+    print(f"{args.states} states in {elapsed * 1000:.1f} ms ({args.states / elapsed / 1e6:.1f} M/s), "
+          f"largest pressure ratio interpolation error {error:.1e}")
@@ -1,19 +1,21 @@
-from PyQt5.QtCore import QTimer, QObject
+from PyQt5.QtCore import QObject
 
 class Controller(QObject):
     def __init__(self, flight_control_unit, input_control):
         super().__init__()
         self.flight_control_unit = flight_control_unit
         self.input_control = input_control
+        self.simulation = input_control.simulation
         self.hdg_trk_active = False
         self.heading_printed = False
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_control)
-        self.timer.start(100)  # Check every 100 milliseconds
+        self.simulation.schedule(100, self.update_control)  # Check every 100 milliseconds of simulation time
 
     def update_control(self):
+        metrics = self.flight_control_unit.primary_flight_display.metrics
+        if metrics is not None:
+            metrics.timer_fired('controller')
         hdg_trk_active = self.flight_control_unit.hdg_trk_active
-        current_heading = self.flight_control_unit.current_heading
+        current_heading = self.simulation.heading
         desired_heading = self.flight_control_unit.heading_select
 
         if hdg_trk_active:
@@ -26,6 +28,9 @@ class Controller(QObject):
 
             roll_intensity = self.calculate_roll_intensity(heading_diff)
             self.input_control.set_roll(self.apply_resistance(self.input_control.roll, roll_intensity))
+            latency_probe = self.flight_control_unit.primary_flight_display.latency_probe
+            if latency_probe is not None:
+                latency_probe.consume('knob')  # Heading selections reach the attitude here
         else:
             self.heading_printed = False
 
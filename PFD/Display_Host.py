@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+from PyQt5.QtCore import QTimer
+from Display_Layout import DisplayLayout
+from Display_Lists import DisplayListCache
+from Render_Quality import LEVEL_NAMES
+
+# Several PrimaryFlightDisplay windows in one process (captain, first officer, repeaters) around one simulation.
+# The first display owns the simulation, the keyboard input and the FCU; the others repeat it through a
+# DisplayMirror, and a single host timer repaints them all. Every display draws from one DisplayResources:
+# one DisplayLayout per display size, so fonts, paths and polygons are built once and Qt's glyph cache is
+# warmed once, and one display list cache keyed by size, so displays of the same size replay the same pictures.
+# The FCU's 7-segment digit images are loaded once per process (Flight_Control_Unit.segment_digit).
+LAYOUTS_KEPT = 16  # Distinct sizes kept while windows are being resized
+MIRRORED = ('ap_status', 'alt_hold_active', 'alt_hold_armed', 'hdg_trk_active', 'show_gs_loc_labels', 'appr_active', 'ap1_active',
+            'ap2_active', 'localizer_visible', 'vertical_deviation_visible', 'selected_heading')  # Display attributes set by the FCU
+
+class DisplayResources:
+    def __init__(self, display_lists=True, capacity=32):
+        self.layouts = OrderedDict()  # (width, height, dpi) -> DisplayLayout, oldest first
+        self.display_lists = DisplayListCache(capacity) if display_lists else None
+
+    def layout(self, width, height, dpi):
+        # GUI thread, from resizeEvent
+        key = (width, height, dpi)
+        layout = self.layouts.get(key)
+        if layout is None:
+            layout = self.layouts[key] = DisplayLayout(width, height, dpi)
+            if len(self.layouts) > LAYOUTS_KEPT:
+                self.layouts.popitem(last=False)
+        else:
+            self.layouts.move_to_end(key)
+        return layout
+
+class DisplayMirror:
+    # Input control of a repeater: the flight state, FCU modes and receivers of another display in this process
+    def __init__(self, primary_flight_display, source):
+        self.primary_flight_display = primary_flight_display
+        self.source = source
+
+    @property
+    def state(self):
+        # Read once per frame, like the other state sources
+        display = self.primary_flight_display
+        source = self.source
+        for name in MIRRORED:
+            setattr(display, name, getattr(source, name, None))
+        if source.traffic is not None:
+            display.traffic_advisories = source.traffic.advisories
+        return source.state_source.state
+
+    def handle_key_press(self, event):
+        self.source.input_control.handle_key_press(event)  # Any pilot display flies the shared simulation
+
+    def handle_key_release(self, event):
+        self.source.input_control.handle_key_release(event)
+
+    def close(self):
+        pass  # The source display owns the simulation
+
+class DisplayHost:
+    def __init__(self, sizes, backend='widget', period_ms=30, **options):
+        from Primary_Flight_Display import PrimaryFlightDisplay  # Import here to avoid circular dependency
+        self.resources = DisplayResources(capacity=32 * len(set(sizes)))  # Room for each size's pictures
+        self.displays = []
+        for width, height in sizes:
+            if not self.displays:
+                display = PrimaryFlightDisplay(backend=backend, resources=self.resources, frame_timer=False, **options)
+            else:
+                display = PrimaryFlightDisplay(backend=backend, resources=self.resources, frame_timer=False, mirror=self.displays[0],
+                                               quality=options.get('quality', 'standard'),  # Each display steps its own level
+                                               best_quality=options.get('best_quality', 'standard'))
+                display.setWindowTitle(f"PFD {len(self.displays) + 1}")
+            display.resize(width, height)
+            self.displays.append(display)
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update)
+        self.timer.start(period_ms)
+
+    def update(self):
+        for display in self.displays:
+            display.update_horizon()
+
+    def close(self):
+        self.timer.stop()
+        for display in reversed(self.displays):
+            display.close()
+
+def display_sizes(count):
+    # Captain and first officer at the design size, repeaters at 480x480
+    return ([(820, 820)] * 2 + [(480, 480)] * max(count - 2, 0))[:count]
+
+def parse_size(text):
+    width, _, height = text.partition('x')
+    return int(width), int(height or width)
+
+def measure(count, separate, duration, backend):
+    # Child process of benchmark(): open the displays, let them run, print RSS and CPU as JSON
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from Metrics_Exporter import resident_memory
+    app = QApplication(sys.argv[:1])
+    baseline = resident_memory()
+    if separate:
+        # What running the displays side by side costs today: a simulation, an FCU, a timer and caches each
+        from Primary_Flight_Display import PrimaryFlightDisplay
+        displays = []
+        for width, height in display_sizes(count):
+            display = PrimaryFlightDisplay(backend=backend)
+            display.resize(width, height)
+            displays.append(display)
+        close = lambda: [display.close() for display in displays]
+    else:
+        host = DisplayHost(display_sizes(count), backend=backend)
+        close = host.close
+    end = time.monotonic() + 1.0  # Warm up: layouts, display lists and glyphs
+    while time.monotonic() < end:
+        app.processEvents()
+        time.sleep(0.002)
+    start_cpu, start = time.process_time(), time.monotonic()
+    while time.monotonic() < start + duration:
+        app.processEvents()
+        time.sleep(0.002)
+    cpu = (time.process_time() - start_cpu) / (time.monotonic() - start)
+    rss = resident_memory()
+    close()
+    print(json.dumps({'baseline': baseline, 'rss': rss, 'cpu': cpu}))
+
+def benchmark(counts, duration, backend):
+    # Each configuration in a fresh process so resident memory is not shared between runs
+    print(f"{backend} backend, {duration:.0f} s per run, sizes {', '.join(f'{w}x{h}' for w, h in display_sizes(max(counts)))}")
+    print(f"{'displays':>8} {'mode':>9} {'RSS MB':>8} {'added MB':>9} {'per display':>12} {'CPU %':>7}")
+    for count in counts:
+        for separate in (True, False):
+            command = [sys.executable, os.path.abspath(__file__), '--measure', str(count), '--duration', str(duration), '--backend', backend]
+            if separate:
+                command.append('--separate')
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            added = (result['rss'] - result['baseline']) / 2**20
+            print(f"{count:8d} {'separate' if separate else 'shared':>9} {result['rss'] / 2**20:8.1f} {added:9.1f} "
+                  f"{added / count:9.1f} MB {result['cpu'] * 100:6.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Several PFDs on one simulation in one process')
+    parser.add_argument('--sizes', type=parse_size, nargs='+', default=display_sizes(3), metavar='WxH',
+                        help='One display per size, the first owns the simulation and FCU (default: 820x820 820x820 480x480)')
+    parser.add_argument('--backend', choices=['widget', 'scene'], default='widget')
+    parser.add_argument('--approach', metavar='AIRPORT/RUNWAY', help='Start on an 8 NM final to this runway of the bundled sample, e.g. EGLL/27R')
+    parser.add_argument('--quality', choices=['auto'] + LEVEL_NAMES, default='auto', help='Render quality level of every display (default: auto)')
+    parser.add_argument('--best-quality', choices=LEVEL_NAMES, default='standard', help='Auto quality: highest level to step up to (default: standard)')
+    parser.add_argument('--benchmark', type=int, nargs='*', metavar='COUNT',
+                        help='Report RSS and CPU with this many displays, shared and separate (default: 1 2 4 8)')
+    parser.add_argument('--duration', type=float, default=5, help='Benchmark: seconds measured per run')
+    parser.add_argument('--measure', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--separate', action='store_true', help=argparse.SUPPRESS)
+    args, qt_args = parser.parse_known_args()
+    if args.measure is not None:
+        measure(args.measure, args.separate, args.duration, args.backend)
+    elif args.benchmark is not None:
+        benchmark(args.benchmark or [1, 2, 4, 8], args.duration, args.backend)
+    else:
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication(sys.argv[:1] + qt_args)
+        nav_data = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Navigation', 'Runways.csv')
+        host = DisplayHost(args.sizes, backend=args.backend, nav_data=nav_data, approach=args.approach, quality=args.quality,
+                           best_quality=args.best_quality)
+        app.lastWindowClosed.connect(app.quit)
+        sys.exit(app.exec_())
@@ -0,0 +1,203 @@
+import math
+from PyQt5.QtCore import QLine, QPoint, QRect, QRectF
+from PyQt5.QtGui import QFont, QPainterPath, QPolygon, QTransform
+
+# Geometry of every instrument for one display size. PrimaryFlightDisplay.resizeEvent builds it once and every
+# painter (widget, scene and layer backends) reads it, so drawing a frame does no layout arithmetic.
+# The instruments were designed at 820x820 pixels on a 96 dpi screen: lengths scale with the shorter side of the
+# display around its centre, and font point sizes also cancel the screen's logical DPI so text keeps its size
+# relative to the instruments. At the design size and DPI every length is the original pixel constant.
+DESIGN_SIZE = 820
+DESIGN_DPI = 96
+
+class DisplayLayout:
+    def __init__(self, width, height, dpi=DESIGN_DPI):
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.scale = min(width, height) / DESIGN_SIZE
+        self.font_scale = self.scale * DESIGN_DPI / dpi
+        self.center = QRect(0, 0, width, height).center()  # As rect().center(): left of and above the middle for even sizes
+        self.middle_x = width // 2
+        self.middle_y = height // 2
+        self.lay_out_annunciator()
+        self.lay_out_qnh()
+        self.lay_out_deviation_scales()
+        self.lay_out_heading_tape()
+        self.lay_out_attitude()
+        self.lay_out_bank_scale()
+        self.lay_out_airspeed_tape()
+
+    def length(self, pixels):
+        # A design length in whole pixels
+        return round(pixels * self.scale)
+
+    def margin(self, pixels):
+        # Bounds margin for pen widths and text, for QRectF.adjusted
+        pixels = max(pixels, self.length(pixels))
+        return -pixels, -pixels, pixels, pixels
+
+    def pen(self, width):
+        return width * self.scale
+
+    def font(self, points, family=None):
+        font = QFont(family) if family else QFont()
+        font.setPointSizeF(points * self.font_scale)
+        return font
+
+    def lay_out_annunciator(self):
+        # Five columns across the top of the attitude sphere
+        length = self.length
+        width, height = length(850), length(76)
+        x = self.middle_x - width // 2
+        y = self.center.y() - length(324) - height
+        column_width = width // 5
+        self.annunciator_columns = [QRect(x + i * column_width, y, column_width, height) for i in range(5)]
+        self.annunciator_separators = [QLine(x + i * column_width - length(2) // 2, y, x + i * column_width - length(2) // 2, y + height)
+                                       for i in range(1, 5)]
+        self.annunciator_line = length(20)  # Between the lines of a column
+        self.annunciator_font = self.font(12, "Helvetica")
+        self.annunciator_bounds = QRectF(x, y, width, height).adjusted(*self.margin(2))
+
+    def lay_out_qnh(self):
+        # Right of the heading tape
+        length = self.length
+        self.qnh_rect = QRect(self.middle_x + length(270), self.center.y() + length(294), length(100), length(30))
+        self.qnh_label = QPoint(self.qnh_rect.x() + length(5), self.qnh_rect.y() + length(20))
+        self.qnh_digits = QPoint(self.qnh_rect.x() + length(64), self.qnh_rect.y() + length(20))
+        self.qnh_font = self.font(14, "Arial")
+        self.qnh_bounds = QRectF(self.qnh_rect.x(), self.qnh_rect.y(), length(140), self.qnh_rect.height()).adjusted(*self.margin(2))  # Digits run past the box
+
+    def lay_out_deviation_scales(self):
+        # Localizer below the sphere, glideslope to its right: two dots either side of a yellow centre bar
+        length = self.length
+        self.deviation_dot_radius = length(6)
+        bar_length, bar_width, spacing = length(38), length(4), length(70)
+        first_dot = bar_width // 2 + spacing + 2 * self.deviation_dot_radius  # Centre to the inner dot
+        second_dot = first_dot + spacing + 2 * self.deviation_dot_radius
+
+        self.localizer_rect = QRect(self.middle_x - length(380) // 2, self.center.y() + length(232) + length(20), length(380), length(70))
+        center = QPoint(self.localizer_rect.x() + self.localizer_rect.width() // 2, self.localizer_rect.y() + self.localizer_rect.height() // 2)
+        self.localizer_center = center
+        self.localizer_dots = [QPoint(center.x() - first_dot, center.y()), QPoint(center.x() - second_dot, center.y()),
+                               QPoint(center.x() + first_dot, center.y()), QPoint(center.x() + second_dot, center.y())]
+        self.localizer_bar = QRect(center.x() - bar_width // 2, center.y() - bar_length // 2, bar_width, bar_length)
+        self.localizer_bounds = QRectF(self.localizer_rect).adjusted(*self.margin(4))
+
+        self.glideslope_rect = QRect(self.center.x() + length(218), self.middle_y - length(380) // 2, length(70), length(380))
+        center = QPoint(self.glideslope_rect.x() + self.glideslope_rect.width() // 2, self.glideslope_rect.y() + self.glideslope_rect.height() // 2)
+        self.glideslope_center = center
+        self.glideslope_dots = [QPoint(center.x(), center.y() - first_dot), QPoint(center.x(), center.y() - second_dot),
+                                QPoint(center.x(), center.y() + first_dot), QPoint(center.x(), center.y() + second_dot)]
+        self.glideslope_bar = QRect(center.x() - bar_length // 2, center.y() - bar_width // 2, bar_length, bar_width)
+        self.glideslope_bounds = QRectF(self.glideslope_rect).adjusted(*self.margin(4))
+
+        self.deviation_dot_spacing = length(83)  # Diamond travel per dot; the scale dots are 84 and 166 pixels out
+        self.deviation_diamond = (length(14), length(9))  # Half length and half width
+
+    def lay_out_heading_tape(self):
+        length = self.length
+        self.heading_rect = QRect(self.middle_x - length(410) // 2, self.center.y() + length(240) + length(100), length(410), length(50))
+        x, y, width, height = self.heading_rect.x(), self.heading_rect.y(), self.heading_rect.width(), self.heading_rect.height()
+        self.heading_clip = QPainterPath()
+        self.heading_clip.addRect(x, y, width, height)
+        self.heading_marker = QRect(x + width // 2 - length(4) // 2, y - length(30) // 2, length(4), length(30))
+        self.heading_tick_spacing = max(length(76), 2)  # Pixels per degree, shared with the horizon ticks
+        self.heading_major_tick = length(20)
+        self.heading_minor_tick = length(10)
+        self.heading_digit_width = 5 * self.scale  # Half the width of a digit, to centre the numbers
+        self.heading_baseline = y + length(47)
+        self.heading_font = self.font(14, "Arial")
+        self.heading_bug = QRect(x + width - length(30), y + (height - length(30)) // 2 + length(5), length(50), length(30))
+        self.heading_bug_font = self.font(16, "Arial")
+        self.heading_bounds = QRectF(x, y - length(16), width + length(30), height + length(28)).adjusted(*self.margin(2))
+
+    def lay_out_attitude(self):
+        length = self.length
+        center_x, center_y = self.center.x(), self.center.y()
+        radius = self.circle_radius = length(250)
+        self.circle_path = QPainterPath()
+        self.circle_path.addEllipse(self.center, radius, radius)
+        self.sphere_bounds = QRectF(center_x - radius, center_y - radius, 2 * radius, 2 * radius).adjusted(*self.margin(4))
+        # Sky and ground only ever move vertically, so their layers are as wide as the sphere and tall enough for +-50 degrees of pitch
+        self.gradient_bounds = QRectF(center_x - radius, center_y - 3 * radius, 2 * radius, 6 * radius).adjusted(*self.margin(4))
+        self.horizon_tick = length(12)
+        _, top, _, bottom = self.margin(2)
+        self.horizon_line_bounds = QRectF(center_x - 2 * radius, center_y, 4 * radius, self.horizon_tick).adjusted(0, top, 0, bottom)
+
+        self.side_masks = [QRectF(center_x - radius - length(68), center_y - radius, length(100), 2 * radius),
+                           QRectF(center_x + radius - length(32), center_y - radius, length(100), 2 * radius)]
+
+        # The aircraft symbol: two L-shaped wings and a centre square
+        wing = [(208, -8), (124, -8), (124, -8), (114, -8), (114, 34), (130, 34), (130, 8), (208, 8)]
+        self.aircraft_wings = [QPolygon([QPoint(center_x + side * length(x), center_y + length(y)) for x, y in wing]) for side in (-1, 1)]
+        square = length(16)
+        self.aircraft_square = QRect(center_x - square // 2, center_y - square // 2, square, square)
+
+        # Pitch ladder, 10 pixels per degree at the design size like the sky and ground (sphere diameter / 50)
+        self.pitch_scale = 10 * self.scale
+        self.pitch_fade_start = radius * 0.56  # Lines start fading at 56% of the radius
+        self.pitch_limit = length(186)  # Above and below the centre
+        self.pitch_edge_fade = length(20)
+        self.pitch_line = 64 * self.scale  # Half length of a 10 degree line
+        self.pitch_labels = (length(118), length(78), length(10))  # Left and right of the centre, below the line
+        self.pitch_font = self.font(18)
+
+        # Roll pointer, drawn rotated by the roll around the centre, and the fixed reference lines
+        top = center_y - radius
+        self.roll_trapezoid = QPolygon([QPoint(center_x - length(22), top + length(38)), QPoint(center_x + length(22), top + length(38)),
+                                        QPoint(center_x + length(30), top + length(50)), QPoint(center_x - length(30), top + length(50))])
+        self.roll_triangle = QPolygon([QPoint(center_x, top + length(6)), QPoint(center_x - length(18), top + length(32)),
+                                       QPoint(center_x + length(18), top + length(32))])
+        self.reference_lines = (QLine(center_x - length(200), center_y - length(188), center_x + length(200), center_y - length(188)),
+                                QLine(center_x - length(176), center_y + length(188), center_x + length(176), center_y + length(188)))
+
+    def lay_out_bank_scale(self):
+        # Arc from -30 to +30 degrees of bank with a tick rectangle every 10 degrees and a triangle at zero
+        center_x, center_y = self.center.x(), self.center.y()
+        radius = self.circle_radius
+        self.bank_arc = QRectF(center_x - radius, center_y - radius, 2 * radius, 2 * radius)
+        tick_radius = 268 * self.scale
+        tick_length = 18 * self.scale
+        self.bank_ticks = []  # (rect, transform turning it to its angle)
+        for angle in range(-30, 31, 10):
+            tick_angle = math.radians(angle - 90)
+            x1 = center_x + tick_radius * math.cos(tick_angle)
+            y1 = center_y + tick_radius * math.sin(tick_angle)
+            x2 = center_x + (tick_radius - tick_length) * math.cos(tick_angle)
+            y2 = center_y + (tick_radius - tick_length) * math.sin(tick_angle)
+            if angle == 0:
+                self.bank_triangle = QPolygon([QPoint(int((x1 + x2) / 2), int(y2)),
+                                               QPoint(int((x1 + x2) / 2 - 16 * self.scale), int(y1 - 4 * self.scale)),
+                                               QPoint(int((x1 + x2) / 2 + 16 * self.scale), int(y1 - 4 * self.scale))])
+                continue
+            rect_width = 12 * self.scale
+            if angle in (-30, 30):
+                rect_height = abs(y1 - y2) + 8 * self.scale  # The outer ticks are longer and sit a little higher
+                y1, y2 = y1 - 5 * self.scale, y2 - 5 * self.scale
+            else:
+                rect_height = abs(y1 - y2)
+            rect_center_x = (x1 + x2) / 2
+            rect_center_y = (y1 + y2) / 2
+            rect = QRectF(rect_center_x - rect_width / 2, rect_center_y - rect_height / 2, rect_width, rect_height)
+            transform = QTransform()
+            transform.translate(rect_center_x, rect_center_y)
+            transform.rotate(angle)
+            transform.translate(-rect_center_x, -rect_center_y)
+            self.bank_ticks.append((rect, transform))
+        length = self.length
+        self.bank_scale_bounds = QRectF(center_x - length(165), center_y - length(285), length(330), length(90))
+        self.bank_bounds = self.bank_scale_bounds.united(self.sphere_bounds)  # The roll pointer sits inside the sphere
+
+    def lay_out_airspeed_tape(self):
+        # Left of the sphere; drawAirspeedIndicator is not part of the display yet
+        length = self.length
+        height = length(460)
+        self.airspeed_rect = QRect(self.center.x() - length(320) - length(42), self.middle_y - height // 2, length(78), height)
+        self.airspeed_clip = QPainterPath()
+        self.airspeed_clip.addRect(QRectF(self.airspeed_rect))
+        self.airspeed_extension = length(20)  # Top and bottom lines past the tape, and the tick length
+        self.airspeed_pointer = (length(20), length(15))  # Width and height of the speed triangle
+        self.airspeed_tick_spacing = max(length(60), 1)  # Pixels per 10 knots
+        self.airspeed_digits = QPoint(length(6), length(5))  # Number offset from the tape's left edge and the tick
+        self.airspeed_font = self.font(14, "Arial")
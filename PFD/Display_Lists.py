@@ -0,0 +1,36 @@
+import threading
+from collections import OrderedDict
+from PyQt5.QtGui import QPainter, QPicture
+
+class DisplayListCache:
+    # Recorded QPainter commands (QPicture) per instrument and state key, least recently used dropped first.
+    # Replaying a picture skips the Python layout code but still rasterizes, so it stays sharp at any scale.
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.pictures = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Layers drawn on the thread pool share the cache
+
+    def draw(self, painter, key, record):
+        with self.lock:
+            picture = self.pictures.get(key)
+            if picture is None:
+                self.misses += 1
+                picture = QPicture()
+                recorder = QPainter(picture)
+                record(recorder)
+                recorder.end()
+                self.pictures[key] = picture
+                if len(self.pictures) > self.capacity:
+                    self.pictures.popitem(last=False)
+            else:
+                self.hits += 1
+                self.pictures.move_to_end(key)
+        painter.drawPicture(0, 0, picture)  # Replayed outside the lock, a recorded picture is only read
+
+    def clear(self):
+        self.pictures.clear()
+
+    def statistics(self):
+        return {'entries': len(self.pictures), 'hits': self.hits, 'misses': self.misses}
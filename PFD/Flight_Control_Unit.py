@@ -1,11 +1,21 @@
 from math import atan2
 import os
 from PyQt5.QtWidgets import QApplication, QHBoxLayout, QPushButton, QVBoxLayout, QWidget, QLabel
-from PyQt5.QtGui import QBrush, QColor, QMouseEvent, QPainter, QPixmap
-from PyQt5.QtCore import QElapsedTimer, QPointF, Qt, pyqtSignal
-from Primary_Flight_Display import PrimaryFlightDisplay, QPen, QPoint, QPolygon, QRect, QTimer, QTransform  # Adjust path if needed
+from PyQt5.QtGui import QBrush, QColor, QMouseEvent, QPainter, QPixmap, QTransform
+from PyQt5.QtCore import QElapsedTimer, QPointF, QRect, Qt, pyqtSignal
+from Primary_Flight_Display import PrimaryFlightDisplay, QPen, QPoint, QPolygon, QTimer  # Adjust path if needed
 from Controller import Controller
 from Input_Control import InputControl
+from Telemetry import decode_modes
+
+SEGMENT_DIGITS = {}  # Scaled 7-segment digit images by name, loaded once per process and shared by every FCU
+
+def segment_digit(name):
+    pixmap = SEGMENT_DIGITS.get(name)
+    if pixmap is None:
+        pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "7 segment digits", f"{name}.png"))
+        pixmap = SEGMENT_DIGITS[name] = pixmap.scaled(20, 30, Qt.KeepAspectRatio, Qt.SmoothTransformation)  # Scale the images
+    return pixmap
 
 class ClickableLabel(QLabel):
     clicked = pyqtSignal()
@@ -63,10 +73,17 @@ class FlightControlUnit(QWidget):
         self.athr_active = False
         self.athr_armed = False
         self.knob_angle = 0
+        self.heading_managed = False
         self.current_heading = 0  # Add for current heading
         self.primary_flight_display = primary_flight_display
-        self.input_control = InputControl(self.primary_flight_display)
-        self.controller = Controller(self, self.input_control)  # Initialize the controller
+        if primary_flight_display.simulation is not None:
+            self.input_control = InputControl(self.primary_flight_display)
+            self.controller = Controller(self, self.input_control)  # Initialize the controller
+            primary_flight_display.simulation.set_air_data(self.speed_digits, self.altitude_select)  # TAS for the turn rate
+        else:
+            # Lamps and selections are driven from elsewhere (e.g. a replay); there is nothing to control
+            self.input_control = None
+            self.controller = None
         self.initUI()
         self.start_heading_update_timer()
 
@@ -147,7 +164,7 @@ class FlightControlUnit(QWidget):
             background-color: #7D786D;
             border-radius: {hdg_trk_knob_radius}px;
         """)
-        self.hdg_trk_knob.clicked.connect(self.toggle_hdg_trk)  # Connect the button to the function
+        self.hdg_trk_knob.clicked.connect(lambda: self.press_button(self.toggle_hdg_trk))  # Connect the button to the function
         
         # Ensure button is on top layer and is visible
         self.hdg_trk_knob.raise_()
@@ -224,9 +241,7 @@ class FlightControlUnit(QWidget):
             digit_layout.setContentsMargins(0, 0, 0, 0)
             for digit in str(value).zfill(num_digits):  # Ensure there are num_digits digits, pad with zeros if necessary
                 digit_label = QLabel(container)
-                digit_pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "7 segment digits", f"{digit}.png"))
-                digit_pixmap = digit_pixmap.scaled(20, 30, Qt.KeepAspectRatio, Qt.SmoothTransformation)  # Scale the images
-                digit_label.setPixmap(digit_pixmap)
+                digit_label.setPixmap(segment_digit(digit))
                 digit_layout.addWidget(digit_label)
             container.layout().addWidget(digit_container)
 
@@ -269,12 +284,30 @@ class FlightControlUnit(QWidget):
 
         return container
 
+    def record_input(self, action, *args):
+        simulation = self.primary_flight_display.simulation
+        if simulation is not None:
+            simulation.record_input('fcu', action, *args)
+
+    def press_button(self, toggle_function):
+        # Pilot clicks come through here so they can be captured and replayed
+        self.record_input(toggle_function.__name__)
+        toggle_function()
+
     def update_heading(self, heading_value, managed_mode=False):  # Added managed_mode parameter
+        if (heading_value, managed_mode) != (self.heading_select, self.heading_managed):
+            self.record_input('update_heading', heading_value, managed_mode)
         self.heading_select = heading_value
+        self.heading_managed = managed_mode
         self.add_segment_digits(self.hdg_layout, self.heading_select, managed_mode)
         self.mode_control_panel.update()
 
     def update_speed_mach(self, new_speed):
+        if new_speed != self.speed_digits:
+            self.record_input('update_speed_mach', new_speed)
+            simulation = self.primary_flight_display.simulation
+            if simulation is not None:
+                simulation.post(lambda: simulation.set_air_data(new_speed, simulation.altitude))
         self.speed_digits = new_speed
         self.spd_layout.setContentsMargins(0, 0, 0, 0)
         self.add_segment_digits(self.spd_layout, self.speed_digits)
@@ -284,8 +317,7 @@ class FlightControlUnit(QWidget):
         for i in reversed(range(layout.count())):
             layout.itemAt(i).widget().deleteLater()
         if managed_mode:
-            digit_pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "7 segment digits", "managed.png"))
-            digit_pixmap_resized = digit_pixmap.scaled(20, 30, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            digit_pixmap_resized = segment_digit("managed")
             for _ in range(3):  # Assuming 3 digits for heading
                 digit_label = QLabel()
                 digit_label.setPixmap(digit_pixmap_resized)
@@ -305,9 +337,7 @@ class FlightControlUnit(QWidget):
         else:
             for digit in str(value).zfill(3):
                 digit_label = QLabel()
-                digit_pixmap = QPixmap(os.path.join(os.path.dirname(__file__), "7 segment digits", f"{digit}.png"))
-                digit_pixmap_resized = digit_pixmap.scaled(20, 30, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                digit_label.setPixmap(digit_pixmap_resized)
+                digit_label.setPixmap(segment_digit(digit))
                 layout.addWidget(digit_label)
 
     def create_mode_control_panel(self):
@@ -395,7 +425,7 @@ class FlightControlUnit(QWidget):
         button.setGeometry(0, 20, 80, 60)
         button.setStyleSheet("background-color: #212121; color: white; font-size: 16px; text-align: center;")
         button.setAlignment(Qt.AlignCenter)
-        button.clicked.connect(toggle_function)
+        button.clicked.connect(lambda: self.press_button(toggle_function))
         if text == 'ALT\nHOLD':
             self.alt_button = button
         elif text == 'LOC':
@@ -410,6 +440,26 @@ class FlightControlUnit(QWidget):
             self.athr_button = button
         return container
 
+    def show_modes(self, flags):
+        # Set every mode and lamp from recorded mode flags, with the colours the toggles use
+        for name, active in decode_modes(flags).items():
+            setattr(self, name, active)
+        autopilot_engaged = self.ap1_active or self.ap2_active
+        engaged_color = "#5EFF33" if autopilot_engaged else "orange"  # Green when active, orange when only armed
+        self.alt_container.findChild(IndicatorLabel).set_active(self.alt_hold_active or self.alt_hold_armed, color="#5EFF33" if self.alt_hold_active else "orange")
+        self.ap1_container.findChild(IndicatorLabel).set_active(self.ap1_active, color="#5EFF33")
+        self.ap2_container.findChild(IndicatorLabel).set_active(self.ap2_active, color="#5EFF33")
+        self.athr_container.findChild(IndicatorLabel).set_active(self.athr_armed, color="orange")
+        self.loc_container.findChild(IndicatorLabel).set_active(self.loc_active or self.appr_active, color=engaged_color)
+        self.appr_container.findChild(IndicatorLabel).set_active(self.appr_active, color=engaged_color)
+
+    def show_selections(self, heading_select, speed_digits):
+        # Only rebuild the digit widgets when a recorded selection actually changes
+        if heading_select != self.heading_select:
+            self.update_heading(heading_select)
+        if speed_digits != self.speed_digits:
+            self.update_speed_mach(speed_digits)
+
     def toggle_hdg_trk(self):
         print("HDG TRK button pressed")  # Debug statement
         self.hdg_trk_active = not self.hdg_trk_active
@@ -599,6 +649,11 @@ class HeadingSelectKnob(QWidget):
             self.total_rotation += angle_diff / 10  # One degree heading change for every ten degrees of knob rotation
             heading_change = int(self.total_rotation)
             if heading_change != 0:
+                if self.parent().primary_flight_display.metrics is not None:
+                    self.parent().primary_flight_display.metrics.input_event('knob')
+                latency_probe = self.parent().primary_flight_display.latency_probe
+                if latency_probe is not None:
+                    latency_probe.input('knob')
                 self.managed_mode = False  # Deactivate managed mode on rotation
                 new_heading = (self.parent().heading_select + heading_change) % 360
                 self.parent().update_heading(new_heading, self.managed_mode)  # Pass managed mode to update_heading
@@ -0,0 +1,133 @@
+import argparse
+import operator
+import re
+import time
+import numpy as np
+from Flight_Replay import FlightRecording
+from Telemetry import MODE_FLAGS
+
+# Query language, one query per expression:
+#   roll > 25, pitch <= -5     samples where an attitude value passes a threshold
+#   |roll| > 25                the same on the absolute value
+#   ap1 disengage, appr engage the moments a mode flag switches off or on
+#   hdg_trk on > 60            episodes where a mode flag stays on longer than 60 s ("on" alone lists all)
+# Keywords and mode names are case-insensitive: 'AP1 disengage' is 'ap1 disengage'.
+# Results are (start, end) simulation times, which FlightReplay.seek can jump to.
+
+COMPARISONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+MODE_BITS = dict(MODE_FLAGS)
+THRESHOLD_QUERY = re.compile(r'^\s*(\|?)\s*(pitch|roll)\s*\1\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d*)?)\s*$', re.IGNORECASE)
+TRANSITION_QUERY = re.compile(r'^\s*(\w+)\s+(engage|disengage)\s*$', re.IGNORECASE)
+EPISODE_QUERY = re.compile(r'^\s*(\w+)\s+on(?:\s*>\s*(\d+(?:\.\d*)?)\s*s?)?\s*$', re.IGNORECASE)
+
+def candidate_chunks(recording, field, op, value, absolute=False):
+    # Zone maps: keep only chunks whose min/max range can contain a matching sample
+    low = recording.index['min_' + field]
+    high = recording.index['max_' + field]
+    if absolute and op in ('>', '>='):
+        keep = (high >= value) | (low <= -value)
+    elif absolute:
+        keep = ~((low >= value) | (high <= -value))  # Skip chunks where every |value| is certainly too large
+    elif op in ('>', '>='):
+        keep = high >= value
+    else:
+        keep = low <= value
+    return np.nonzero(keep)[0]
+
+def threshold_intervals(recording, field, op, value, absolute=False):
+    compare = COMPARISONS[op]
+    ranges = []
+    previous_chunk = None
+    run_to_end = False  # Whether the last range reached the end of its chunk
+    for chunk_index in candidate_chunks(recording, field, op, value, absolute):
+        records = recording.chunk(chunk_index)
+        values = np.abs(records[field]) if absolute else records[field]
+        mask = compare(values, value)
+        edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+        starts = np.nonzero(edges == 1)[0]
+        ends = np.nonzero(edges == -1)[0] - 1
+        times = records['time']
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if start == 0 and run_to_end and previous_chunk == chunk_index - 1:
+                ranges[-1] = (ranges[-1][0], float(times[end]))  # Continues a range from the previous chunk
+            else:
+                ranges.append((float(times[start]), float(times[end])))
+        previous_chunk = chunk_index
+        run_to_end = bool(mask[-1])
+    return ranges
+
+def mode_bit(name):
+    for candidate in (name, name + '_active'):
+        if candidate in MODE_BITS:
+            return MODE_BITS[candidate]
+    raise ValueError(f"Unknown mode '{name}', expected one of: {', '.join(MODE_BITS)}")
+
+def mode_transitions(recording, name, engaged):
+    # Mode changes come from the event index written at record time; no samples are read
+    bit = mode_bit(name)
+    events = recording.mode_events()
+    was_on = (events['previous_flags'] & bit) != 0
+    is_on = (events['flags'] & bit) != 0
+    times = events['time'][(was_on != is_on) & (is_on == engaged)]
+    return [(t, t) for t in times.tolist()]
+
+def mode_episodes(recording, name, min_duration=0):
+    bit = mode_bit(name)
+    events = recording.mode_events()
+    was_on = (events['previous_flags'] & bit) != 0
+    is_on = (events['flags'] & bit) != 0
+    changes = events[was_on != is_on]
+    episodes = []
+    start = recording.start_time if recording.initial_flags & bit else None
+    for t, flags in zip(changes['time'].tolist(), changes['flags'].tolist()):
+        if flags & bit:
+            start = t
+        elif start is not None:
+            episodes.append((start, t))
+            start = None
+    if start is not None:
+        episodes.append((start, recording.end_time))  # Still on when the recording ended
+    return [(t0, t1) for t0, t1 in episodes if t1 - t0 > min_duration]
+
+def parse_query(text):
+    match = THRESHOLD_QUERY.match(text)
+    if match:
+        absolute, field, op, value = match.groups()
+        field = field.lower()
+        return lambda recording: threshold_intervals(recording, field, op, float(value), bool(absolute))
+    match = TRANSITION_QUERY.match(text)
+    if match:
+        name, change = match.groups()
+        name = name.lower()
+        mode_bit(name)
+        return lambda recording: mode_transitions(recording, name, change.lower() == 'engage')
+    match = EPISODE_QUERY.match(text)
+    if match:
+        name, duration = match.groups()
+        name = name.lower()
+        mode_bit(name)
+        return lambda recording: mode_episodes(recording, name, float(duration or 0))
+    raise ValueError(f"Cannot parse query '{text}'")
+
+def main():
+    parser = argparse.ArgumentParser(description='Find time ranges in flight recordings')
+    parser.add_argument('query', help="e.g. '|roll| > 25', 'ap1 disengage', 'hdg_trk on > 60'")
+    parser.add_argument('recordings', nargs='+')
+    args = parser.parse_args()
+
+    query = parse_query(args.query)
+    total_start = time.perf_counter()
+    for path in args.recordings:
+        start = time.perf_counter()
+        recording = FlightRecording(path)
+        ranges = query(recording)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {len(ranges)} matches in {elapsed * 1000:.1f} ms "
+              f"({recording.sample_count} samples, {len(recording.index)} chunks)")
+        for t0, t1 in ranges:
+            print(f"  {t0:10.2f} - {t1:10.2f} s  ({t1 - t0:.2f} s)")
+        recording.close()
+    print(f"Total {time.perf_counter() - total_start:.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import queue
+import struct
+import threading
+import time
+import numpy as np
+from Telemetry import STATE_RECORD, encode_modes
+
+# Flight recording file, little-endian, append-only:
+#
+#   file header, 64 bytes
+#   0       8     char[8]  magic b'PFDFDR01'
+#   8       4     uint32   format version, currently 2
+#   12      4     uint32   record size in bytes (STATE_RECORD.size)
+#   16      4     uint32   records per full chunk
+#   20      4     uint32   simulation tick in milliseconds
+#   24      8     float64  wall clock time at the start of the recording (Unix seconds)
+#   32      32             reserved
+#
+#   chunks, repeated
+#   0       4     char[4]  magic b'CHNK'
+#   4       48    summary  CHUNK_SUMMARY: record count, first/last tick, first/last simulation time,
+#                          min/max pitch, min/max roll (zone maps), OR and AND of the mode flags
+#   52      ...   records  count * STATE_RECORD
+#
+#   chunk index, written when the recording is closed
+#   n * (uint64 chunk offset + CHUNK_SUMMARY)
+#   mode transition events: n * (uint32 tick, float64 time, uint16 previous flags, uint16 flags)
+#   trailer: uint64 index offset, uint32 chunk count, uint64 event offset, uint32 event count, char[8] magic b'PFDINDEX'
+#
+# A recording cut short by a crash has no index; readers rebuild it by walking the chunk headers.
+FILE_MAGIC = b'PFDFDR01'
+FILE_VERSION = 2
+FILE_HEADER = struct.Struct('<8sIIIId32x')
+CHUNK_MAGIC = b'CHNK'
+CHUNK_SUMMARY = struct.Struct('<IIIddffffHH')
+CHUNK_HEADER = struct.Struct('<4s' + CHUNK_SUMMARY.format[1:])
+INDEX_ENTRY = struct.Struct('<Q' + CHUNK_SUMMARY.format[1:])
+INDEX_MAGIC = b'PFDINDEX'
+TRAILER = struct.Struct('<QIQI8s')
+
+# NumPy view of STATE_RECORD, byte for byte
+RECORD_DTYPE = np.dtype({
+    'names': ['tick', 'time', 'pitch', 'roll', 'heading', 'heading_select', 'speed_digits',
+              'altitude_select', 'vertical_speed_digits', 'mode_flags'],
+    'formats': ['<u4', '<f8', '<f4', '<f4', '<f4', '<u2', '<u2', '<i4', '<i4', '<u2'],
+    'offsets': [0, 4, 12, 16, 20, 24, 26, 28, 32, 36],
+    'itemsize': STATE_RECORD.size,
+})
+
+# NumPy views of INDEX_ENTRY and of a mode transition event (packed, like the structs)
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('count', '<u4'), ('first_tick', '<u4'), ('last_tick', '<u4'),
+                        ('first_time', '<f8'), ('last_time', '<f8'), ('min_pitch', '<f4'), ('max_pitch', '<f4'),
+                        ('min_roll', '<f4'), ('max_roll', '<f4'), ('flags_any', '<u2'), ('flags_all', '<u2')])
+EVENT_DTYPE = np.dtype([('tick', '<u4'), ('time', '<f8'), ('previous_flags', '<u2'), ('flags', '<u2')])
+
+def summarize_chunk(records, previous_flags=None):
+    # Zone maps and mode transitions of one chunk; previous_flags are the last flags of the chunk before it
+    flags = records['mode_flags']
+    summary = (len(records), int(records['tick'][0]), int(records['tick'][-1]),
+               float(records['time'][0]), float(records['time'][-1]),
+               float(records['pitch'].min()), float(records['pitch'].max()),
+               float(records['roll'].min()), float(records['roll'].max()),
+               int(np.bitwise_or.reduce(flags)), int(np.bitwise_and.reduce(flags)))
+    previous = np.empty_like(flags)
+    previous[0] = flags[0] if previous_flags is None else previous_flags
+    previous[1:] = flags[:-1]
+    changed = np.nonzero(flags != previous)[0]
+    events = np.empty(len(changed), dtype=EVENT_DTYPE)
+    events['tick'] = records['tick'][changed]
+    events['time'] = records['time'][changed]
+    events['previous_flags'] = previous[changed]
+    events['flags'] = flags[changed]
+    return summary, events
+
+class FlightRecorder:
+    def __init__(self, simulation, flight_control_unit, path, chunk_records=1024, ring_chunks=8):
+        self.flight_control_unit = flight_control_unit
+        self.path = path
+        self.chunk_records = chunk_records  # 1024 records is about 10 s at 100 Hz
+        self.ring_chunks = ring_chunks
+        # Preallocated ring of chunk slots; the simulation thread fills one while the writer thread drains others
+        self.ring = np.zeros(chunk_records * ring_chunks, dtype=RECORD_DTYPE)
+        self.ring_bytes = self.ring.view(np.uint8)
+        self.slot_busy = [False] * ring_chunks  # Set by the simulation thread, cleared by the writer thread
+        self.slot = 0
+        self.count = 0  # Records in the current slot
+        self.recorded = 0
+        self.dropped = 0  # Records lost because the writer thread fell a whole ring behind
+
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, STATE_RECORD.size, chunk_records,
+                                         simulation.tick_ms, time.time()))
+        self.index = []
+        self.events = []
+        self.last_flags = None
+        self.queue = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.write_chunks, name='FlightRecorder', daemon=True)
+        self.writer.start()
+        simulation.observe(self.capture)  # Runs on the simulation thread; never touches the disk
+
+    def capture(self, state):
+        if self.count == 0 and self.slot_busy[self.slot]:
+            self.dropped += 1
+            return
+        fcu = self.flight_control_unit
+        STATE_RECORD.pack_into(self.ring_bytes, (self.slot * self.chunk_records + self.count) * STATE_RECORD.size,
+                               state.tick, state.time, state.pitch, state.roll, state.heading,
+                               fcu.heading_select, fcu.speed_digits, fcu.altitude_select, fcu.vertical_speed_digits,
+                               encode_modes(fcu))
+        self.count += 1
+        self.recorded += 1
+        if self.count == self.chunk_records:
+            self.submit()
+
+    def submit(self):
+        if self.count == 0:
+            return
+        self.slot_busy[self.slot] = True
+        self.queue.put((self.slot, self.count))
+        self.slot = (self.slot + 1) % self.ring_chunks
+        self.count = 0
+
+    def write_chunks(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            slot, count = item
+            start = slot * self.chunk_records
+            records = self.ring[start:start + count]
+            summary, events = summarize_chunk(records, self.last_flags)
+            self.last_flags = int(records['mode_flags'][-1])
+            self.index.append((self.file.tell(),) + summary)
+            self.events.append(events)
+            self.file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, *summary))
+            self.file.write(records.data)
+            self.file.flush()  # Complete chunks survive a crash of the simulator
+            self.slot_busy[slot] = False
+
+    def close(self):
+        # Call once the simulation has stopped, so no capture runs concurrently
+        self.submit()
+        self.queue.put(None)
+        self.writer.join()
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        events = np.concatenate(self.events) if self.events else np.empty(0, dtype=EVENT_DTYPE)
+        event_offset = self.file.tell()
+        self.file.write(events.data)
+        self.file.write(TRAILER.pack(index_offset, len(self.index), event_offset, len(events), INDEX_MAGIC))
+        self.file.close()
+        print(f"Flight recorder: {self.recorded} records in {len(self.index)} chunks written to {self.path}, {self.dropped} dropped")
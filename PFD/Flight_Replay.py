@@ -0,0 +1,212 @@
+import bisect
+import mmap
+import time
+import numpy as np
+from PyQt5.QtCore import QObject, Qt
+from Flight_Recorder import (CHUNK_HEADER, CHUNK_MAGIC, EVENT_DTYPE, FILE_HEADER, FILE_MAGIC, FILE_VERSION,
+                             INDEX_DTYPE, INDEX_MAGIC, RECORD_DTYPE, TRAILER, summarize_chunk)
+from Simulation import FlightState
+
+class FlightRecording:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        # Map the file instead of reading it: only the pages of chunks actually visited are loaded
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.chunk_records, self.tick_ms, self.start_wall_time = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION or record_size != RECORD_DTYPE.itemsize:
+            self.close()
+            raise ValueError(f"{path} is not a supported flight recording")
+        self.cached_chunk = None
+        self.cached_records = None
+        self.events = None  # Mode transitions, loaded on first use
+        self.index = self.read_index()
+        if len(self.index) == 0:
+            self.close()
+            raise ValueError(f"{path} contains no recorded samples")
+        self.chunk_offsets = self.index['offset'].astype(np.int64)
+        self.chunk_counts = self.index['count'].astype(np.int64)
+        self.chunk_start_times = self.index['first_time'].copy()  # Copies keep no reference into the mapping
+        self.chunk_first_sample = np.concatenate(([0], np.cumsum(self.chunk_counts)[:-1]))
+        self.sample_count = int(self.chunk_counts.sum())
+        self.start_time = float(self.index['first_time'][0])
+        self.end_time = float(self.index['last_time'][-1])
+        self.initial_flags = int(self.chunk(0)['mode_flags'][0])
+
+    def read_index(self):
+        size = len(self.map)
+        if size >= FILE_HEADER.size + TRAILER.size:
+            index_offset, chunk_count, self.event_offset, self.event_count, magic = TRAILER.unpack_from(self.map, size - TRAILER.size)
+            if magic == INDEX_MAGIC:
+                return np.frombuffer(self.map, dtype=INDEX_DTYPE, count=chunk_count, offset=index_offset)
+        # No index: the recorder did not close cleanly, so walk the complete chunks
+        self.event_offset = None
+        entries = []
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= size:
+            magic, *summary = CHUNK_HEADER.unpack_from(self.map, offset)
+            end = offset + CHUNK_HEADER.size + summary[0] * RECORD_DTYPE.itemsize
+            if magic != CHUNK_MAGIC or end > size:
+                break
+            entries.append((offset, *summary))
+            offset = end
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def mode_events(self):
+        if self.events is None:
+            if self.event_offset is not None:
+                self.events = np.frombuffer(self.map, dtype=EVENT_DTYPE, count=self.event_count, offset=self.event_offset)
+            else:
+                # Recovered recording: derive the transitions from the samples themselves
+                events = []
+                previous_flags = None
+                for chunk_index in range(len(self.index)):
+                    records = self.chunk(chunk_index)
+                    events.append(summarize_chunk(records, previous_flags)[1])
+                    previous_flags = int(records['mode_flags'][-1])
+                self.events = np.concatenate(events)
+        return self.events
+
+    def chunk(self, index):
+        # Zero-copy structured view of one chunk's records
+        if index != self.cached_chunk:
+            self.cached_records = np.frombuffer(self.map, dtype=RECORD_DTYPE, count=int(self.chunk_counts[index]),
+                                                offset=int(self.chunk_offsets[index]) + CHUNK_HEADER.size)
+            self.cached_chunk = index
+        return self.cached_records
+
+    def sample(self, number):
+        chunk_index = int(np.searchsorted(self.chunk_first_sample, number, side='right')) - 1
+        return self.chunk(chunk_index)[number - self.chunk_first_sample[chunk_index]]
+
+    def locate(self, t):
+        # Number of the last sample at or before time t: binary search over chunks, then within the chunk
+        chunk_index = max(int(np.searchsorted(self.chunk_start_times, t, side='right')) - 1, 0)
+        records = self.chunk(chunk_index)
+        position = max(int(np.searchsorted(records['time'], t, side='right')) - 1, 0)
+        return int(self.chunk_first_sample[chunk_index]) + position
+
+    def sample_at(self, t):
+        # Attitude interpolated between the surrounding samples; discrete FCU state from the earlier one
+        number = self.locate(t)
+        before = self.sample(number)
+        if number + 1 >= self.sample_count or t <= before['time']:
+            return before, float(before['pitch']), float(before['roll']), float(before['heading'])
+        after = self.sample(number + 1)
+        fraction = min((t - before['time']) / (after['time'] - before['time']), 1.0)
+        heading_change = (after['heading'] - before['heading'] + 180) % 360 - 180  # Shortest way across 359 -> 0
+        return (before,
+                float(before['pitch'] + (after['pitch'] - before['pitch']) * fraction),
+                float(before['roll'] + (after['roll'] - before['roll']) * fraction),
+                float((before['heading'] + heading_change * fraction) % 360))
+
+    def close(self):
+        self.cached_records = None
+        self.index = self.events = None
+        self.map.close()
+        self.file.close()
+
+class FlightReplay(QObject):
+    MIN_SPEED = 0.25
+    MAX_SPEED = 32
+
+    def __init__(self, primary_flight_display, path):
+        super().__init__()
+        self.primary_flight_display = primary_flight_display
+        self.flight_control_unit = None  # Set once the FCU exists, to drive its lamps
+        self.recording = FlightRecording(path)
+        self.speed = 1.0
+        self.paused = False
+        self.anchor_position = self.recording.start_time  # Recording time at anchor_wall_time
+        self.anchor_wall_time = time.monotonic()
+        self.last_modes = None
+        self.mark_starts = []  # Start times of query results to jump between
+        print(f"Replaying {path}: {self.recording.sample_count} samples, "
+              f"{self.recording.end_time - self.recording.start_time:.1f} s")
+
+    def position(self):
+        if self.paused:
+            return self.anchor_position
+        position = self.anchor_position + (time.monotonic() - self.anchor_wall_time) * self.speed
+        if position >= self.recording.end_time:
+            self.seek(self.recording.end_time)
+            self.paused = True  # Hold the last frame at the end of the recording
+            return self.recording.end_time
+        return position
+
+    def seek(self, t):
+        self.anchor_position = min(max(t, self.recording.start_time), self.recording.end_time)
+        self.anchor_wall_time = time.monotonic()
+        self.primary_flight_display.update()
+
+    def set_speed(self, speed):
+        self.seek(self.position())  # Re-anchor so the change takes effect from the current position
+        self.speed = min(max(speed, self.MIN_SPEED), self.MAX_SPEED)
+        print(f"Replay speed {self.speed}x")
+
+    def set_paused(self, paused):
+        self.seek(self.position())
+        self.paused = paused
+
+    def step_frame(self, direction=1):
+        # Pause and move to the next (or previous) recorded sample
+        position = self.position()
+        self.paused = True
+        number = self.recording.locate(position)
+        if direction > 0 or self.recording.sample(number)['time'] >= position:
+            number += direction
+        number = min(max(number, 0), self.recording.sample_count - 1)
+        self.seek(float(self.recording.sample(number)['time']))
+
+    def set_marks(self, ranges):
+        self.mark_starts = sorted(start for start, _ in ranges)
+        print(f"{len(self.mark_starts)} marks, N/P to jump between them")
+
+    def jump_to_mark(self, direction):
+        position = self.position()
+        if direction > 0:
+            index = bisect.bisect_right(self.mark_starts, position + 1e-6)
+        else:
+            index = bisect.bisect_left(self.mark_starts, position - 0.5) - 1  # Leave time to jump past the current mark
+        if 0 <= index < len(self.mark_starts):
+            self.seek(self.mark_starts[index])
+
+    @property
+    def state(self):
+        t = self.position()
+        record, pitch, roll, heading = self.recording.sample_at(t)
+        modes = int(record['mode_flags'])
+        self.primary_flight_display.apply_mode_flags(modes, int(record['heading_select']))
+        if self.flight_control_unit is not None:
+            if modes != self.last_modes:
+                self.flight_control_unit.show_modes(modes)
+                self.last_modes = modes
+            self.flight_control_unit.show_selections(int(record['heading_select']), int(record['speed_digits']))
+        return FlightState(int(record['tick']), t, pitch, roll, heading)
+
+    def handle_key_press(self, event):
+        key = event.key()
+        if key == Qt.Key_Space:
+            self.set_paused(not self.paused)
+        elif key == Qt.Key_Up:
+            self.set_speed(self.speed * 2)
+        elif key == Qt.Key_Down:
+            self.set_speed(self.speed / 2)
+        elif key in (Qt.Key_Right, Qt.Key_Left):
+            direction = 1 if key == Qt.Key_Right else -1
+            if self.paused:
+                self.step_frame(direction)
+            else:
+                self.seek(self.position() + 10 * direction)  # Skip 10 s while playing
+        elif key == Qt.Key_Home:
+            self.seek(self.recording.start_time)
+        elif key == Qt.Key_End:
+            self.seek(self.recording.end_time)
+        elif key in (Qt.Key_N, Qt.Key_P):
+            self.jump_to_mark(1 if key == Qt.Key_N else -1)
+
+    def handle_key_release(self, event):
+        pass
+
+    def close(self):
+        self.recording.close()
@@ -0,0 +1,308 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+from collections import namedtuple
+import numpy as np
+from ILS_Receiver import ILSDeviation
+from Render_Benchmark import BACKENDS, create_application, create_display
+from Render_Quality import DEGRADE_PAINT, LEVELS
+from Scenario_Runner import BUTTONS
+from Scene_Display import mode_key
+from Simulation import FlightState
+from Snapshot import restore_snapshot, take_snapshot
+from Telemetry import encode_modes
+
+# Golden-image check of the renderer. Draws a catalogue of flight states and FCU modes headless with every
+# backend, compares each frame with the reference PNGs in Golden/ and times it against a frame budget:
+#   python Golden_Images.py                       check every backend, exit status 1 on any failure
+#   python Golden_Images.py --update              redraw the references after an intended change to the art
+#   python Golden_Images.py --backends threaded --save-failures /tmp/golden
+#   python Golden_Images.py --exact               the widget and threaded backends byte for byte against immediate
+# The references are drawn by the immediate backend (everything painted, no caches) at the design size and
+# the 'standard' quality level. Fonts come from the system, so references drawn on another machine may need
+# an --update before the first run.
+#
+# Catalogue:
+#   roll_*       roll sweep, -60 to 60 degrees
+#   pitch_*      pitch sweep, -30 to 30 degrees, on and between the ladder lines
+#   heading_*    358 to 2 degrees, where the heading tape and horizon ticks wrap through north
+#   modes_*      every distinct FMA and deviation scale state the FCU buttons reach from start-up
+#   deviation_*  LOC and G/S diamonds centred, off centre, beyond full scale, and LOC without a glideslope
+#
+# A pixel differs when its colour distance (redmean-weighted RGB, 0 to 765) exceeds DISTANCE, which hinting
+# noise stays below. Differences one pixel wide that lie on an edge of the reference (within a pixel of a
+# colour step in it) are edges a backend rounds differently, such as the scene backend's clip paths on the
+# sphere. A frame fails when more than ALLOWED other pixels differ, which any changed glyph, line or fill does,
+# or when more than EDGE_ALLOWED edge pixels do, which a shifted or redrawn outline does. Each case is drawn
+# REPEATS times, so a cache replaying a stale picture on the second frame fails too.
+# The budget is the paint time at which Render_Quality's governor would step down; the median of the repeats
+# is checked, so a single frame delayed by the machine does not fail the run.
+# --exact needs no references: every case is drawn at every quality level by the immediate backend and by the
+# others, which paint through draw_instruments with display lists or through LayerCompositor.paint, and any
+# pixel that is not identical fails. The scene backend rasterizes its items on its own and is not exact.
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Golden')
+DISTANCE = 48  # 16 levels on every channel
+ALLOWED = 8  # Differing pixels off the reference's edges or in 2x2 blocks
+EDGE_ALLOWED = 2000  # One pixel wide differences on the reference's edges; the scene backend has up to about 1400
+BUDGET_MS = DEGRADE_PAINT * 30
+REPEATS = 3
+BASE_STATE = FlightState(0, 0.0, 2.5, 5.0, 90.5)  # Attitude of the mode and deviation cases
+APPROACH = ['toggle_appr_visibility', 'toggle_ap1']  # Both deviation scales shown
+
+BUTTON_NAMES = {method: button for button, method in BUTTONS.items()}
+
+GoldenCase = namedtuple('GoldenCase', ['name', 'buttons', 'state', 'deviation'])
+GoldenResult = namedtuple('GoldenResult', ['case', 'differing', 'edges', 'paint_ms', 'error'])  # Pixel counts
+ExactResult = namedtuple('ExactResult', ['case', 'level', 'differing', 'largest'])  # Pixels, largest channel difference
+EXACT_BACKENDS = ['widget', 'threaded']
+
+class FixedReceiver:
+    # Stands in for the ILSReceiver so every backend reads the same deviation
+    def __init__(self, deviation):
+        self.deviation = deviation
+
+def reachable_modes(display, initial, image):
+    # Breadth first over FCU button presses from start-up, through every combination of FCU modes. Keeps the
+    # shortest button sequence of each display mode state that draws a frame of its own.
+    fcu = display.flight_control_unit
+    seen = {encode_modes(fcu)}
+    modes = {mode_key(display): []}
+    queue = [[]]
+    while queue:
+        sequence = queue.pop(0)
+        for button in BUTTONS.values():
+            restore_snapshot(display, initial)
+            for name in sequence + [button]:
+                getattr(fcu, name)()
+            flags = encode_modes(fcu)
+            if flags not in seen:
+                seen.add(flags)
+                queue.append(sequence + [button])
+                modes.setdefault(mode_key(display), sequence + [button])
+    frames = {}
+    for sequence in modes.values():
+        frame = draw_case(display, initial, GoldenCase('', sequence, BASE_STATE, None), image)[0][0]
+        frames.setdefault(frame.tobytes(), sequence)
+    return list(frames.values())
+
+def catalogue(display):
+    from PyQt5.QtGui import QImage
+    initial = take_snapshot(display)
+    image = QImage(display.size(), QImage.Format_RGB32)
+    cases = [GoldenCase(f"roll_{roll:+d}", [], BASE_STATE._replace(pitch=0.0, roll=float(roll), heading=0.0), None)
+             for roll in range(-60, 61, 15)]
+    cases += [GoldenCase(f"pitch_{pitch:+g}", [], BASE_STATE._replace(pitch=pitch, roll=0.0, heading=0.0), None)
+              for pitch in (-30.0, -21.25, -12.5, -5.0, 0.0, 3.75, 10.0, 18.75, 30.0)]
+    cases += [GoldenCase(f"heading_{heading:g}", ['toggle_hdg_trk'], BASE_STATE._replace(heading=heading), None)
+              for heading in (358.0, 359.0, 359.5, 0.0, 0.5, 1.0, 2.0)]
+    for sequence in reachable_modes(display, initial, image):
+        name = '+'.join(BUTTON_NAMES[method] for method in sequence) or 'off'
+        cases.append(GoldenCase(f"modes_{name}", sequence, BASE_STATE, None))
+    for name, localizer, glideslope in [('centred', 0.0, 0.0), ('off_centre', 0.8, -1.3), ('full_scale', -2.6, 3.0),
+                                        ('loc_only', 1.5, None)]:
+        cases.append(GoldenCase(f"deviation_{name}", APPROACH, BASE_STATE, ILSDeviation(None, localizer, glideslope)))
+    return cases
+
+def frame_array(image):
+    return np.frombuffer(image.constBits().asarray(image.sizeInBytes()), dtype=np.uint8).reshape(
+        image.height(), image.bytesPerLine() // 4, 4)[:, :image.width(), 2::-1].copy()  # RGB
+
+def load_reference(path):
+    from PyQt5.QtGui import QImage
+    image = QImage(path)
+    return None if image.isNull() else frame_array(image.convertToFormat(QImage.Format_RGB32))
+
+def save_array(array, path):
+    from PyQt5.QtGui import QImage
+    array = np.ascontiguousarray(array)
+    height, width = array.shape[:2]
+    QImage(array.data, width, height, 3 * width, QImage.Format_RGB888).save(path)
+
+def colour_distance(reference, frame):
+    # Redmean approximation of perceived colour difference, per pixel
+    reference, frame = reference.astype(np.float32), frame.astype(np.float32)
+    red_mean = (reference[..., 0] + frame[..., 0]) / 2
+    delta = reference - frame
+    return np.sqrt((2 + red_mean / 256) * delta[..., 0] ** 2 + 4 * delta[..., 1] ** 2 + (2 + (255 - red_mean) / 256) * delta[..., 2] ** 2)
+
+def edge_map(reference):
+    # Pixels within one pixel of a colour step between neighbours in the reference
+    steps = np.zeros(reference.shape[:2], dtype=bool)
+    horizontal = colour_distance(reference[:, :-1], reference[:, 1:]) > DISTANCE
+    vertical = colour_distance(reference[:-1], reference[1:]) > DISTANCE
+    steps[:, :-1] |= horizontal
+    steps[:, 1:] |= horizontal
+    steps[:-1] |= vertical
+    steps[1:] |= vertical
+    padded = np.pad(steps, 1)  # Widened by a pixel on every side, so an edge rounded a pixel over still lies on it
+    height, width = steps.shape
+    return np.logical_or.reduce([padded[row:row + height, column:column + width] for row in range(3) for column in range(3)])
+
+def visible_differences(reference, frame):
+    # Differing pixels, and those of them that are more than a one pixel wide difference on an edge of the reference
+    differing = colour_distance(reference, frame) > DISTANCE
+    blocks = differing[:-1, :-1] & differing[1:, :-1] & differing[:-1, 1:] & differing[1:, 1:]
+    visible = differing & ~edge_map(reference)
+    for rows, columns in ((slice(None, -1), slice(None, -1)), (slice(1, None), slice(None, -1)),
+                          (slice(None, -1), slice(1, None)), (slice(1, None), slice(1, None))):
+        visible[rows, columns] |= blocks
+    return differing, visible
+
+def draw_case(display, initial, case, image):
+    # Returns the frames drawn and their paint times in milliseconds
+    restore_snapshot(display, initial)
+    for name in case.buttons:
+        getattr(display.flight_control_unit, name)()
+    display.ils_receiver = FixedReceiver(case.deviation) if case.deviation is not None else None
+    display.ils_deviation = None
+    display.simulation.state = case.state
+    frames, times = [], []
+    for repeat in range(REPEATS):
+        image.fill(0)
+        start = time.perf_counter()
+        display.update_horizon()  # The scene backend syncs its items here
+        display.render(image)
+        times.append((time.perf_counter() - start) * 1000)
+        frames.append(frame_array(image))
+    return frames, times
+
+def check_backend(backend, cases, budget, save_failures):
+    display = create_display(backend)
+    initial = take_snapshot(display)
+    from PyQt5.QtGui import QImage
+    image = QImage(display.size(), QImage.Format_RGB32)
+    results = []
+    for case in cases:
+        path = os.path.join(GOLDEN_DIR, case.name + '.png')
+        reference = load_reference(path)
+        frames, times = draw_case(display, initial, case, image)
+        paint_ms = float(np.median(times))
+        if reference is None or reference.shape != frames[0].shape:
+            results.append(GoldenResult(case, 0, 0, paint_ms, f"no {frames[0].shape[1]}x{frames[0].shape[0]} reference, run with --update"))
+            continue
+        worst = None
+        for frame in frames:
+            differing, visible = visible_differences(reference, frame)
+            if worst is None or visible.sum() > worst[2].sum():
+                worst = (frame, differing, visible)
+        frame, differing, visible = worst
+        results.append(GoldenResult(case, int(visible.sum()), int(differing.sum() - visible.sum()), paint_ms, None))
+        if save_failures and (visible.sum() > ALLOWED or differing.sum() - visible.sum() > EDGE_ALLOWED or paint_ms > budget):
+            os.makedirs(save_failures, exist_ok=True)
+            save_array(frame, os.path.join(save_failures, f"{case.name}.{backend}.png"))
+            marked = reference // 3  # Visible differences in magenta and one pixel edges in cyan over the dimmed reference
+            marked[differing] = (0, 255, 255)
+            marked[visible] = (255, 0, 255)
+            save_array(marked, os.path.join(save_failures, f"{case.name}.{backend}.diff.png"))
+    display.close()
+    return results
+
+def check_exact(backend, cases):
+    # Compared with the immediate backend drawing the same case at the same level, frame by frame
+    reference_display, display = create_display('immediate'), create_display(backend)
+    reference_initial, initial = take_snapshot(reference_display), take_snapshot(display)
+    from PyQt5.QtGui import QImage
+    reference_image, image = QImage(display.size(), QImage.Format_RGB32), QImage(display.size(), QImage.Format_RGB32)
+    results = []
+    for level in LEVELS:
+        reference_display.quality_level = display.quality_level = level
+        for case in cases:
+            reference = draw_case(reference_display, reference_initial, case, reference_image)[0][0]
+            differing = largest = 0
+            for frame in draw_case(display, initial, case, image)[0]:
+                difference = np.abs(frame.astype(np.int16) - reference).max(axis=2)
+                differing = max(differing, int(np.count_nonzero(difference)))
+                largest = max(largest, int(difference.max()))
+            results.append(ExactResult(case, level.name, differing, largest))
+    reference_display.close()
+    display.close()
+    return results
+
+def update_references(cases, prune):
+    with contextlib.redirect_stdout(io.StringIO()):
+        display = create_display('immediate')
+    initial = take_snapshot(display)
+    from PyQt5.QtGui import QImage
+    image = QImage(display.size(), QImage.Format_RGB32)
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    names = set()
+    for case in cases:
+        with contextlib.redirect_stdout(io.StringIO()):  # The FCU prints every button press
+            frames, times = draw_case(display, initial, case, image)
+        save_array(frames[0], os.path.join(GOLDEN_DIR, case.name + '.png'))
+        names.add(case.name + '.png')
+    for stale in sorted(set(os.listdir(GOLDEN_DIR)) - names if prune else []):  # Cases no longer in the catalogue
+        os.remove(os.path.join(GOLDEN_DIR, stale))
+        print(f"removed {stale}")
+    display.close()
+    print(f"{len(cases)} references drawn at {display.width()}x{display.height()} into {GOLDEN_DIR}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the PFD backends with the golden images and check the frame budget')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--update', action='store_true', help='Redraw the reference images with the immediate backend')
+    parser.add_argument('--budget', type=float, default=BUDGET_MS, help=f'Paint time allowed per frame in ms (default: {BUDGET_MS:g})')
+    parser.add_argument('--only', metavar='PREFIX', help='Only the cases whose name starts with this, e.g. modes_')
+    parser.add_argument('--save-failures', metavar='DIR', help='Save failing frames and their difference masks as PNG')
+    parser.add_argument('--exact', action='store_true', help='Compare the widget and threaded backends with immediate, byte for byte; others are skipped')
+    args = parser.parse_args()
+
+    app = create_application()
+    with contextlib.redirect_stdout(io.StringIO()):
+        display = create_display('immediate')
+        cases = catalogue(display)
+        display.close()
+    if args.only:
+        cases = [case for case in cases if case.name.startswith(args.only)]
+    if args.update:
+        update_references(cases, prune=not args.only)
+        return
+    if args.exact:
+        exact(cases, [backend for backend in args.backends if backend in EXACT_BACKENDS])
+
+    failed = total = 0
+    start = time.perf_counter()
+    for backend in args.backends:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = check_backend(backend, cases, args.budget, args.save_failures)
+        for result in results:
+            if result.error:
+                message = result.error
+            elif result.differing > ALLOWED:
+                message = f"{result.differing} pixels differ, {ALLOWED} allowed"
+            elif result.edges > EDGE_ALLOWED:
+                message = f"{result.edges} pixels differ on edges, {EDGE_ALLOWED} allowed"
+            elif result.paint_ms > args.budget:
+                message = f"painted in {result.paint_ms:.1f} ms, {args.budget:g} ms allowed"
+            else:
+                continue
+            failed += 1
+            print(f"FAIL  {backend} {result.case.name}: {message}")
+        total += len(results)
+        slowest = max(results, key=lambda result: result.paint_ms)
+        print(f"{backend:9} {len(results)} frames, at most {max(result.differing for result in results)} pixels differing "
+              f"and {max(result.edges for result in results)} on edges, slowest {slowest.paint_ms:.1f} ms ({slowest.case.name})")
+    print(f"{total - failed}/{total} frames passed in {time.perf_counter() - start:.1f} s")
+    raise SystemExit(1 if failed else 0)
+
+def exact(cases, backends):
+    failed = total = 0
+    start = time.perf_counter()
+    for backend in backends:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = check_exact(backend, cases)
+        for result in results:
+            if result.differing:
+                failed += 1
+                print(f"FAIL  {backend} {result.case.name} at {result.level}: {result.differing} pixels differ, "
+                      f"by up to {result.largest} levels")
+        total += len(results)
+        print(f"{backend:9} {len(results)} frames at {len(LEVELS)} quality levels, "
+              f"{sum(1 for result in results if result.differing)} not identical to immediate")
+    print(f"{total - failed}/{total} frames identical in {time.perf_counter() - start:.1f} s")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
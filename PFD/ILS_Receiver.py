@@ -0,0 +1,255 @@
+import argparse
+import csv
+import math
+import time
+from collections import namedtuple
+import numpy as np
+
+# Localizer and glideslope deviation from the simulated position, computed every simulation tick for the tuned ILS,
+# or for the nearest ILS the aircraft is inside the coverage of when no frequency is tuned.
+# Runways are read from a CSV file with one row per runway end; Navigation/Runways.csv is a small sample with
+# approximate positions, for the simulator only:
+#   airport, runway, latitude, longitude (threshold, degrees), elevation (ft), course (degrees true), length (ft),
+#   ils (identifier, empty without an ILS), frequency (MHz), glideslope (degrees), crossing_height (ft)
+# Geometry is worked out on a flat earth around each threshold, which is well inside a tenth of a dot at ILS ranges.
+Runway = namedtuple('Runway', ['airport', 'runway', 'latitude', 'longitude', 'elevation', 'course', 'length',
+                               'ils', 'frequency', 'glideslope', 'crossing_height'])
+# Deviation in dots, positive when the beam is to the right of / above the aircraft (fly right / fly up);
+# glideslope is None outside its coverage
+ILSDeviation = namedtuple('ILSDeviation', ['runway', 'localizer', 'glideslope'])
+
+NM = 1852.0  # m
+FEET = 0.3048
+LATITUDE_SCALE = 60 * NM  # Metres per degree of latitude
+LOCALIZER_DOT = 0.8  # Degrees per dot on the PFD scales
+GLIDESLOPE_DOT = 0.4
+LOCALIZER_RANGE = 25.0  # NM from the localizer antenna
+LOCALIZER_SECTOR = 35.0  # Degrees either side of the course
+LOCALIZER_SETBACK = 1000 * FEET  # Antenna distance past the far end of the runway
+GLIDESLOPE_RANGE = 10.0  # NM
+GLIDESLOPE_SECTOR = 8.0
+CELL = 1.0  # Grid cell size in degrees
+TUNE_PERIOD_MS = 1000  # Station selection; the deviation itself is computed every tick
+
+def load_runways(path):
+    runways = []
+    with open(path, newline='') as runway_file:
+        for row in csv.DictReader(runway_file):
+            ils = row['ils'].strip()
+            runways.append(Runway(row['airport'], row['runway'], float(row['latitude']), float(row['longitude']),
+                                  float(row['elevation']), float(row['course']), float(row['length']), ils,
+                                  float(row['frequency']) if ils else None,
+                                  float(row['glideslope'] or 3.0) if ils else None,
+                                  float(row['crossing_height'] or 50) if ils else None))
+    return runways
+
+def find_runway(runways, name):
+    # "EGLL/27R"
+    airport, _, runway = name.upper().partition('/')
+    for candidate in runways:
+        if candidate.airport == airport and candidate.runway == runway:
+            return candidate
+    raise ValueError(f"Runway {name} not found")
+
+def cell_key(latitude, longitude, cell=CELL):
+    # Uniform latitude/longitude grid of cell-degree cells, numbered row by row from the south pole and the antimeridian
+    columns = round(360 / cell)
+    row = np.floor((np.asarray(latitude) + 90) / cell).astype(np.int64)
+    column = np.floor((np.asarray(longitude) + 180) / cell).astype(np.int64) % columns
+    return row * columns + column
+
+def cells_around(latitude, longitude, range_nm, cell=CELL):
+    # Keys of the cells overlapping a square of range_nm around the position
+    columns = round(360 / cell)
+    span_latitude = range_nm / 60
+    span_longitude = min(range_nm / (60 * max(math.cos(math.radians(latitude)), 0.01)), 180)
+    first_row = max(math.floor((latitude - span_latitude + 90) / cell), 0)
+    last_row = min(math.floor((latitude + span_latitude + 90) / cell), round(180 / cell) - 1)
+    first_column = math.floor((longitude - span_longitude + 180) / cell)
+    last_column = math.floor((longitude + span_longitude + 180) / cell)
+    row_columns = {column % columns for column in range(first_column, last_column + 1)}
+    return [row * columns + column for row in range(first_row, last_row + 1) for column in row_columns]
+
+class RunwayIndex:
+    # Uniform grid of CELL-degree cells over the ILS thresholds. Runways are stored sorted by cell, so a cell is a
+    # slice of the column arrays and a lookup only reads the few cells within reception range of the aircraft.
+    # columns maps the Runway fields to arrays over the runways with an ILS (a dict, or a nav database's ILS
+    # records), and runway(row) decodes one of them when it is received.
+    def __init__(self, columns, runway):
+        keys = cell_key(columns['latitude'], columns['longitude'])
+        self.rows = np.argsort(keys, kind='stable')
+        self.decode = runway
+        keys = keys[self.rows]
+        column = lambda field: np.asarray(columns[field], dtype=float)[self.rows]
+        self.latitudes = column('latitude')
+        self.longitudes = column('longitude')
+        self.longitude_scales = LATITUDE_SCALE * np.cos(np.radians(self.latitudes))  # Metres per degree of longitude
+        courses = np.radians(column('course'))
+        self.sin_courses = np.sin(courses)
+        self.cos_courses = np.cos(courses)
+        self.localizer_offsets = column('length') * FEET + LOCALIZER_SETBACK
+        self.elevations = column('elevation')
+        self.glideslopes = column('glideslope')
+        # The glideslope antenna abeam the point where the beam is crossing_height above the threshold
+        self.glideslope_offsets = column('crossing_height') * FEET / np.tan(np.radians(self.glideslopes))
+        self.frequencies = np.round(column('frequency') * 1000).astype(np.int64)  # kHz, exact comparisons
+        unique_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        self.cells = {int(key): (int(start), int(start + count)) for key, start, count in zip(unique_keys, starts, counts)}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def runway(self, index):
+        return self.decode(int(self.rows[index]))
+
+    def candidates(self, latitude, longitude, range_nm):
+        # Indices of the runways in the cells within range_nm of the position
+        slices = []
+        for key in cells_around(latitude, longitude, range_nm):
+            cell = self.cells.get(key)
+            if cell is not None:
+                slices.append(np.arange(*cell))
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+    def position(self, indices, latitude, longitude):
+        # Aircraft position from each threshold in metres: before the threshold along the approach course, and right of it
+        north = (latitude - self.latitudes[indices]) * LATITUDE_SCALE
+        east = ((longitude - self.longitudes[indices] + 180) % 360 - 180) * self.longitude_scales[indices]
+        sin_course, cos_course = self.sin_courses[indices], self.cos_courses[indices]
+        return -(east * sin_course + north * cos_course), east * cos_course - north * sin_course
+
+    def localizer(self, indices, before, right):
+        # Angle right of the course seen from the antenna, and whether the aircraft is inside the coverage
+        along = before + self.localizer_offsets[indices]
+        angle = np.degrees(np.arctan2(right, along))
+        received = (along > 0) & (np.hypot(along, right) <= LOCALIZER_RANGE * NM) & (np.abs(angle) <= LOCALIZER_SECTOR)
+        return angle, received
+
+    def find(self, latitude, longitude, frequency=None):
+        # The nearest ILS covering the position, only those on frequency (MHz) when one is tuned; None if there is none
+        indices = self.candidates(latitude, longitude, LOCALIZER_RANGE)
+        if frequency is not None:
+            indices = indices[self.frequencies[indices] == round(frequency * 1000)]
+        if len(indices) == 0:
+            return None
+        before, right = self.position(indices, latitude, longitude)
+        _, received = self.localizer(indices, before, right)
+        if not received.any():
+            return None
+        distances = np.where(received, np.hypot(before, right), np.inf)
+        return int(indices[np.argmin(distances)])
+
+    def deviation(self, index, latitude, longitude, altitude):
+        before, right = self.position(index, latitude, longitude)
+        angle, received = self.localizer(index, before, right)
+        if not received:
+            return None
+        glideslope = None
+        along = before + self.glideslope_offsets[index]
+        if along > 0 and math.hypot(along, right) <= GLIDESLOPE_RANGE * NM and abs(math.degrees(math.atan2(right, along))) <= GLIDESLOPE_SECTOR:
+            elevation = math.degrees(math.atan2((altitude - self.elevations[index]) * FEET, math.hypot(along, right)))
+            glideslope = float((self.glideslopes[index] - elevation) / GLIDESLOPE_DOT)
+        return ILSDeviation(self.runway(index), float(-angle / LOCALIZER_DOT), glideslope)
+
+def runway_index(runways):
+    # Index over the ILS runways of a list of Runway tuples
+    runways = [runway for runway in runways if runway.ils]
+    columns = {field: np.array([getattr(runway, field) for runway in runways], dtype=float)
+               for field in ('latitude', 'longitude', 'elevation', 'course', 'length', 'frequency', 'glideslope', 'crossing_height')}
+    return RunwayIndex(columns, runways.__getitem__)
+
+def approach_position(runway, distance_nm):
+    # On the extended centreline distance_nm before the threshold, on the glidepath
+    course = math.radians(runway.course)
+    distance = distance_nm * NM
+    latitude = runway.latitude - distance * math.cos(course) / LATITUDE_SCALE
+    longitude = runway.longitude - distance * math.sin(course) / (LATITUDE_SCALE * math.cos(math.radians(runway.latitude)))
+    glidepath = runway.crossing_height * FEET + distance * math.tan(math.radians(runway.glideslope))
+    return latitude, longitude, runway.elevation + glidepath / FEET
+
+class ILSReceiver:
+    def __init__(self, simulation, index, frequency=None):
+        self.simulation = simulation
+        self.index = index
+        self.frequency = frequency  # MHz; None receives the nearest ILS
+        self.station = None  # Index of the received ILS in the runway index
+        self.deviation = None  # Latest ILSDeviation, replaced as a whole so the GUI thread reads it without a lock
+        self.tune()
+        simulation.schedule(TUNE_PERIOD_MS, self.tune)
+        simulation.observe(self.update)
+
+    def tune(self):
+        simulation = self.simulation
+        self.station = self.index.find(simulation.latitude, simulation.longitude, self.frequency)
+
+    def update(self, state):
+        # Simulation thread, after every tick
+        if self.station is None:
+            self.deviation = None
+            return
+        simulation = self.simulation
+        self.deviation = self.index.deviation(self.station, simulation.latitude, simulation.longitude, simulation.altitude)
+
+    def place_on_approach(self, runway, indicated_airspeed, distance_nm=8.0):
+        # Start on the final approach to runway, on its localizer and glideslope
+        simulation = self.simulation
+        simulation.latitude, simulation.longitude, altitude = approach_position(runway, distance_nm)
+        simulation.heading = runway.course
+        simulation.set_air_data(indicated_airspeed, altitude)
+        if runway.ils:
+            self.frequency = runway.frequency
+        self.tune()
+
+def synthetic_runways(count, seed=0):
+    # Runway ends clustered around hubs like real airports, half of them with an ILS
+    generator = np.random.default_rng(seed)
+    hubs = np.column_stack([generator.uniform(-60, 70, 500), generator.uniform(-180, 180, 500)])
+    airports = hubs[generator.integers(0, len(hubs), count // 2)] + generator.normal(0, 1.5, (count // 2, 2))
+    runways = []
+    for number, (latitude, longitude) in enumerate(airports):
+        latitude = float(np.clip(latitude, -85, 85))
+        course = float(generator.uniform(0, 180))
+        length = float(generator.uniform(4000, 13000))
+        frequency = round(108.1 + 0.05 * generator.integers(0, 80), 2)
+        for end, end_course in enumerate((course, course + 180)):
+            ils = f"I{number:05d}{'AB'[end]}" if generator.random() < 0.5 else ''
+            offset = (0.5 - end) * length * FEET  # Thresholds half a runway either side of the airport position
+            end_latitude = latitude - offset * math.cos(math.radians(course)) / LATITUDE_SCALE
+            end_longitude = longitude - offset * math.sin(math.radians(course)) / (LATITUDE_SCALE * math.cos(math.radians(latitude)))
+            runways.append(Runway(f"X{number:05d}", f"{round(end_course / 10) % 36 or 36:02d}", end_latitude, end_longitude,
+                                  float(generator.uniform(0, 5000)), end_course, length, ils,
+                                  frequency if ils else None, 3.0 if ils else None, 50.0 if ils else None))
+    return runways
+
+def benchmark(count, lookups):
+    runways = synthetic_runways(count)
+    start = time.perf_counter()
+    index = runway_index(runways)
+    build = time.perf_counter() - start
+    generator = np.random.default_rng(1)
+    positions = []
+    for runway in (index.runway(i) for i in generator.integers(0, len(index), lookups)):
+        latitude, longitude, altitude = approach_position(runway, float(generator.uniform(2, 20)))
+        positions.append((latitude + generator.normal(0, 0.02), longitude + generator.normal(0, 0.02), altitude))
+    find_times, deviation_times, found = [], [], 0
+    for latitude, longitude, altitude in positions:
+        start = time.perf_counter()
+        station = index.find(latitude, longitude)
+        middle = time.perf_counter()
+        if station is not None:
+            found += 1
+            index.deviation(station, latitude, longitude, altitude)
+            deviation_times.append(time.perf_counter() - middle)
+        find_times.append(middle - start)
+    print(f"{len(runways)} runway ends, {len(index)} ILS in {len(index.cells)} cells, index built in {build * 1000:.0f} ms")
+    for name, times in (('find', find_times), ('deviation', deviation_times)):
+        times = np.array(times) * 1e6
+        print(f"  {name:10} mean {times.mean():6.1f} us  p99 {np.percentile(times, 99):6.1f} us  max {times.max():7.1f} us")
+    print(f"  {found}/{lookups} positions inside an ILS coverage")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time ILS lookups against a synthetic worldwide runway table')
+    parser.add_argument('--runways', type=int, default=40000, help='Runway ends generated')
+    parser.add_argument('--lookups', type=int, default=5000)
+    args = parser.parse_args()
+    benchmark(args.runways, args.lookups)
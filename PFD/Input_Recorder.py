@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from Snapshot import restore_snapshot
+from Telemetry import STATE_RECORD, encode_modes
+
+# Input log: JSON lines. The first line is a header, then one line per pilot input:
+#   {"tick": 1234, "target": "keys", "action": "press_key", "args": [16777235]}
+# An input logged at tick T is applied after tick T completed, before tick T + 1 runs.
+# The last line ({"tick": T, "end": true}) marks where the recording stopped.
+#
+# Targets: "keys" is the PFD's InputControl (press_key/release_key), "fcu" the FlightControlUnit
+# (toggle_* buttons, update_heading from the HDG knob, update_speed_mach from the SPD knob), "snapshot" a
+# snapshot restore (F1-F4 or --snapshot at launch; args: the snapshot bytes in hex). A restore sets the tick
+# back, so the inputs after it carry ticks of the restored timeline and a log is replayed in file order.
+# Version 1 logs have no restores.
+LOG_FORMAT = 'pfd-input-log'
+LOG_VERSION = 2
+
+class InputRecorder:
+    def __init__(self, simulation, path):
+        self.simulation = simulation
+        self.file = open(path, 'w')
+        self.file.write(json.dumps({'format': LOG_FORMAT, 'version': LOG_VERSION, 'tick_ms': simulation.tick_ms}) + '\n')
+        self.count = 0
+        self.lock = threading.Lock()  # Inputs come from the GUI thread, restores from the simulation thread
+        simulation.input_recorder = self
+
+    def record(self, tick, target, action, args):
+        with self.lock:
+            self.file.write(json.dumps({'tick': tick, 'target': target, 'action': action, 'args': list(args)}) + '\n')
+            self.count += 1
+
+    def close(self):
+        self.simulation.input_recorder = None
+        self.file.write(json.dumps({'tick': self.simulation.tick, 'end': True}) + '\n')
+        self.file.close()
+        print(f"Input recorder: {self.count} inputs over {self.simulation.tick} ticks")
+
+def load_input_log(path):
+    with open(path) as log:
+        header = json.loads(log.readline())
+        if header.get('format') != LOG_FORMAT or header.get('version') not in (1, LOG_VERSION):
+            raise ValueError(f"{path} is not a PFD input log")
+        events = [json.loads(line) for line in log if line.strip()]
+    end_tick = events[-1]['tick'] if events else 0  # The end marker, or the last input of a cut-short log
+    return header, [event for event in events if not event.get('end')], end_tick
+
+def state_trace_record(state, flight_control_unit):
+    fcu = flight_control_unit
+    return STATE_RECORD.pack(state.tick, state.time, state.pitch, state.roll, state.heading,
+                             fcu.heading_select, fcu.speed_digits, fcu.altitude_select, fcu.vertical_speed_digits,
+                             encode_modes(fcu))
+
+def create_headless_display():
+    # Widgets still exist (the FCU toggles drive them) but nothing is shown on screen
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from Primary_Flight_Display import PrimaryFlightDisplay
+    return app, PrimaryFlightDisplay(run_simulation=False)
+
+class SnapshotTarget:
+    # Replays logged snapshot restores
+    def __init__(self, display):
+        self.display = display
+
+    def restore(self, snapshot):
+        restore_snapshot(self.display, bytes.fromhex(snapshot))
+
+def replay_inputs(events, ticks, display=None, trace=None):
+    # Step the simulation on this thread as fast as possible, injecting each input at its tick.
+    # Stops at tick `ticks` of the timeline after the last restore.
+    # Returns the SHA-256 of the per-tick state trace; equal logs give equal digests.
+    if display is None:
+        _, display = create_headless_display()
+    simulation = display.simulation
+    targets = {'keys': display.input_control, 'fcu': display.flight_control_unit, 'snapshot': SnapshotTarget(display)}
+    digest = hashlib.sha256()
+    restores = sum(1 for event in events if event['target'] == 'snapshot')
+    pending = iter(events)
+    event = next(pending, None)
+    while True:
+        while event is not None and event['tick'] <= simulation.tick:
+            getattr(targets[event['target']], event['action'])(*event['args'])
+            restores -= event['target'] == 'snapshot'
+            event = next(pending, None)
+        if simulation.tick >= ticks and not restores:
+            break
+        simulation.step()
+        record = state_trace_record(simulation.state, display.flight_control_unit)
+        digest.update(record)
+        if trace is not None:
+            trace.write(record)
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a PFD input log headless and fingerprint the resulting state trace')
+    parser.add_argument('log')
+    parser.add_argument('--ticks', type=int, help='Ticks to simulate (default: until the end of the log)')
+    parser.add_argument('--trace', metavar='PATH', help='Also write every tick as a STATE_RECORD to this file')
+    parser.add_argument('--expect', metavar='SHA256', help='Exit with status 1 unless the trace digest matches')
+    args = parser.parse_args()
+
+    header, events, end_tick = load_input_log(args.log)
+    _, display = create_headless_display()
+    display.simulation.tick_ms = header['tick_ms']
+    ticks = args.ticks if args.ticks is not None else end_tick
+    trace = open(args.trace, 'wb') if args.trace else None
+    start = time.perf_counter()
+    digest = replay_inputs(events, ticks, display, trace)
+    elapsed = time.perf_counter() - start
+    if trace is not None:
+        trace.close()
+    state = display.simulation.state
+    print(f"{len(events)} inputs, {ticks} ticks ({ticks * header['tick_ms'] / 1000:.1f} s simulated) in {elapsed * 1000:.0f} ms")
+    print(f"Final state: heading {state.heading:.3f}  roll {state.roll:.3f}  pitch {state.pitch:.3f}")
+    print(f"Trace SHA-256: {digest}")
+    if args.expect and args.expect != digest:
+        print("Trace does not match the expected digest")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
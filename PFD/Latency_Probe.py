@@ -0,0 +1,218 @@
+import argparse
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import numpy as np
+
+# Input-to-photon latency. Each input is stamped when it reaches the application and followed through
+#   applied   the first published state computed after the input was consumed: the next simulation tick for a
+#             key, the next autopilot update for the heading knob, the packet itself for UDP telemetry
+#   repaint   from that state being published to the end of the first paintEvent drawing it or a later state
+#   painted   input to that paint, the end-to-end latency
+#   settled   input to the end of the first paintEvent drawing the state where the attitude ramp started by a key
+#             has finished (a new key press gives up on the earlier one)
+# Photon time is the end of paintEvent; compositing by the window system and scan-out are not included.
+STAGES = ('applied', 'repaint', 'painted', 'settled')
+EXPIRY = 2.0  # Seconds after which an input without a visible effect is given up
+HISTOGRAM_BUCKET = 0.010
+
+class LatencyEvent:
+    def __init__(self, source, input_time):
+        self.source = source
+        self.input_time = input_time
+        self.consumed = False
+        self.applied_time = None
+        self.tick = None  # First published tick reflecting the input
+        self.settle_tick = None
+        self.settles = source == 'key'
+        self.painted = False
+
+class LatencyProbe:
+    def __init__(self, simulation=None):
+        self.lock = threading.Lock()  # Inputs arrive on the GUI thread, are consumed on the simulation thread
+        self.pending = []
+        self.samples = {}  # (source, stage) -> latencies in seconds
+        self.inputs = {}  # source -> inputs seen
+        self.expired = {}  # source -> inputs given up
+        self.simulation = simulation
+        if simulation is not None:
+            simulation.observe(self.published)
+
+    def input(self, source, input_time=None):
+        event = LatencyEvent(source, time.perf_counter() if input_time is None else input_time)
+        with self.lock:
+            for earlier in self.pending:
+                if earlier.source == source:
+                    earlier.settles = False
+            self.pending.append(event)
+            self.inputs[source] = self.inputs.get(source, 0) + 1
+
+    def consume(self, source, state=None):
+        # The inputs of this source so far take effect in the next published state, or in state when given
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            for event in self.pending:
+                if event.source == source and not event.consumed:
+                    event.consumed = True
+                    if state is not None:
+                        self.apply(event, state.tick, now)
+
+    def apply(self, event, tick, now):
+        event.tick = tick
+        event.applied_time = now
+        self.record(event.source, 'applied', now - event.input_time)
+
+    def published(self, state):
+        # Simulation thread, after every tick
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        simulation = self.simulation
+        ramping = simulation.pitch_animation.is_running() or simulation.roll_animation.is_running()
+        with self.lock:
+            for event in self.pending:
+                if event.consumed and event.tick is None:
+                    self.apply(event, state.tick, now)
+                if event.settles and event.tick is not None and event.settle_tick is None and not ramping:
+                    event.settle_tick = state.tick
+
+    def painted(self, state):
+        # GUI thread, at the end of a paint drawing state
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            remaining = []
+            for event in self.pending:
+                if event.tick is not None and not event.painted and state.tick >= event.tick:
+                    event.painted = True
+                    self.record(event.source, 'repaint', now - event.applied_time)
+                    self.record(event.source, 'painted', now - event.input_time)
+                if event.painted and event.settles and event.settle_tick is not None and state.tick >= event.settle_tick:
+                    self.record(event.source, 'settled', now - event.input_time)
+                    event.settles = False
+                if event.painted and not event.settles:
+                    continue
+                if now - event.input_time > EXPIRY:
+                    if not event.painted:
+                        self.expired[event.source] = self.expired.get(event.source, 0) + 1
+                    continue
+                remaining.append(event)
+            self.pending = remaining
+
+    def record(self, source, stage, latency):
+        self.samples.setdefault((source, stage), []).append(latency)
+
+    def percentiles(self, source, stage):
+        samples = np.array(self.samples.get((source, stage), [])) * 1000
+        if len(samples) == 0:
+            return None
+        return tuple(float(value) for value in np.percentile(samples, [50, 90, 99])) + (float(samples.max()),)
+
+    def report(self):
+        lines = []
+        for source in sorted(self.inputs):
+            lines.append(f"[{source}] {self.inputs[source]} inputs, {self.expired.get(source, 0)} without a visible effect")
+            lines.append(f"  {'stage':8} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7}  ms")
+            for stage in STAGES:
+                values = self.percentiles(source, stage)
+                if values is not None:
+                    lines.append(f"  {stage:8} " + ' '.join(f"{value:7.1f}" for value in values))
+            painted = self.samples.get((source, 'painted'), [])
+            if painted:
+                counts = np.bincount((np.array(painted) / HISTOGRAM_BUCKET).astype(int))
+                for bucket, count in enumerate(counts):
+                    if count:
+                        low = bucket * HISTOGRAM_BUCKET * 1000
+                        lines.append(f"  {low:5.0f}-{low + HISTOGRAM_BUCKET * 1000:<4.0f} {'#' * max(1, round(60 * count / counts.max()))} {count}")
+        return '\n'.join(lines)
+
+class SyntheticInputs:
+    # Injects inputs at random intervals through the same handlers real events go through
+    def __init__(self, app, display, source, count, seed=1):
+        from PyQt5.QtCore import QTimer
+        self.app = app
+        self.display = display
+        self.source = source
+        self.remaining = count
+        self.random = random.Random(seed)
+        self.direction = 1
+        self.sequence = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.inject)
+        if source == 'knob':
+            fcu = display.flight_control_unit
+            fcu.toggle_hdg_trk()  # The knob only moves the aircraft through the autopilot
+            fcu.knob.is_pressing = True
+            self.knob_angle = 0.0
+            fcu.knob.knob_start_pos = self.knob_position(self.knob_angle)
+        elif source == 'udp':
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.address = ('127.0.0.1', display.input_control.socket.getsockname()[1])
+        self.schedule()
+
+    def schedule(self):
+        if self.remaining > 0:
+            self.timer.start(self.random.randint(150, 400))  # Longer than a key's attitude ramp
+        else:
+            from PyQt5.QtCore import QTimer
+            QTimer.singleShot(int(EXPIRY * 1000), self.app.quit)
+
+    def knob_position(self, angle):
+        from PyQt5.QtCore import QPoint
+        knob = self.display.flight_control_unit.knob
+        center = knob.rect().center()
+        return QPoint(center.x() + round(20 * math.cos(math.radians(angle))), center.y() + round(20 * math.sin(math.radians(angle))))
+
+    def inject(self):
+        from PyQt5.QtCore import QEvent, Qt, QTimer
+        from PyQt5.QtGui import QKeyEvent, QMouseEvent
+        self.remaining -= 1
+        self.direction = -self.direction
+        if self.source == 'key':
+            key = Qt.Key_Left if self.direction > 0 else Qt.Key_Right
+            self.display.keyPressEvent(QKeyEvent(QEvent.KeyPress, key, Qt.NoModifier))
+            QTimer.singleShot(20, lambda: self.display.keyReleaseEvent(QKeyEvent(QEvent.KeyRelease, key, Qt.NoModifier)))
+        elif self.source == 'knob':
+            self.knob_angle += 40 * self.direction  # Four degrees of selected heading
+            position = self.knob_position(self.knob_angle)
+            self.display.flight_control_unit.knob.mouseMoveEvent(QMouseEvent(QEvent.MouseMove, position, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier))
+        else:
+            from Telemetry import FLIGHT_STATE, FLIGHT_STATE_MAGIC
+            self.sequence += 1
+            self.socket.sendto(FLIGHT_STATE.pack(FLIGHT_STATE_MAGIC, self.sequence, self.random.uniform(-10, 10),
+                                                 self.random.uniform(-30, 30), self.random.uniform(0, 360), 150, 0, 0), self.address)
+        self.schedule()
+
+def measure(source, count, backend):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from Primary_Flight_Display import PrimaryFlightDisplay
+    app = QApplication(sys.argv[:1])
+    if source == 'udp':
+        probe_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        probe_socket.bind(('127.0.0.1', 0))
+        port = probe_socket.getsockname()[1]
+        probe_socket.close()
+        display = PrimaryFlightDisplay(telemetry_port=port, backend=backend, latency_probe=True)
+    else:
+        display = PrimaryFlightDisplay(backend=backend, latency_probe=True)
+    inputs = SyntheticInputs(app, display, source, count)
+    app.exec_()
+    display.close()  # Prints the report
+    return inputs
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Inject synthetic inputs into a headless PFD and report input-to-photon latency')
+    parser.add_argument('--source', choices=['key', 'knob', 'udp'], default='key')
+    parser.add_argument('--events', type=int, default=100)
+    parser.add_argument('--backend', choices=['widget', 'scene'], default='widget')
+    args = parser.parse_args()
+    measure(args.source, args.events, args.backend)
@@ -0,0 +1,128 @@
+import time
+from PyQt5.QtCore import QRunnable, QSize, QThread, QThreadPool, Qt
+from PyQt5.QtGui import QImage, QPainter
+
+# Each layer is drawn into its own transparent image, on the thread pool or the GUI thread, and the images are
+# composited in the painting order of PrimaryFlightDisplay.paintEvent, so the frame matches the serial path.
+# Layer images share the widget's coordinates: the raster engine does not rasterize gradients and antialiased
+# edges identically under a translation, so a layer only covers the widget from its top left corner to the
+# bottom right of its bounds, and only its bounds are cleared and composited. A layer's bounds are named by
+# their attribute of the display's DisplayLayout (Display_Layout.py).
+
+def bank_in_attitude(display):
+    # Antialiased, the bank scale's edges over the sphere's antialiased rim round once into a layer of their own
+    # and again when composited, a level off the serial path, so at those quality levels both share one layer
+    return 'bank' in display.quality_level.antialiased
+
+def draw_attitude(display, painter):
+    # First half of drawHorizon: the sphere clipped to its circle, or all of it when the bank scale is in this layer
+    if bank_in_attitude(display):
+        display.drawHorizon(painter)
+        return
+    layout = display.instrument_layout
+    painter.setClipPath(layout.circle_path)
+    display.draw_horizon(painter, layout.center, layout.circle_radius)
+
+def draw_bank(display, painter):
+    # Second half of drawHorizon: the bank scale and roll pointer, then the black side masks over both layers
+    layout = display.instrument_layout
+    display.draw_bank_angle_arc(painter, layout.center.x(), layout.center.y())
+    painter.setClipping(True)  # The circle clip set for the roll pointer
+    display.draw_side_masks(painter, layout.center, layout.circle_radius)
+
+def draw_localizer(display, painter):
+    display.draw_instrument(painter, ('localizer',), display.drawLocalizerDeviation)
+    display.draw_localizer_diamond(painter)
+
+def draw_glideslope(display, painter):
+    display.draw_instrument(painter, ('vertical_deviation',), display.drawVerticalDeviationScale)
+    display.draw_glideslope_diamond(painter)
+
+class Layer(QRunnable):
+    def __init__(self, name, display, bounds, draw, visible=None):
+        super().__init__()
+        self.setAutoDelete(False)  # Reused every frame
+        self.name = name
+        self.display = display
+        self.bounds = bounds
+        self.draw = draw
+        self.visible = visible
+        self.image = None
+        self.rect = None
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.frames = 0
+
+    def prepare(self):
+        # GUI thread: size the image for the current layout; returns whether the layer is drawn this frame
+        if self.visible is not None and not self.visible():
+            return False
+        self.rect = getattr(self.display.instrument_layout, self.bounds).toAlignedRect().intersected(self.display.rect())
+        size = QSize(self.rect.right() + 1, self.rect.bottom() + 1)
+        if self.image is None or self.image.size() != size:
+            self.image = QImage(size, QImage.Format_ARGB32_Premultiplied)
+        return True
+
+    def run(self):
+        start = time.perf_counter()
+        painter = QPainter(self.image)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(self.rect, Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        self.draw(painter)
+        painter.end()
+        elapsed = time.perf_counter() - start
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.frames += 1
+
+class LayerCompositor:
+    def __init__(self, display, threads=None):
+        self.display = display
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(threads or max(1, QThread.idealThreadCount() - 1))  # Leave a core for the GUI thread
+        annunciator = lambda painter: display.draw_instrument(painter, ('annunciator',) + display.annunciator_key(),
+                                                              display.drawFlightModeAnnunciator)
+        self.attitude = Layer('attitude', display, 'sphere_bounds', lambda painter: draw_attitude(display, painter))
+        self.layers = [  # In painting order
+            Layer('annunciator', display, 'annunciator_bounds', annunciator),
+            self.attitude,
+            Layer('bank', display, 'bank_bounds', lambda painter: draw_bank(display, painter),
+                  lambda: not bank_in_attitude(display)),
+            Layer('localizer', display, 'localizer_bounds', lambda painter: draw_localizer(display, painter),
+                  lambda: display.localizer_visible),
+            Layer('glideslope', display, 'glideslope_bounds', lambda painter: draw_glideslope(display, painter),
+                  lambda: display.vertical_deviation_visible),
+            Layer('heading', display, 'heading_bounds', display.drawHeadingIndicator),
+        ]
+        self.composite_time = 0.0
+        self.frame_time = 0.0
+        self.frames = 0
+
+    def paint(self, painter):
+        start = time.perf_counter()
+        self.attitude.bounds = 'bank_bounds' if bank_in_attitude(self.display) else 'sphere_bounds'
+        drawn = [layer for layer in self.layers if layer.prepare()]
+        for layer in drawn:
+            if layer is not self.attitude:
+                self.pool.start(layer)
+        self.attitude.run()  # The most expensive layer, drawn here while the pool works on the rest
+        self.pool.waitForDone()
+        composite_start = time.perf_counter()
+        for layer in drawn:
+            painter.drawImage(layer.rect, layer.image, layer.rect)
+        self.display.draw_instrument(painter, ('qnh',), self.display.drawQNH)  # Too small to be worth a layer
+        end = time.perf_counter()
+        self.composite_time += end - composite_start
+        self.frame_time += end - start
+        self.frames += 1
+
+    def report(self):
+        lines = [f"{self.frames} frames on {self.pool.maxThreadCount()} worker threads"]
+        for layer in self.layers:
+            if layer.frames:
+                lines.append(f"  {layer.name:12} {layer.total_time / layer.frames * 1000:6.3f} ms mean, {layer.max_time * 1000:6.3f} ms max")
+        if self.frames:
+            lines.append(f"  {'composite':12} {self.composite_time / self.frames * 1000:6.3f} ms mean")
+            lines.append(f"  {'frame':12} {self.frame_time / self.frames * 1000:6.3f} ms mean")
+        return '\n'.join(lines)
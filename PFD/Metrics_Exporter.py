@@ -0,0 +1,144 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Counters for fleet monitoring, served in the Prometheus text format on http://127.0.0.1:PORT/metrics.
+# Every counter and histogram has a single writer thread (paintEvent and update_horizon on the GUI thread,
+# the controller on the simulation thread), so the hot paths only add to numbers and never take a lock.
+# A scrape reads them from the server thread; a histogram read during an update may be off by that one sample.
+FRAME_BUCKETS = (0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1)
+JITTER_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05)
+TIMERS = (('update_horizon', 0.030), ('controller', 0.100))  # Timer name, nominal period in seconds
+INPUT_SOURCES = ('key', 'knob', 'udp', 'traffic')  # Traffic counts position reports
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds  # Upper bounds in seconds
+        self.counts = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Metrics:
+    def __init__(self):
+        self.frames = 0
+        self.frame_time = Histogram(FRAME_BUCKETS)
+        self.periods = dict(TIMERS)
+        self.timer_fires = {name: 0 for name, _ in TIMERS}
+        self.timer_jitter = {name: Histogram(JITTER_BUCKETS) for name, _ in TIMERS}
+        self.last_fire = {name: None for name, _ in TIMERS}
+        self.input_events = {source: 0 for source in INPUT_SOURCES}
+
+    def frame_rendered(self, duration):
+        self.frames += 1
+        self.frame_time.observe(duration)
+
+    def timer_fired(self, name):
+        # Jitter is the distance between the measured and the nominal period
+        now = time.perf_counter()
+        last = self.last_fire[name]
+        self.last_fire[name] = now
+        self.timer_fires[name] += 1
+        if last is not None:
+            self.timer_jitter[name].observe(abs(now - last - self.periods[name]))
+
+    def input_event(self, source, count=1):
+        self.input_events[source] += count
+
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None  # Not Linux
+
+def format_histogram(lines, name, help_text, histogram, labels=''):
+    counts = list(histogram.counts)
+    total = 0
+    if help_text is not None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+    separator = ',' if labels else ''
+    for bound, count in zip(histogram.bounds + (None,), counts):
+        total += count
+        le = '+Inf' if bound is None else repr(bound)
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{le}"}} {total}')
+    suffix = f"{{{labels}}}" if labels else ''
+    lines.append(f"{name}_sum{suffix} {histogram.sum!r}")
+    lines.append(f"{name}_count{suffix} {total}")
+
+def format_metric(lines, name, kind, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+def exposition(primary_flight_display):
+    metrics = primary_flight_display.metrics
+    lines = []
+    format_metric(lines, 'pfd_frames_total', 'counter', 'Frames painted.', [('', metrics.frames)])
+    format_histogram(lines, 'pfd_frame_seconds', 'Time spent painting a frame.', metrics.frame_time)
+    simulation = primary_flight_display.simulation
+    if simulation is not None:
+        format_metric(lines, 'pfd_simulation_ticks_total', 'counter', 'Simulation steps taken.', [('', simulation.tick)])
+        format_metric(lines, 'pfd_simulation_overruns_total', 'counter', 'Simulation steps started after their deadline.', [('', simulation.overruns)])
+    format_metric(lines, 'pfd_timer_fires_total', 'counter', 'Periodic timer callbacks run.',
+                  [(f'timer="{name}"', count) for name, count in metrics.timer_fires.items()])
+    lines.append("# HELP pfd_timer_jitter_seconds Difference between the measured and the nominal timer period.")
+    lines.append("# TYPE pfd_timer_jitter_seconds histogram")
+    for name, histogram in metrics.timer_jitter.items():
+        format_histogram(lines, 'pfd_timer_jitter_seconds', None, histogram, f'timer="{name}"')
+    format_metric(lines, 'pfd_input_events_total', 'counter', 'Pilot and telemetry inputs received.',
+                  [(f'source="{source}"', count) for source, count in metrics.input_events.items()])
+    display_lists = primary_flight_display.display_lists
+    if display_lists is not None:
+        format_metric(lines, 'pfd_display_list_lookups_total', 'counter', 'Display list cache lookups.',
+                      [('result="hit"', display_lists.hits), ('result="miss"', display_lists.misses)])
+    format_metric(lines, 'pfd_render_quality', 'gauge', 'Render quality level in use, see Render_Quality.py.',
+                  [(f'level="{primary_flight_display.quality_level.name}"', 1)])
+    quality = primary_flight_display.quality
+    if quality is not None:
+        format_metric(lines, 'pfd_render_quality_changes_total', 'counter', 'Render quality level changes.', [('', quality.changes)])
+    memory = resident_memory()
+    if memory is not None:
+        format_metric(lines, 'process_resident_memory_bytes', 'gauge', 'Resident memory size in bytes.', [('', memory)])
+    return ('\n'.join(lines) + '\n').encode()
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = exposition(self.server.primary_flight_display)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsExporter:
+    def __init__(self, primary_flight_display, port, host='127.0.0.1'):
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server.primary_flight_display = primary_flight_display
+        threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True).start()
+        print(f"Metrics on http://{host}:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,264 @@
+import argparse
+import csv
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+import numpy as np
+from ILS_Receiver import Runway, load_runways, synthetic_runways
+
+# Navigation database file, little-endian, written once by the converter below and memory-mapped read-only:
+#
+#   header, 32 bytes
+#   0       8     char[8]  magic b'PFDNAV01'
+#   8       4     uint32   format version, currently 1
+#   12      4     uint32   table count
+#   16      16             reserved
+#
+#   table directory, one 44-byte entry per table
+#   0       12    char[12] table name: airports, runways, ils, waypoints
+#   12      4     uint32   record count
+#   16      8     uint64   records offset, count * the table's record dtype
+#   24      4     uint32   key width in bytes
+#   28      8     uint64   keys offset, count * char[key width], the identifiers sorted, NUL padded
+#   36      8     uint64   order offset, count * uint32, the record number of each sorted key
+#
+# Sections start on 8-byte boundaries. Opening a database reads the header and directory only; records and keys
+# are NumPy views of the mapping, so a lookup touches the pages of a binary search and of one record.
+# Runway keys are "AIRPORT/RUNWAY", the ILS table holds one runway record per ILS keyed by its identifier.
+# Missing ILS values are NaN. Strings are UTF-8, cut to their field on a character boundary and NUL padded.
+FILE_MAGIC = b'PFDNAV01'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<8sII16x')
+DIRECTORY_ENTRY = struct.Struct('<12sIQIQQ')
+
+Airport = namedtuple('Airport', ['ident', 'name', 'latitude', 'longitude', 'elevation'])
+Waypoint = namedtuple('Waypoint', ['ident', 'latitude', 'longitude'])
+
+AIRPORT_DTYPE = np.dtype([('ident', 'S4'), ('name', 'S32'), ('latitude', '<f8'), ('longitude', '<f8'), ('elevation', '<f8')])
+RUNWAY_DTYPE = np.dtype([('airport', 'S4'), ('runway', 'S4'), ('latitude', '<f8'), ('longitude', '<f8'), ('elevation', '<f8'),
+                         ('course', '<f8'), ('length', '<f8'), ('ils', 'S8'), ('frequency', '<f8'), ('glideslope', '<f8'),
+                         ('crossing_height', '<f8')])
+WAYPOINT_DTYPE = np.dtype([('ident', 'S5'), ('latitude', '<f8'), ('longitude', '<f8')])
+TABLES = {  # Table name -> record dtype, decoded tuple, key of a decoded tuple
+    'airports': (AIRPORT_DTYPE, Airport, lambda airport: airport.ident),
+    'runways': (RUNWAY_DTYPE, Runway, lambda runway: f"{runway.airport}/{runway.runway}"),
+    'ils': (RUNWAY_DTYPE, Runway, lambda runway: runway.ils),
+    'waypoints': (WAYPOINT_DTYPE, Waypoint, lambda waypoint: waypoint.ident),
+}
+
+class NavTable:
+    def __init__(self, buffer, name, count, records_offset, key_width, keys_offset, order_offset):
+        dtype, self.record_type, _ = TABLES[name]
+        self.name = name
+        self.records = np.frombuffer(buffer, dtype=dtype, count=count, offset=records_offset)
+        self.keys = np.frombuffer(buffer, dtype=f'S{key_width}', count=count, offset=keys_offset)
+        self.order = np.frombuffer(buffer, dtype='<u4', count=count, offset=order_offset)
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, number):
+        # Decoded on access: bytes to str, NaN to None
+        values = self.records[number].item()
+        return self.record_type(*(value.decode('utf-8') if isinstance(value, bytes) else None if math.isnan(value) else value
+                                  for value in values))
+
+    def get(self, ident):
+        key = ident.upper().encode()
+        position = int(np.searchsorted(self.keys, key))
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.record(int(self.order[position]))
+        return None
+
+    def prefix(self, prefix, limit=20):
+        # Identifiers starting with prefix, in order; the range ends before prefix followed by the largest byte
+        key = prefix.upper().encode()
+        start = int(np.searchsorted(self.keys, key))
+        end = int(np.searchsorted(self.keys, key + b'\xff'))
+        return [identifier.decode() for identifier in self.keys[start:min(end, start + limit)]]
+
+class NavDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, table_count = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a supported navigation database")
+        self.tables = {}
+        for number in range(table_count):
+            name, *entry = DIRECTORY_ENTRY.unpack_from(self.map, FILE_HEADER.size + number * DIRECTORY_ENTRY.size)
+            name = name.rstrip(b'\0').decode()
+            if name in TABLES:
+                self.tables[name] = NavTable(self.map, name, *entry)
+
+    def get(self, table, ident):
+        return self.tables[table].get(ident)
+
+    def prefix(self, table, prefix, limit=20):
+        return self.tables[table].prefix(prefix, limit)
+
+    def runway(self, name):
+        # "EGLL/27R"
+        runway = self.tables['runways'].get(name)
+        if runway is None:
+            raise ValueError(f"Runway {name} not found")
+        return runway
+
+    def ils_columns(self):
+        # Column views for ILS_Receiver.RunwayIndex, and the decoder of its rows
+        ils = self.tables['ils']
+        return ils.records, ils.record
+
+    def close(self):
+        # NumPy views keep the mapping alive; it is released once the tables are gone as well
+        self.tables = {}
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+def is_nav_database(path):
+    with open(path, 'rb') as nav_file:
+        return nav_file.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+def encode_field(text, width):
+    # UTF-8 in at most width bytes; a character cut by the field end is dropped whole
+    return text.encode('utf-8')[:width].decode('utf-8', 'ignore').encode('utf-8')
+
+def write_database(path, tables):
+    # tables: name -> list of decoded tuples
+    sections = []
+    offset = FILE_HEADER.size + len(tables) * DIRECTORY_ENTRY.size
+    directory = []
+    for name, rows in tables.items():
+        dtype, _, key = TABLES[name]
+        widths = [dtype.fields[field][0].itemsize if dtype.fields[field][0].kind == 'S' else None for field in dtype.names]
+        records = np.array([tuple(math.nan if value is None else encode_field(value, width) if width else value
+                                  for value, width in zip(row, widths)) for row in rows], dtype=dtype)
+        identifiers = [key(row).upper().encode() for row in rows]
+        key_width = max([len(identifier) for identifier in identifiers] + [1])
+        keys = np.array(identifiers, dtype=f'S{key_width}')
+        order = np.argsort(keys, kind='stable')
+        offsets = []
+        for array in (records, keys[order], order.astype('<u4')):
+            offset += -offset % 8
+            offsets.append(offset)
+            sections.append((offset, array.tobytes()))
+            offset += array.nbytes
+        directory.append(DIRECTORY_ENTRY.pack(name.encode(), len(rows), offsets[0], key_width, offsets[1], offsets[2]))
+    with open(path, 'wb') as nav_file:
+        nav_file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(tables)))
+        nav_file.write(b''.join(directory))
+        for section_offset, data in sections:
+            nav_file.write(b'\0' * (section_offset - nav_file.tell()))
+            nav_file.write(data)
+
+def read_source(directory):
+    # Airports.csv (ident, name, latitude, longitude, elevation), Runways.csv as read by ILS_Receiver.load_runways
+    # and Waypoints.csv (ident, latitude, longitude); a missing file is an empty table
+    def rows(filename, convert):
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            return []
+        with open(path, newline='', encoding='utf-8') as source_file:
+            return [convert(row) for row in csv.DictReader(source_file)]
+    airports = rows('Airports.csv', lambda row: Airport(row['ident'], row['name'], float(row['latitude']),
+                                                        float(row['longitude']), float(row['elevation'])))
+    waypoints = rows('Waypoints.csv', lambda row: Waypoint(row['ident'], float(row['latitude']), float(row['longitude'])))
+    runways_path = os.path.join(directory, 'Runways.csv')
+    runways = load_runways(runways_path) if os.path.exists(runways_path) else []
+    return {'airports': airports, 'runways': runways, 'ils': [runway for runway in runways if runway.ils], 'waypoints': waypoints}
+
+def convert(directory, path):
+    tables = read_source(directory)
+    write_database(path, tables)
+    print(f"{path}: " + ', '.join(f"{len(rows)} {name}" for name, rows in tables.items()) + f", {os.path.getsize(path)} bytes")
+
+def write_synthetic_source(directory, runway_count, waypoint_count):
+    generator = np.random.default_rng(2)
+    runways = synthetic_runways(runway_count)
+    with open(os.path.join(directory, 'Runways.csv'), 'w', newline='') as runway_file:
+        writer = csv.writer(runway_file)
+        writer.writerow(Runway._fields)
+        writer.writerows(['' if value is None else value for value in runway] for runway in runways)
+    with open(os.path.join(directory, 'Airports.csv'), 'w', newline='') as airport_file:
+        writer = csv.writer(airport_file)
+        writer.writerow(Airport._fields)
+        for runway in runways[::2]:
+            writer.writerow([runway.airport, f"Airport {runway.airport}", runway.latitude, runway.longitude, runway.elevation])
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    with open(os.path.join(directory, 'Waypoints.csv'), 'w', newline='') as waypoint_file:
+        writer = csv.writer(waypoint_file)
+        writer.writerow(Waypoint._fields)
+        names = [''.join(name) for name in letters[generator.integers(0, 26, (waypoint_count, 5))]]
+        for name, latitude, longitude in zip(names, generator.uniform(-70, 70, waypoint_count), generator.uniform(-180, 180, waypoint_count)):
+            writer.writerow([name, latitude, longitude])
+
+def benchmark(runway_count, waypoint_count, lookups):
+    import bisect
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_source(directory, runway_count, waypoint_count)
+        path = os.path.join(directory, 'navdata.pfdnav')
+        convert(directory, path)
+        idents = [waypoint.ident for waypoint in read_source(directory)['waypoints']]
+        queries = [idents[i] for i in np.random.default_rng(3).integers(0, len(idents), lookups)]
+
+        start = time.perf_counter()
+        tables = read_source(directory)
+        by_ident = {name: {TABLES[name][2](row).upper(): row for row in rows} for name, rows in tables.items()}
+        sorted_waypoints = sorted(by_ident['waypoints'])
+        csv_ready = time.perf_counter() - start
+        start = time.perf_counter()
+        for ident in queries:
+            by_ident['waypoints'].get(ident)
+        csv_lookup = (time.perf_counter() - start) / lookups
+        start = time.perf_counter()
+        for ident in queries:
+            first = bisect.bisect_left(sorted_waypoints, ident[:2])
+            sorted_waypoints[first:bisect.bisect_left(sorted_waypoints, ident[:2] + '\uffff', first)][:20]
+        csv_prefix = (time.perf_counter() - start) / lookups
+
+        start = time.perf_counter()
+        database = NavDatabase(path)
+        database_ready = time.perf_counter() - start
+        start = time.perf_counter()
+        database.get('waypoints', queries[0])
+        first_lookup = time.perf_counter() - start
+        start = time.perf_counter()
+        for ident in queries:
+            database.get('waypoints', ident)
+        database_lookup = (time.perf_counter() - start) / lookups
+        start = time.perf_counter()
+        for ident in queries:
+            database.prefix('waypoints', ident[:2])
+        database_prefix = (time.perf_counter() - start) / lookups
+        database.close()
+
+    print(f"{'':24} {'ready':>10} {'lookup':>10} {'prefix':>10}")
+    print(f"{'CSV parsed at startup':24} {csv_ready * 1000:8.1f} ms {csv_lookup * 1e6:7.2f} us {csv_prefix * 1e6:7.2f} us")
+    print(f"{'memory-mapped database':24} {database_ready * 1000:8.3f} ms {database_lookup * 1e6:7.2f} us {database_prefix * 1e6:7.2f} us"
+          f"  (first lookup {first_lookup * 1e6:.0f} us)")
+    print("Files are in the page cache for both; ready is the time until the first lookup can run")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert CSV navigation data to a memory-mapped database, or benchmark the two')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help='Write a database from Airports.csv, Runways.csv and Waypoints.csv')
+    convert_parser.add_argument('source', help='Directory holding the CSV files, e.g. Navigation')
+    convert_parser.add_argument('output', help='Database file to write, e.g. Navigation/navdata.pfdnav')
+    benchmark_parser = subparsers.add_parser('benchmark', help='Compare startup and lookups against parsing CSV, on synthetic data')
+    benchmark_parser.add_argument('--runways', type=int, default=40000)
+    benchmark_parser.add_argument('--waypoints', type=int, default=200000)
+    benchmark_parser.add_argument('--lookups', type=int, default=20000)
+    args = parser.parse_args()
+    if args.command == 'convert':
+        convert(args.source, args.output)
+    else:
+        benchmark(args.runways, args.waypoints, args.lookups)
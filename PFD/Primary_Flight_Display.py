@@ -1,19 +1,47 @@
 import sys
 import math
+import os
+import time
+import argparse
 from PyQt5.QtWidgets import QApplication, QWidget
-from PyQt5.QtGui import QPainter, QColor, QPen, QPolygon, QFont, QLinearGradient, QTransform, QPainterPath
-from PyQt5.QtCore import QRect, Qt, QRectF, QPoint, QTimer
+from PyQt5.QtGui import QPainter, QColor, QPen, QPolygon, QLinearGradient
+from PyQt5.QtCore import Qt, QPoint, QTimer
 from Input_Control import InputControl
+from Simulation import Simulation
+from Telemetry_Input import TelemetryInput
+from Telemetry import decode_modes
+from Telemetry_Publisher import TelemetryPublisher
+from Shared_State import SharedStateReader, SharedStateWriter
+from Flight_Recorder import FlightRecorder
+from Flight_Replay import FlightReplay
+from Flight_Query import parse_query
+from Input_Recorder import InputRecorder
+from Snapshot import load_snapshot, restore_snapshot, save_snapshot, take_snapshot
+from Scene_Display import SceneView
+from Layer_Compositor import LayerCompositor
+from Remote_Stream import RemoteStream
+from Latency_Probe import LatencyProbe
+from Metrics_Exporter import Metrics, MetricsExporter
+from Runtime_Profiler import process_profiler
+from ILS_Receiver import ILSReceiver, RunwayIndex, find_runway, load_runways, runway_index
+from Nav_Database import NavDatabase, is_nav_database
+from Traffic import TrafficMonitor
+from Display_Host import DisplayMirror, DisplayResources
+from Render_Quality import FLAT_GROUND, FLAT_SKY, LEVEL_NAMES, AdaptiveQuality, quality_level
 
 class PrimaryFlightDisplay(QWidget):
-    def __init__(self):
+    def __init__(self, telemetry_port=None, publish_telemetry=False, attach_state=None, share_state=None, record_path=None, replay_path=None,
+                 record_inputs_path=None, run_simulation=True, snapshot_path=None,
+                 backend='widget', display_lists=True, threaded_layers=False, stream_port=None,
+                 latency_probe=False, metrics_port=None, nav_data=None, ils_frequency=None, approach=None,
+                 traffic_port=None, resources=None, mirror=None, frame_timer=True, quality='standard',
+                 best_quality='standard'):
         super().__init__()
         self.pitch = 0
         self.roll = 0
         self.current_heading = 0
         self.hdg_trk_active = False
         self.speed = 0
-        self.true_airspeed = 150  # True airspeed in knots
         self.alt_hold_active = False
         self.alt_hold_armed = False
         self.localizer_visible = False
@@ -24,30 +52,127 @@ class PrimaryFlightDisplay(QWidget):
         self.appr_active = False
         self.appr_armed = False
         self.show_gs_loc_labels = False
+        self.resources = resources or DisplayResources(display_lists)  # Layouts and display lists, shared by a DisplayHost
+        self.instrument_layout = self.resources.layout(self.width(), self.height(), self.logicalDpiY())  # Replaced in resizeEvent
+        self.quality_level = quality_level('standard' if quality == 'auto' else quality)  # See Render_Quality.py
+        self.quality = AdaptiveQuality(self, best=best_quality) if quality == 'auto' else None  # Chooses quality_level from the frame times
+        self.flight_control_unit = None
+        self.telemetry_publisher = None
+        self.shared_state_writer = None
+        self.flight_recorder = None
+        self.input_recorder = None
+        self.snapshots = {}  # Snapshot slot (F1-F4) -> snapshot bytes
+        self.snapshot_path = snapshot_path  # File backing slot F1
+        self.scene_view = SceneView(self) if backend == 'scene' else None  # QGraphicsView backend, drawn instead of paintEvent
+        self.display_lists = self.resources.display_lists  # Recorded mode-dependent instruments
+        self.layer_compositor = LayerCompositor(self) if threaded_layers else None  # Instruments drawn on a thread pool
+        self.remote_stream = RemoteStream(self, stream_port) if stream_port is not None else None  # Browser repeaters
+        self.metrics = Metrics() if metrics_port is not None else None  # Counters on the hot paths, see Metrics_Exporter.py
+        self.metrics_exporter = None
+        self.ils_receiver = None  # Localizer and glideslope deviation from the simulated position, see ILS_Receiver.py
+        self.ils_deviation = None  # The receiver's latest deviation, read once per frame
+        self.nav_database = None  # Memory-mapped navigation database when nav_data is one, see Nav_Database.py
+        self.traffic = None  # Intruders from a UDP traffic feed, see Traffic.py
+        self.traffic_advisories = 0  # The monitor's advisory count, read once per frame
+        if telemetry_port is not None:
+            # Driven by an external simulator instead of the keyboard and FCU
+            self.simulation = None
+            self.input_control = TelemetryInput(self, telemetry_port)
+            self.state_source = self.input_control
+        elif attach_state is not None:
+            # Repeater of a simulation running in another process
+            self.simulation = None
+            self.input_control = SharedStateReader(self, attach_state)
+            self.state_source = self.input_control
+        elif replay_path is not None:
+            # Play back a flight recording; the FCU only shows the recorded lamps and selections
+            self.simulation = None
+            self.input_control = FlightReplay(self, replay_path)
+            self.state_source = self.input_control
+        elif mirror is not None:
+            # Repeater of another display in this process, see Display_Host.py
+            self.simulation = None
+            self.input_control = DisplayMirror(self, mirror)
+            self.state_source = self.input_control
+            self.ils_receiver = mirror.ils_receiver
+        else:
+            self.simulation = Simulation()
+            self.state_source = self.simulation
+        self.latency_probe = LatencyProbe(self.simulation) if latency_probe else None  # Input-to-photon timing
+        if metrics_port is not None:
+            self.metrics_exporter = MetricsExporter(self, metrics_port)
         self.initUI()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_horizon)
-        self.timer.start(30)
-        self.input_control = InputControl(self)
-        self.setupFlightControlUnit()
+        if frame_timer:
+            self.timer.start(30)  # Otherwise a DisplayHost repaints its displays together
+        if self.simulation is not None:
+            self.input_control = InputControl(self)
+            self.setupFlightControlUnit()
+            if nav_data is not None:
+                if is_nav_database(nav_data):
+                    self.nav_database = NavDatabase(nav_data)
+                    index = RunwayIndex(*self.nav_database.ils_columns())
+                    runway = self.nav_database.runway
+                else:
+                    runways = load_runways(nav_data)
+                    index = runway_index(runways)
+                    runway = lambda name: find_runway(runways, name)
+                self.ils_receiver = ILSReceiver(self.simulation, index, ils_frequency)
+                if approach is not None:
+                    self.ils_receiver.place_on_approach(runway(approach), self.flight_control_unit.speed_digits)
+            if traffic_port is not None:
+                self.traffic = TrafficMonitor(self.simulation, traffic_port, metrics=self.metrics)
+            if publish_telemetry:
+                self.telemetry_publisher = TelemetryPublisher(self.simulation, self.flight_control_unit)
+            if share_state is not None:
+                self.shared_state_writer = SharedStateWriter(self.simulation, self.flight_control_unit, share_state)
+            if record_path is not None:
+                self.flight_recorder = FlightRecorder(self.simulation, self.flight_control_unit, record_path)
+            if record_inputs_path is not None:
+                self.input_recorder = InputRecorder(self.simulation, record_inputs_path)
+            if snapshot_path is not None and os.path.exists(snapshot_path):
+                self.snapshots[Qt.Key_F1] = load_snapshot(snapshot_path)
+                restore_snapshot(self, self.snapshots[Qt.Key_F1])
+            if run_simulation:
+                self.simulation.start()  # Dynamics and autopilot run on their own thread from here on
+        elif replay_path is not None:
+            self.setupFlightControlUnit()
+            self.input_control.flight_control_unit = self.flight_control_unit
+        self.profiler = process_profiler()  # F9 / SIGUSR1 / PFD_PROFILE, idle until then; shared by every display
 
     def setupFlightControlUnit(self):
         from Flight_Control_Unit import FlightControlUnit  # Import here to avoid circular dependency
         self.flight_control_unit = FlightControlUnit(self)
         self.flight_control_unit.show()
 
-    def calculate_turn_rate(self):
-        if self.true_airspeed == 0:
-            return 0  # Prevent division by zero by returning 0 turn rate
-        # Calculate load factor (g-force) during the turn
-        load_factor = 1 / math.cos(math.radians(self.roll))
-        # Adjust the turn rate calculation to include the load factor
-        return (1091 * math.tan(math.radians(self.roll))) / (self.true_airspeed * load_factor)
+    def nav_identifiers(self, table, prefix, limit=20):
+        # Identifier completion for the FCU and the display ('airports', 'runways', 'ils' or 'waypoints')
+        if self.nav_database is None:
+            return []
+        return self.nav_database.prefix(table, prefix, limit)
 
     def update_ap_status(self, active, status):
         self.ap_status = status if active else ""
         self.update()
 
+    def apply_mode_flags(self, flags, selected_heading):
+        # Mirror FCU modes received from another process, using the same visibility rules the FCU applies
+        modes = decode_modes(flags)
+        autopilot_engaged = modes['ap1_active'] or modes['ap2_active']
+        self.selected_heading = selected_heading
+        self.hdg_trk_active = modes['hdg_trk_active']
+        self.ap1_active = modes['ap1_active']
+        self.ap2_active = modes['ap2_active']
+        self.ap_status = 'AP1' if modes['ap1_active'] else 'AP2' if modes['ap2_active'] else ''
+        self.alt_hold_active = modes['alt_hold_active']
+        self.alt_hold_armed = modes['alt_hold_armed']
+        self.loc_active = modes['loc_active']
+        self.appr_active = modes['appr_active']
+        self.show_gs_loc_labels = modes['appr_active']
+        self.localizer_visible = autopilot_engaged and (modes['loc_active'] or modes['appr_active'])
+        self.vertical_deviation_visible = autopilot_engaged and modes['appr_active']
+
     def initUI(self):
         self.setWindowTitle('PFD')
         self.setGeometry(100, 100, 820, 820)
@@ -55,8 +180,26 @@ class PrimaryFlightDisplay(QWidget):
         self.show()
 
     def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F9:
+            self.profiler.toggle('cprofile' if event.modifiers() & Qt.ShiftModifier else 'sample')  # Shift+F9: cProfile
+            return
+        if self.simulation is not None and Qt.Key_F1 <= event.key() <= Qt.Key_F4:
+            self.snapshot_key(event.key(), event.modifiers() & Qt.ShiftModifier)
+            return
         self.input_control.handle_key_press(event)
 
+    def snapshot_key(self, key, save):
+        # Shift+F1-F4 stores the current state in a slot, F1-F4 jumps back to it
+        slot = key - Qt.Key_F1 + 1
+        if save:
+            self.snapshots[key] = take_snapshot(self)
+            if key == Qt.Key_F1 and self.snapshot_path is not None:
+                save_snapshot(self.snapshot_path, self.snapshots[key])
+            print(f"Snapshot {slot} saved at t={self.simulation.state.time:.2f} s")
+        elif key in self.snapshots:
+            restore_snapshot(self, self.snapshots[key])
+            print(f"Snapshot {slot} restored")
+
     def keyReleaseEvent(self, event):
         self.input_control.handle_key_release(event)
 
@@ -64,21 +207,97 @@ class PrimaryFlightDisplay(QWidget):
         self.alt_hold_active = active
         self.update()
 
+    def resizeEvent(self, event):
+        # Lay the instruments out for the new size once; every draw method reads the result
+        self.instrument_layout = self.resources.layout(self.width(), self.height(), self.logicalDpiY())
+        if self.scene_view is not None:
+            self.scene_view.setGeometry(self.rect())
+
     def paintEvent(self, event):
+        if self.scene_view is not None:
+            return  # The graphics view covering the widget draws the instruments
+        start = time.perf_counter()
+        # Read the latest snapshot once so the whole frame is drawn from a consistent state
+        state = self.state_source.state
+        self.pitch = state.pitch
+        self.roll = state.roll
+        self.current_heading = state.heading
+        if self.ils_receiver is not None:
+            self.ils_deviation = self.ils_receiver.deviation
+        if self.traffic is not None:
+            self.traffic_advisories = self.traffic.advisories
         painter = QPainter(self)
-        self.drawFlightModeAnnunciator(painter)
+        if self.layer_compositor is not None:
+            self.layer_compositor.paint(painter)
+        else:
+            self.draw_instruments(painter)
+        if self.latency_probe is not None:
+            self.latency_probe.painted(state)
+        if self.metrics is not None:
+            self.metrics.frame_rendered(time.perf_counter() - start)
+        if self.quality is not None:
+            self.quality.frame_rendered(time.perf_counter() - start)
+
+    def draw_instruments(self, painter):
+        self.draw_instrument(painter, ('annunciator',) + self.annunciator_key(), self.drawFlightModeAnnunciator)
         self.drawHorizon(painter)
         painter.setClipping(False)
         if self.localizer_visible:
-            self.drawLocalizerDeviation(painter)
+            self.draw_instrument(painter, ('localizer',), self.drawLocalizerDeviation)
+            self.draw_localizer_diamond(painter)
         if self.vertical_deviation_visible:
-            self.drawVerticalDeviationScale(painter)
+            self.draw_instrument(painter, ('vertical_deviation',), self.drawVerticalDeviationScale)
+            self.draw_glideslope_diamond(painter)
         self.drawHeadingIndicator(painter)
-        self.drawQNH(painter)  
+        self.draw_instrument(painter, ('qnh',), self.drawQNH)
         #self.drawAirspeedIndicator(painter)  # Call the method to draw airspeed indicator
 
+    def annunciator_key(self):
+        # Everything drawFlightModeAnnunciator reads
+        return (self.ap_status, self.alt_hold_active, self.alt_hold_armed, self.hdg_trk_active, self.show_gs_loc_labels,
+                self.appr_active, self.ap1_active, self.ap2_active, self.traffic_advisories)
+
+    def draw_instrument(self, painter, key, draw):
+        # Instruments that only change with the modes are replayed from a display list recorded for their key, size and quality
+        if self.display_lists is None:
+            draw(painter)
+        else:
+            layout = self.instrument_layout
+            self.display_lists.draw(painter, key + (layout.width, layout.height, layout.dpi, self.quality_level.name), draw)
+
+    def antialias(self, painter, layer):
+        # Every draw method sets this first: the scene backend does not restore painter state between items
+        painter.setRenderHint(QPainter.Antialiasing, layer in self.quality_level.antialiased)
+
     def closeEvent(self, event):
-        self.flight_control_unit.close()
+        if self.simulation is not None:
+            self.simulation.stop()
+        else:
+            self.input_control.close()
+        if self.telemetry_publisher is not None:
+            self.telemetry_publisher.close()
+        if self.shared_state_writer is not None:
+            self.shared_state_writer.close()
+        if self.flight_recorder is not None:
+            self.flight_recorder.close()
+        if self.input_recorder is not None:
+            self.input_recorder.close()
+        if self.flight_control_unit is not None:
+            self.flight_control_unit.close()
+        if self.layer_compositor is not None:
+            print(self.layer_compositor.report())
+        if self.remote_stream is not None:
+            self.remote_stream.close()
+        if self.latency_probe is not None:
+            print(self.latency_probe.report())
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
+        if self.nav_database is not None:
+            self.nav_database.close()
+        if self.traffic is not None:
+            print(self.traffic.statistics())
+            self.traffic.close()
+        self.profiler.stop()  # Keeps what a window still recording has so far
         event.accept()
     
     def toggle_gs_loc_labels(self, active):
@@ -91,302 +310,241 @@ class PrimaryFlightDisplay(QWidget):
         self.update()
 
     def drawAirspeedIndicator(self, painter):
-        container_height = 460
-        indicator_width = 78  # Increased width
-        horizon_center_y = self.height() // 2
-        sky_ground_right_x = self.rect().center().x() - 320  # Closer to the sky/ground
-        container_x = sky_ground_right_x - 42  # Adjust positioning for closeness
-        container_y = horizon_center_y - container_height // 2
+        layout = self.instrument_layout
+        container = layout.airspeed_rect
+        container_x, container_y = container.x(), container.y()
+        indicator_width, container_height = container.width(), container.height()
+        extension = layout.airspeed_extension
 
         # Draw the gray rectangle for the airspeed indicator
         painter.setBrush(QColor("#57606E"))
-        painter.setPen(QPen(QColor("#57606E"), 1))
-        painter.drawRect(container_x, container_y, indicator_width, container_height)
+        painter.setPen(QPen(QColor("#57606E"), layout.pen(1)))
+        painter.drawRect(container)
 
         # Draw white lines on the right side, top, and bottom of the rectangle
-        painter.setPen(QPen(Qt.white, 2))
-        painter.drawLine(container_x + indicator_width, container_y, container_x + indicator_width + 20, container_y)  # Top extended
+        painter.setPen(QPen(Qt.white, layout.pen(2)))
+        painter.drawLine(container_x + indicator_width, container_y, container_x + indicator_width + extension, container_y)  # Top extended
         painter.drawLine(container_x, container_y, container_x + indicator_width, container_y)  # Top
         painter.drawLine(container_x + indicator_width, container_y, container_x + indicator_width, container_y + container_height)  # Right side
         painter.drawLine(container_x, container_y + container_height, container_x + indicator_width, container_y + container_height)  # Bottom
-        painter.drawLine(container_x + indicator_width, container_y + container_height, container_x + indicator_width + 20, container_y + container_height)  # Bottom extended
+        painter.drawLine(container_x + indicator_width, container_y + container_height, container_x + indicator_width + extension, container_y + container_height)  # Bottom extended
 
         # Draw the inverted yellow triangle pointing towards the rectangle, outside of it
-        triangle_height = 15
-        triangle_width = 20
-        triangle_x = container_x + indicator_width + 20  # Move outside the rectangle
+        triangle_width, triangle_height = layout.airspeed_pointer
+        triangle_x = container_x + indicator_width + extension  # Move outside the rectangle
         triangle_y = container_y + container_height // 2 - triangle_height // 2
         points = [QPoint(triangle_x, triangle_y), QPoint(triangle_x - triangle_width, triangle_y + triangle_height // 2), QPoint(triangle_x, triangle_y + triangle_height)]
         painter.setBrush(QColor("yellow"))
-        painter.setPen(QPen(QColor("yellow"), 2))
+        painter.setPen(QPen(QColor("yellow"), layout.pen(2)))
         painter.drawPolygon(QPolygon(points))
 
         # Draw tick marks and numbers for speeds, clipped to the airspeed container
-        clip_path = QPainterPath()
-        clip_path.addRect(container_x, container_y, indicator_width, container_height)
-        painter.setClipPath(clip_path)
-        tick_spacing = 60  # Spacing between tick marks
+        painter.setClipPath(layout.airspeed_clip)
+        tick_spacing = layout.airspeed_tick_spacing  # Spacing between tick marks
         total_ticks = 40 * tick_spacing  # speed with tick_spacing pixels per unit
         scroll_offset = int(self.speed * tick_spacing) % total_ticks
-        painter.setPen(QPen(Qt.white, 3))
-        painter.setFont(QFont("Arial", 14))  # Font size 14
+        painter.setPen(QPen(Qt.white, layout.pen(3)))
+        painter.setFont(layout.airspeed_font)
         for i in range(0, total_ticks, tick_spacing):  # Major tick marks only
             y_pos = int(container_y + container_height - (i - scroll_offset + container_height // 2) % total_ticks)
             if container_y <= y_pos <= container_y + container_height:  # Only draw tick marks within the container
-                painter.drawLine(container_x + indicator_width - 20, y_pos, container_x + indicator_width, y_pos)
+                painter.drawLine(container_x + indicator_width - extension, y_pos, container_x + indicator_width, y_pos)
                 speed_value = (i // tick_spacing) * 10  # Speed in 10 increments
                 number_text = f"{speed_value}"
-                text_offset = len(number_text) * 3  # Adjust text offset for proper centering
-                painter.drawText(int(container_x + 6), int(y_pos + 5), number_text)  # Speed numbers closer to tick marks
+                painter.drawText(container_x + layout.airspeed_digits.x(), y_pos + layout.airspeed_digits.y(), number_text)  # Speed numbers closer to tick marks
         painter.setClipping(False)  # Disable clipping
 
     def drawFlightModeAnnunciator(self, painter):
-        container_width = 850
-        container_height = 76
-        horizon_center_x = self.width() // 2
-        sky_ground_bottom_y = self.rect().center().y() - 324  # The bottom of the sky/ground container
-        container_y = sky_ground_bottom_y - container_height  # Position at the top of the sky/ground container
-        container_x = horizon_center_x - container_width // 2  # Centered with the sky/ground container
-
-        # Calculate spacing and square width
-        square_width = container_width // 5
-        line_thickness = 2
+        layout = self.instrument_layout
+        self.antialias(painter, 'text')
 
         # Draw light gray lines to separate the squares
-        painter.setPen(QPen(QColor("#717171"), line_thickness))
-        for i in range(1, 5):
-            line_x = container_x + i * square_width - line_thickness // 2
-            painter.drawLine(line_x, container_y, line_x, container_y + container_height)
+        painter.setPen(QPen(QColor("#717171"), layout.pen(2)))
+        painter.drawLines(layout.annunciator_separators)
 
         # Draw status squares labels (e.g., SPEED, ALT, HDG) within each square
         labels = ["SPEED", "ALT", " ", " ", self.ap_status if self.ap_status else " "]
+        painter.setFont(layout.annunciator_font)  # Use a readable font for all labels
+        line = layout.annunciator_line
         for i in range(5):
-            rect = QRect(container_x + i * square_width, container_y, square_width, container_height)
-            painter.setFont(QFont("Helvetica", 12))  # Use a readable font for all labels
+            rect = layout.annunciator_columns[i]
 
             if labels[i] == "ALT":
                 if self.alt_hold_active:
-                    painter.setPen(QPen(QColor("#67E159"), 2))  # Set ALT label to green if active
+                    painter.setPen(QPen(QColor("#67E159"), layout.pen(2)))  # Set ALT label to green if active
                 elif self.alt_hold_armed:
-                    painter.setPen(QPen(Qt.white, 2))  # White for armed
+                    painter.setPen(QPen(Qt.white, layout.pen(2)))  # White for armed
                 else:
                     continue  # Skip drawing if ALT HOLD is not armed or active
                 painter.drawText(rect, Qt.AlignTop | Qt.AlignHCenter, labels[i])
 
             elif labels[i] == " " and self.hdg_trk_active and i == 2:
-                painter.setPen(QPen(QColor("#67E159"), 2))  # Set HDG label to green if active
+                painter.setPen(QPen(QColor("#67E159"), layout.pen(2)))  # Set HDG label to green if active
                 painter.drawText(rect, Qt.AlignTop | Qt.AlignHCenter, "HDG")
 
+            elif i == 3 and self.traffic_advisories:
+                painter.setPen(QPen(QColor("#FFBF00"), layout.pen(2)))  # Amber traffic advisory
+                painter.drawText(rect, Qt.AlignTop | Qt.AlignHCenter, "TRAFFIC")
+                if self.traffic_advisories > 1:
+                    painter.drawText(rect.adjusted(0, line, 0, 0), Qt.AlignTop | Qt.AlignHCenter, f"{self.traffic_advisories} TA")
+
             elif i == 4:  # Display AP status and potentially LOC and GS in the last column
-                painter.setPen(QPen(Qt.white, 2))  # White color for text
+                painter.setPen(QPen(Qt.white, layout.pen(2)))  # White color for text
                 painter.drawText(rect, Qt.AlignTop | Qt.AlignHCenter, self.ap_status if self.ap_status else " ")
                 if self.show_gs_loc_labels:
                     loc_color = QColor("#5EFF33") if self.appr_active and (self.ap1_active or self.ap2_active) else Qt.white
                     gs_color = QColor("#5EFF33") if self.appr_active and (self.ap1_active or self.ap2_active) else Qt.white
-                    loc_rect = rect.adjusted(0, 20, 0, 0)
-                    gs_rect = rect.adjusted(0, 40, 0, 0)
-                    painter.setPen(QPen(loc_color, 2))
+                    loc_rect = rect.adjusted(0, line, 0, 0)
+                    gs_rect = rect.adjusted(0, 2 * line, 0, 0)
+                    painter.setPen(QPen(loc_color, layout.pen(2)))
                     painter.drawText(loc_rect, Qt.AlignTop | Qt.AlignHCenter, "LOC")
-                    painter.setPen(QPen(gs_color, 2))
+                    painter.setPen(QPen(gs_color, layout.pen(2)))
                     painter.drawText(gs_rect, Qt.AlignTop | Qt.AlignHCenter, "GS")
             else:
-                painter.setPen(QPen(Qt.white, 2))  # White color for text
+                painter.setPen(QPen(Qt.white, layout.pen(2)))  # White color for text
                 painter.drawText(rect, Qt.AlignTop | Qt.AlignHCenter, labels[i])  # Centered text within the square
 
     def drawQNH(self, painter):
-        container_width = 400
-        horizon_center_x = self.width() // 2
-        sky_ground_bottom_y = self.rect().center().y() + 194  # The bottom of the sky/ground container
-        container_y = sky_ground_bottom_y + 100  # Fixed distance from the sky/ground container
-        container_x = horizon_center_x - container_width // 2 + 60
-        qnh_rect_width = 100
-        qnh_rect_height = 30
-        qnh_rect_x = container_x + container_width + 10  # Positioned to the right of the heading indicator
-        qnh_rect_y = container_y
+        layout = self.instrument_layout
+        self.antialias(painter, 'text')
         painter.setBrush(QColor(1, 1, 1))  # Darker background
         painter.setPen(Qt.NoPen)  # No outline
-        painter.drawRect(qnh_rect_x, qnh_rect_y, qnh_rect_width, qnh_rect_height)
+        painter.drawRect(layout.qnh_rect)
 
         # Draw the QNH label in white and the digits in cyan
-        painter.setPen(QPen(Qt.white, 2))
-        painter.setFont(QFont("Arial", 14))
-        painter.drawText(qnh_rect_x + 5, qnh_rect_y + 20, "QNH")
+        painter.setPen(QPen(Qt.white, layout.pen(2)))
+        painter.setFont(layout.qnh_font)
+        painter.drawText(layout.qnh_label, "QNH")
 
-        painter.setPen(QPen(Qt.cyan, 2))
-        painter.drawText(qnh_rect_x + 64, qnh_rect_y + 20, "1013")  # Adjusted for centering digits within the rectangle
+        painter.setPen(QPen(Qt.cyan, layout.pen(2)))
+        painter.drawText(layout.qnh_digits, "1013")  # Adjusted for centering digits within the rectangle
 
     def drawVerticalDeviationScale(self, painter):
-        container_width = 70
-        container_height = 380
-        horizon_center_x = self.width() // 2
-        # Fixed horizontal distance from the sky/ground container
-        sky_ground_center_x = self.rect().center().x()
-        container_x = sky_ground_center_x + 218  # 218 pixels to the right of the sky/ground container
-        container_y = self.height() // 2 - container_height // 2  # Centered vertically
-
-        # Draw container rectangle (for visual reference)
-        painter.setBrush(Qt.transparent)
-        painter.setPen(QPen(QColor("transparent"), 1, Qt.DashLine))
-        painter.drawRect(container_x, container_y, container_width, container_height)
-
-        # Define positions with spacing within the container
-        circle_radius = 6
-        rectangle_width = 38
-        rectangle_height = 4
-        element_spacing = 70  # Spacing between the elements
-        rect_center_y = container_y + container_height // 2
-        top_circle_center1 = QPoint(container_x + container_width // 2, rect_center_y - rectangle_height // 2 - element_spacing - 2 * circle_radius)
-        top_circle_center2 = QPoint(top_circle_center1.x(), top_circle_center1.y() - element_spacing - 2 * circle_radius)
-        bottom_circle_center1 = QPoint(container_x + container_width // 2, rect_center_y + rectangle_height // 2 + element_spacing + 2 * circle_radius)
-        bottom_circle_center2 = QPoint(bottom_circle_center1.x(), bottom_circle_center1.y() + element_spacing + 2 * circle_radius)
-
-        # Draw top circles
-        painter.setBrush(Qt.transparent)
-        painter.setPen(QPen(QColor("white"), 2))
-        painter.drawEllipse(top_circle_center1, circle_radius, circle_radius)
-        painter.drawEllipse(top_circle_center2, circle_radius, circle_radius)
-
-        # Draw bottom circles
-        painter.drawEllipse(bottom_circle_center1, circle_radius, circle_radius)
-        painter.drawEllipse(bottom_circle_center2, circle_radius, circle_radius)
-
-        # Draw thinner yellow horizontal rectangle at the center between circles
-        rect_top_left = QPoint(container_x + container_width // 2 - rectangle_width // 2, rect_center_y - rectangle_height // 2)
-        painter.setBrush(QColor("yellow"))
-        painter.setPen(QPen(QColor("yellow"), 2))
-        painter.drawRect(rect_top_left.x(), rect_top_left.y(), rectangle_width, rectangle_height)
+        layout = self.instrument_layout
+        self.draw_deviation_scale(painter, layout.glideslope_rect, layout.glideslope_dots, layout.glideslope_bar)
 
     def drawLocalizerDeviation(self, painter):
         if not self.localizer_visible:
             return
-        
-        container_width = 380
-        container_height = 70
-        horizon_center_x = self.width() // 2
-        # Fixed vertical distance from the sky/ground container
-        sky_ground_bottom_y = self.rect().center().y() + 232  # The bottom of the sky/ground container
-        container_y = sky_ground_bottom_y + 20  # 20 pixels below the sky/ground container
-        container_x = horizon_center_x - container_width // 2
+        layout = self.instrument_layout
+        self.draw_deviation_scale(painter, layout.localizer_rect, layout.localizer_dots, layout.localizer_bar)
+
+    def draw_deviation_scale(self, painter, container, dots, bar):
+        layout = self.instrument_layout
+        self.antialias(painter, 'scales')
 
         # Draw container rectangle (for visual reference)
         painter.setBrush(Qt.transparent)
-        painter.setPen(QPen(QColor("transparent"), 1, Qt.DashLine))
-        painter.drawRect(container_x, container_y, container_width, container_height)
-
-        # Define positions with spacing within the container
-        circle_radius = 6
-        rectangle_width = 4
-        rectangle_height = 38 
-        element_spacing = 70  # Spacing between the elements
-
-        rect_center_x = container_x + container_width // 2
-        left_circle_center1 = QPoint(rect_center_x - rectangle_width // 2 - element_spacing - 2 * circle_radius, container_y + container_height // 2)
-        left_circle_center2 = QPoint(left_circle_center1.x() - element_spacing - 2 * circle_radius, left_circle_center1.y())
-        right_circle_center1 = QPoint(rect_center_x + rectangle_width // 2 + element_spacing + 2 * circle_radius, container_y + container_height // 2)
-        right_circle_center2 = QPoint(right_circle_center1.x() + element_spacing + 2 * circle_radius, container_y + container_height // 2)
-
-        # Draw left circles
-        painter.setBrush(Qt.transparent)
-        painter.setPen(QPen(QColor("white"), 2))
-        painter.drawEllipse(left_circle_center1, circle_radius, circle_radius)
-        painter.drawEllipse(left_circle_center2, circle_radius, circle_radius)
+        painter.setPen(QPen(QColor("transparent"), layout.pen(1), Qt.DashLine))
+        painter.drawRect(container)
 
-        # Draw right circles
-        painter.drawEllipse(right_circle_center1, circle_radius, circle_radius)
-        painter.drawEllipse(right_circle_center2, circle_radius, circle_radius)
+        # Draw the circles, two either side of the centre
+        painter.setBrush(Qt.transparent)
+        painter.setPen(QPen(QColor("white"), layout.pen(2)))
+        for dot in dots:
+            painter.drawEllipse(dot, layout.deviation_dot_radius, layout.deviation_dot_radius)
 
-        # Draw thinner yellow vertical rectangle at the center between circles
-        rect_top_left = QPoint(rect_center_x - rectangle_width // 2, container_y + container_height // 2 - rectangle_height // 2)
+        # Draw thinner yellow rectangle at the center between circles
         painter.setBrush(QColor("yellow"))
-        painter.setPen(QPen(QColor("yellow"), 2))
-        painter.drawRect(rect_top_left.x(), rect_top_left.y(), rectangle_width, rectangle_height)
+        painter.setPen(QPen(QColor("yellow"), layout.pen(2)))
+        painter.drawRect(bar)
+
+    def draw_localizer_diamond(self, painter):
+        # Drawn every frame over the cached scale, centred on drawLocalizerDeviation's container
+        if self.ils_deviation is not None:
+            self.draw_deviation_diamond(painter, self.instrument_layout.localizer_center, self.ils_deviation.localizer, True)
+
+    def draw_glideslope_diamond(self, painter):
+        # Centred on drawVerticalDeviationScale's container
+        if self.ils_deviation is not None and self.ils_deviation.glideslope is not None:
+            self.draw_deviation_diamond(painter, self.instrument_layout.glideslope_center, self.ils_deviation.glideslope, False)
+
+    def draw_deviation_diamond(self, painter, center, dots, horizontal):
+        # Magenta diamond dots away from the centre of a scale, held at the outer dot beyond full scale
+        layout = self.instrument_layout
+        offset = round(min(max(dots, -2), 2) * layout.deviation_dot_spacing)
+        half_length, half_width = layout.deviation_diamond
+        if horizontal:
+            x, y, half_width, half_height = center.x() + offset, center.y(), half_length, half_width
+        else:
+            x, y, half_width, half_height = center.x(), center.y() - offset, half_width, half_length  # Up when the glideslope is above
+        points = [QPoint(x - half_width, y), QPoint(x, y - half_height), QPoint(x + half_width, y), QPoint(x, y + half_height)]
+        self.antialias(painter, 'scales')
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(QColor("#FF40FF"), layout.pen(2)))
+        painter.drawPolygon(QPolygon(points))
 
     def drawHeadingIndicator(self, painter):
-        container_width = 410
-        indicator_height = 50
-        horizon_center_x = self.width() // 2
-        sky_ground_bottom_y = self.rect().center().y() + 240  # The bottom of the sky/ground container
-        container_y = sky_ground_bottom_y + 100  # 100 pixels below the sky/ground container
-        container_x = horizon_center_x - container_width // 2
+        layout = self.instrument_layout
+        container = layout.heading_rect
+        container_x, container_y = container.x(), container.y()
+        container_width, indicator_height = container.width(), container.height()
+        self.antialias(painter, 'scales')
 
         # Draw the gray rectangle for the heading indicator/compass scale
         painter.setBrush(QColor("#57606E"))
-        painter.setPen(QPen(QColor("#57606E"), 1))
-        painter.drawRect(container_x, container_y, container_width, indicator_height)
+        painter.setPen(QPen(QColor("#57606E"), layout.pen(1)))
+        painter.drawRect(container)
 
         # Draw white line on top of the tick marks
-        painter.setPen(QPen(Qt.white, 3))
+        painter.setPen(QPen(Qt.white, layout.pen(3)))
         painter.drawLine(container_x, container_y, container_x + container_width, container_y)
 
         # Draw lines on the left and right side of the container
-        painter.setPen(QPen(Qt.white, 1))
+        painter.setPen(QPen(Qt.white, layout.pen(1)))
         painter.drawLine(container_x, container_y, container_x, container_y + indicator_height)
         painter.drawLine(container_x + container_width, container_y, container_x + container_width, container_y + indicator_height)
 
         # Draw the yellow rectangle to indicate the current heading in the middle
-        heading_rect_width = 4
-        heading_rect_height = 30
-        heading_rect_x = container_x + container_width // 2 - heading_rect_width // 2
-        heading_rect_y = container_y - heading_rect_height // 2
         painter.setBrush(QColor("yellow"))
-        painter.setPen(QPen(QColor("yellow"), 2))
-        painter.drawRect(heading_rect_x, heading_rect_y, heading_rect_width, heading_rect_height)
+        painter.setPen(QPen(QColor("yellow"), layout.pen(2)))
+        painter.drawRect(layout.heading_marker)
 
         # Draw tick marks and numbers for degrees, clipped to the heading container
-        clip_path = QPainterPath()
-        clip_path.addRect(container_x, container_y, container_width, indicator_height)
-        painter.setClipPath(clip_path)
-        tick_spacing = 76  # Increased spacing between tick marks
+        painter.setClipPath(layout.heading_clip)
+        tick_spacing = layout.heading_tick_spacing
+        label_step = self.quality_level.heading_label_step  # Numbers on every degree, or fewer at low quality
         total_ticks = 360 * tick_spacing  # 360 degrees with tick_spacing pixels per degree
         scroll_offset = int(self.current_heading * tick_spacing) % total_ticks
-        painter.setPen(QPen(Qt.white, 3))
-        painter.setFont(QFont("Arial", 14))  # Font size 14
+        painter.setPen(QPen(Qt.white, layout.pen(3)))
+        painter.setFont(layout.heading_font)
         for i in range(0, total_ticks, tick_spacing // 2):  # Including small tick marks
             x_pos = int(container_x + (i - scroll_offset + container_width // 2) % total_ticks)
             if container_x <= x_pos <= container_x + container_width:  # Only draw tick marks within the container
                 if i % tick_spacing == 0:  # Major tick marks
-                    painter.drawLine(x_pos, container_y, x_pos, container_y + 20)
+                    painter.drawLine(x_pos, container_y, x_pos, container_y + layout.heading_major_tick)
                     # Calculate the heading value
                     heading_value = (i // tick_spacing) % 360  # Continuously show 0 to 359
-                    number_text = f"{heading_value}"
-                    # Center text based on its length
-                    text_offset = len(number_text) * 5  # Adjust text offset for proper centering
-                    painter.drawText(int(x_pos - text_offset), int(container_y + 47), number_text)
+                    if heading_value % label_step == 0:
+                        number_text = f"{heading_value}"
+                        # Center text based on its length
+                        text_offset = len(number_text) * layout.heading_digit_width
+                        painter.drawText(int(x_pos - text_offset), layout.heading_baseline, number_text)
                 else:  # Small tick marks
-                    painter.setPen(QPen(Qt.white, 2))
-                    painter.drawLine(x_pos, container_y, x_pos, container_y + 10)
+                    painter.setPen(QPen(Qt.white, layout.pen(2)))
+                    painter.drawLine(x_pos, container_y, x_pos, container_y + layout.heading_minor_tick)
         painter.setClipping(False)  # Disable clipping
 
         if self.hdg_trk_active:
             # Draw the heading bug on the right side of the heading indicator's container
-            bug_rect_width = 50
-            bug_rect_height = 30
-            bug_rect_x = container_x + container_width - 30
-            bug_rect_y = container_y + (indicator_height - bug_rect_height) // 2 + 5
             painter.setBrush(QColor(30, 30, 30))  # Darker background
-            painter.setPen(QPen(Qt.white, 1))  # Thin white outline
-            painter.drawRect(bug_rect_x, bug_rect_y, bug_rect_width, bug_rect_height)
+            painter.setPen(QPen(Qt.white, layout.pen(1)))  # Thin white outline
+            painter.drawRect(layout.heading_bug)
             # Draw the selected heading in lighter purple digits
             selected_heading_str = str(self.selected_heading).zfill(3)  # Format heading to three digits
-            painter.setPen(QPen(QColor("#D49BD9"), 2))  # Light purple color
-            painter.setFont(QFont("Arial", 16))
-            text_rect = QRect(bug_rect_x, bug_rect_y, bug_rect_width, bug_rect_height)
-            painter.drawText(text_rect, Qt.AlignCenter, selected_heading_str)  # Center justified inside the rectangle
+            painter.setPen(QPen(QColor("#D49BD9"), layout.pen(2)))  # Light purple color
+            painter.setFont(layout.heading_bug_font)
+            painter.drawText(layout.heading_bug, Qt.AlignCenter, selected_heading_str)  # Center justified inside the rectangle
 
     def drawHorizon(self, painter):
-        rect = self.rect()
-        center = rect.center()
-
-        # Define the radius of the circle
-        circle_radius = 250
+        layout = self.instrument_layout
+        center = layout.center
 
-        # Create the clipping path for the circle container
-        circle_path = QPainterPath()
-        circle_path.addEllipse(center, circle_radius, circle_radius)
-        painter.setClipPath(circle_path)
+        # Clip to the circle container
+        painter.setClipPath(layout.circle_path)
 
         # Draw the horizon
-        self.draw_horizon(painter, center, circle_radius)
+        self.draw_horizon(painter, center, layout.circle_radius)
 
         # Disable clipping path to draw the bank angle arc and tick marks
         painter.setClipping(False)
@@ -394,19 +552,19 @@ class PrimaryFlightDisplay(QWidget):
         self.draw_bank_angle_arc(painter, center.x(), center.y())
         painter.setClipping(True)  # Re-enable clipping path
 
-        # Draw black rectangles on both sides of the circle
-        rect_width = 100  # Width of the rectangles
-        rect_height = 2 * circle_radius  # Height of the rectangles
-
-        left_rect = QRectF(center.x() - circle_radius - 68, center.y() - circle_radius, rect_width, rect_height)
-        right_rect = QRectF(center.x() + circle_radius - 32, center.y() - circle_radius, rect_width, rect_height)
+        self.draw_side_masks(painter, center, layout.circle_radius)
 
+    def draw_side_masks(self, painter, center, circle_radius):
+        # Draw black rectangles on both sides of the circle
+        self.antialias(painter, 'masks')
         painter.setBrush(QColor("black"))
         painter.setPen(Qt.NoPen)
-        painter.drawRect(left_rect)
-        painter.drawRect(right_rect)
+        for rect in self.instrument_layout.side_masks:
+            painter.drawRect(rect)
 
     def draw_horizon(self, painter, center, circle_radius):
+        layout = self.instrument_layout
+        self.antialias(painter, 'attitude')
         width = circle_radius * 2
         height = circle_radius * 2
         center_x = center.x()
@@ -444,16 +602,21 @@ class PrimaryFlightDisplay(QWidget):
         rotated_sky_points = [rotate_point(point, roll_radians, center_x, center_y) for point in sky_points]
         rotated_ground_points = [rotate_point(point, roll_radians, center_x, center_y) for point in ground_points]
 
-        # Create gradient for the sky
-        sky_gradient = QLinearGradient(0, center_y - height + pitch_offset, 0, center_y + pitch_offset)
-        sky_gradient.setColorAt(0, QColor("#3267EC"))  # Top color
-        sky_gradient.setColorAt(0.5, QColor("#417EF0"))  # Bottom color
-        sky_gradient.setColorAt(1, QColor("#5EB8E1"))  # Bottom color
-
-        # Create gradient for the ground
-        ground_gradient = QLinearGradient(0, center_y + pitch_offset, 0, center_y + height + pitch_offset)
-        ground_gradient.setColorAt(0, QColor("#904C1C"))  # Top color
-        ground_gradient.setColorAt(1, QColor("#654321"))  # Bottom color
+        if self.quality_level.gradients:
+            # Create gradient for the sky
+            sky_gradient = QLinearGradient(0, center_y - height + pitch_offset, 0, center_y + pitch_offset)
+            sky_gradient.setColorAt(0, QColor("#3267EC"))  # Top color
+            sky_gradient.setColorAt(0.5, QColor("#417EF0"))  # Bottom color
+            sky_gradient.setColorAt(1, QColor("#5EB8E1"))  # Bottom color
+
+            # Create gradient for the ground
+            ground_gradient = QLinearGradient(0, center_y + pitch_offset, 0, center_y + height + pitch_offset)
+            ground_gradient.setColorAt(0, QColor("#904C1C"))  # Top color
+            ground_gradient.setColorAt(1, QColor("#654321"))  # Bottom color
+        else:
+            # Flat fills when the frame time is short (Render_Quality.py)
+            sky_gradient = QColor(FLAT_SKY)
+            ground_gradient = QColor(FLAT_GROUND)
 
         # Draw the sky with gradient
         painter.setBrush(sky_gradient)
@@ -465,12 +628,12 @@ class PrimaryFlightDisplay(QWidget):
         painter.drawPolygon(QPolygon(rotated_ground_points))
 
         # Draw the separator line between sky and ground
-        painter.setPen(QPen(Qt.white, 2))
+        painter.setPen(QPen(Qt.white, layout.pen(2)))
         painter.drawLine(rotated_sky_points[2], rotated_sky_points[3])
 
          # Draw scrolling major tick marks on the separator line, pointing towards the ground
-        tick_length = 12  # Length of the tick marks
-        tick_spacing = 76  # Match spacing with the heading indicator
+        tick_length = layout.horizon_tick  # Length of the tick marks
+        tick_spacing = layout.heading_tick_spacing  # Match spacing with the heading indicator
         total_ticks = 360 * tick_spacing  # Ensure total ticks cover the same range
         scroll_offset = int(self.current_heading * tick_spacing) % total_ticks
 
@@ -487,48 +650,42 @@ class PrimaryFlightDisplay(QWidget):
 
         # Draw pitch lines and pitch ladder
         self.draw_pitch_lines_and_ladder(painter, center_x, center_y)
+        self.draw_aircraft_symbol(painter, center_x, center_y)
 
-        # Define the L-shaped plane outline points
-        left_L = [
-            QPoint(center_x - 208, center_y - 8), QPoint(center_x - 124, center_y - 8),
-            QPoint(center_x - 124, center_y - 8), QPoint(center_x - 114, center_y - 8),
-            QPoint(center_x - 114, center_y + 34), QPoint(center_x - 130, center_y + 34),
-            QPoint(center_x - 130, center_y + 8), QPoint(center_x - 208, center_y + 8)
-        ]
-
-        right_L = [
-            QPoint(center_x + 208, center_y - 8), QPoint(center_x + 124, center_y - 8),
-            QPoint(center_x + 124, center_y - 8), QPoint(center_x + 114, center_y - 8),
-            QPoint(center_x + 114, center_y + 34), QPoint(center_x + 130, center_y + 34),
-            QPoint(center_x + 130, center_y + 8), QPoint(center_x + 208, center_y + 8)
-        ]
-
-        # Draw plane outline
-        painter.setPen(QPen(QColor("yellow"), 4))
+    def draw_aircraft_symbol(self, painter, center_x, center_y):
+        # The L-shaped wings and the centre square, in yellow outline
+        layout = self.instrument_layout
+        self.antialias(painter, 'attitude')
+        painter.setPen(QPen(QColor("yellow"), layout.pen(4)))
         painter.setBrush(QColor("black"))
-        painter.drawPolygon(QPolygon(left_L))
-        painter.drawPolygon(QPolygon(right_L))
-
-        # Draw smaller square at the center
-        square_size = 16
-        painter.drawRect(center_x - square_size // 2, center_y - square_size // 2, square_size, square_size)
+        for wing in layout.aircraft_wings:
+            painter.drawPolygon(wing)
+        painter.drawRect(layout.aircraft_square)
 
     def draw_pitch_lines_and_ladder(self, painter, center_x, center_y):
+        layout = self.instrument_layout
         pitch_angles = [-30, -27.5, -25, -22.5, -20, -17.5, -15, -12.5, -10, -7.5, -5, -2.5, 2.5, 5, 7.5, 10, 12.5, 15, 17.5, 20, 22.5, 25, 27.5, 30]
-        ellipse_radius = 250
-        fade_start_distance = ellipse_radius * 0.56  # Start fading at 56% of the radius
+        ellipse_radius = layout.circle_radius
+        fade_start_distance = layout.pitch_fade_start
+        edge_fade = layout.pitch_edge_fade
+        left_label, right_label, label_drop = layout.pitch_labels
+        full_ladder = self.quality_level.full_ladder  # Otherwise only the 5 and 10 degree lines
+        self.antialias(painter, 'attitude')
 
         # Define the top and bottom limits for the pitch ladder
-        top_limit = center_y - 186  # Adjust this value as needed
-        bottom_limit = center_y + 186  # Adjust this value as needed
+        top_limit = center_y - layout.pitch_limit
+        bottom_limit = center_y + layout.pitch_limit
 
         painter.save()
         painter.translate(center_x, center_y)
         painter.rotate(self.roll)
         painter.translate(-center_x, -center_y)
+        painter.setFont(layout.pitch_font)
 
         for i, pitch in enumerate(pitch_angles):
-            y = int(center_y - (pitch + self.pitch) * 10)  # Controls vertical spacing between lines
+            if not full_ladder and pitch % 5 != 0:
+                continue
+            y = int(center_y - (pitch + self.pitch) * layout.pitch_scale)  # Controls vertical spacing between lines
 
             # Skip drawing lines outside the top and bottom limits
             if y < top_limit or y > bottom_limit:
@@ -541,23 +698,20 @@ class PrimaryFlightDisplay(QWidget):
                 fade_factor = max(0, 1 - (distance_from_center - fade_start_distance) / (ellipse_radius - fade_start_distance))
 
             # Adjust fade factor based on proximity to the top and bottom limits
-            if y < top_limit + 20:
-                fade_factor *= (y - top_limit) / 20
-            elif y > bottom_limit - 20:
-                fade_factor *= (bottom_limit - y) / 20
+            if y < top_limit + edge_fade:
+                fade_factor *= (y - top_limit) / edge_fade
+            elif y > bottom_limit - edge_fade:
+                fade_factor *= (bottom_limit - y) / edge_fade
 
-            line_length = int(64 * fade_factor)  # Pitch line length
+            line_length = int(layout.pitch_line * fade_factor)  # Pitch line length
             opacity = int(255 * fade_factor)
 
-            painter.setPen(QPen(QColor(255, 255, 255, opacity), 3))
-            font = QFont()
-            font.setPointSize(18)  # Increase font size
-            painter.setFont(font)
+            painter.setPen(QPen(QColor(255, 255, 255, opacity), layout.pen(3)))
 
             if pitch % 10 == 0:  # Long lines with labels
                 painter.drawLine(center_x - line_length, y, center_x + line_length, y)
-                painter.drawText(center_x - 118, y + 10, f"{abs(pitch):>3}")  # Move numbers closer
-                painter.drawText(center_x + 78, y + 10, f"{abs(pitch):<3}")  # Move numbers closer
+                painter.drawText(center_x - left_label, y + label_drop, f"{abs(pitch):>3}")  # Move numbers closer
+                painter.drawText(center_x + right_label, y + label_drop, f"{abs(pitch):<3}")  # Move numbers closer
             elif pitch % 5 == 0:  # Medium lines
                 painter.drawLine(center_x - int(line_length // 2), y, center_x + int(line_length // 2), y)
             else:  # Short lines
@@ -566,119 +720,103 @@ class PrimaryFlightDisplay(QWidget):
         painter.restore()
 
     def draw_bank_angle_arc(self, painter, center_x, center_y):
-        # Define the radius of the circle
-        circle_radius = 250
+        self.draw_bank_scale(painter, center_x, center_y)
 
-        # Create the clipping path for the circle
-        circle_path = QPainterPath()
-        circle_path.addEllipse(center_x - circle_radius, center_y - circle_radius, 2 * circle_radius, 2 * circle_radius)
-
-        # Draw the arc at the top of the container circle
-        arc_rect = QRectF(center_x - 250, center_y - 250, 500, 500)
-        painter.setPen(QPen(QColor("white"), 3))
-        painter.drawArc(arc_rect, 60 * 16, 60 * 16)  # Draw arc from -30 to +30 degrees
-
-        # Draw tick marks for bank angles (rotated rectangles)
-        for angle in range(-30, 31, 10):
-            tick_length = 18  # Adjust rectangles' size
-            tick_angle = math.radians(angle - 90)  # Adjust angle to align with the top arc
-            x1 = center_x + 268 * math.cos(tick_angle)
-            y1 = center_y + 268 * math.sin(tick_angle)
-            x2 = center_x + (268 - tick_length) * math.cos(tick_angle)
-            y2 = center_y + (268 - tick_length) * math.sin(tick_angle)
-
-            if angle == 0:
-                # Define points for the inverted yellow triangle
-                triangle_points = [
-                    QPoint(int((x1 + x2) / 2), int(y2)),
-                    QPoint(int((x1 + x2) / 2 - 16), int(y1 - 4)),
-                    QPoint(int((x1 + x2) / 2 + 16), int(y1 - 4))
-                ]
-                painter.setPen(QPen(QColor("yellow"), 3))
-                painter.setBrush(Qt.NoBrush)
-                painter.drawPolygon(QPolygon(triangle_points))
-            else:
-                # Define the rectangle for the tick mark
-                rect_width = 12  # Width of the rectangle
-                painter.setPen(QPen(QColor("white"), 3))
-                if angle == -30 or angle == 30:
-                    rect_height = abs(y1 - y2) + 8  # Increase height by 10 units
-                    y1_adjusted = y1 - 5  # Adjust y-coordinate to keep the tick mark within the arc
-                    y2_adjusted = y2 - 5  # Adjust y-coordinate to keep the tick mark within the arc
-                else:
-                    rect_height = abs(y1 - y2)  # Height of the rectangle
-                    y1_adjusted = y1
-                    y2_adjusted = y2
-                rect_center_x = (x1 + x2) / 2
-                rect_center_y = (y1_adjusted + y2_adjusted) / 2
-
-                # Create the rectangle centered on the arc
-                rect = QRectF(rect_center_x - rect_width / 2, rect_center_y - rect_height / 2, rect_width, rect_height)
-
-                # Create a QTransform object to apply rotation
-                transform = QTransform()
-                transform.translate(rect_center_x, rect_center_y)
-                transform.rotate(angle)
-                transform.translate(-rect_center_x, -rect_center_y)
-
-                # Apply the transformation and draw the rectangle with no fill
-                painter.setTransform(transform)
-                painter.setBrush(Qt.NoBrush)
-                painter.drawRect(rect)
-                painter.resetTransform()  # Reset transformation for the next tick mark
-
-        # Apply the clipping path for the lines
-        painter.setClipPath(circle_path)
+        # Apply the clipping path of the circle for the lines, aliased so the side masks still cover its edge
+        self.antialias(painter, 'masks')
+        painter.setClipPath(self.instrument_layout.circle_path)
 
         # Draw the moving trapezoid and triangle as a single unit
         painter.save()
         painter.translate(center_x, center_y)
         painter.rotate(self.roll)
         painter.translate(-center_x, -center_y)
+        self.draw_roll_pointer(painter, center_x, center_y, self.instrument_layout.circle_radius)
+        painter.restore()
 
-        # Define points for the inverted trapezoid at the top (Slip)
-        trapezoid_points = [
-            QPoint(center_x - 22, center_y - circle_radius + 38),
-            QPoint(center_x + 22, center_y - circle_radius + 38),
-            QPoint(center_x + 30, center_y - circle_radius + 50),
-            QPoint(center_x - 30, center_y - circle_radius + 50)
-        ]
-
-        # Define points for the triangle at the top (Sky Pointer)
-        triangle_points = [
-            QPoint(center_x, center_y - circle_radius + 6),
-            QPoint(center_x - 18, center_y - circle_radius + 32),
-            QPoint(center_x + 18, center_y - circle_radius + 32)
-        ]
+    def draw_bank_scale(self, painter, center_x, center_y):
+        layout = self.instrument_layout
+        self.antialias(painter, 'bank')
+        # Draw the arc at the top of the container circle
+        painter.setPen(QPen(QColor("white"), layout.pen(3)))
+        painter.drawArc(layout.bank_arc, 60 * 16, 60 * 16)  # Draw arc from -30 to +30 degrees
 
-        # Draw the trapezoid and triangle with yellow outline and no fill
-        painter.setPen(QPen(QColor("yellow"), 3))
+        # Draw the tick marks for bank angles (rotated rectangles) with no fill
+        painter.setBrush(Qt.NoBrush)
+        for rect, transform in layout.bank_ticks:
+            painter.save()
+            painter.setTransform(transform, True)
+            painter.drawRect(rect)
+            painter.restore()  # Back to the untransformed painter for the next tick mark
+
+        # The inverted yellow triangle at zero bank
+        painter.setPen(QPen(QColor("yellow"), layout.pen(3)))
+        painter.drawPolygon(layout.bank_triangle)
+
+    def draw_roll_pointer(self, painter, center_x, center_y, circle_radius):
+        # Draw the slip trapezoid and the sky pointer triangle with yellow outline and no fill
+        layout = self.instrument_layout
+        self.antialias(painter, 'bank')
+        painter.setPen(QPen(QColor("yellow"), layout.pen(3)))
         painter.setBrush(Qt.NoBrush)
-        painter.drawPolygon(QPolygon(trapezoid_points))
-        painter.drawPolygon(QPolygon(triangle_points))
+        painter.drawPolygon(layout.roll_trapezoid)
+        painter.drawPolygon(layout.roll_triangle)
 
         # Draw the horizontal yellow line
-        line_y = center_y - 188
-        painter.setPen(QPen(QColor("yellow"), 3)) 
-        painter.drawLine(center_x - 200, line_y, center_x + 200, line_y)
+        yellow_line, white_line = layout.reference_lines
+        painter.drawLine(yellow_line)
 
         # Draw the horizontal white line
-        white_line_y = center_y + 188
-        painter.setPen(QPen(QColor("white"), 3))
-        painter.drawLine(center_x - 176, white_line_y, center_x + 176, white_line_y)
-
-        painter.restore()
+        painter.setPen(QPen(QColor("white"), layout.pen(3)))
+        painter.drawLine(white_line)
 
     def update_horizon(self):
-        if self.roll != 0:
-            # Calculate turn rate based on bank angle (roll) and true airspeed
-            turn_rate = self.calculate_turn_rate()
-            # Update heading based on the turn rate
-            self.current_heading = (self.current_heading - turn_rate * 0.01) % 360  # Adjust 0.01 based on simulation speed multiplier
-        self.update()
+        # Heading is integrated by the simulation thread (or the external simulator); repaint with its latest snapshot
+        if self.metrics is not None:
+            self.metrics.timer_fired('update_horizon')
+        if self.quality is not None:
+            self.quality.tick()
+        if self.scene_view is not None:
+            self.scene_view.sync()
+        else:
+            self.update()
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    horizon = PrimaryFlightDisplay()
+    parser = argparse.ArgumentParser(description='Primary Flight Display')
+    parser.add_argument('--udp', type=int, metavar='PORT', help='Display flight state received on this local UDP port instead of the built-in simulation')
+    parser.add_argument('--publish', action='store_true', help='Broadcast the full simulation state over UDP multicast for other processes')
+    parser.add_argument('--share', metavar='NAME', help='Place the simulation state in this shared memory segment for repeater displays')
+    parser.add_argument('--attach', metavar='NAME', help='Display the state of a simulation sharing this segment instead of running one')
+    parser.add_argument('--record', metavar='PATH', help='Record the simulation and FCU state every tick to this flight data file')
+    parser.add_argument('--replay', metavar='PATH', help='Play back a flight data file (Space pause, Up/Down speed, Left/Right step or skip, Home/End)')
+    parser.add_argument('--find', metavar='QUERY', help="With --replay, mark the results of a query such as '|roll| > 25' (N/P to jump)")
+    parser.add_argument('--record-inputs', metavar='PATH', help='Log keyboard and FCU inputs with their simulation tick, for replay with Input_Recorder.py')
+    parser.add_argument('--snapshot', metavar='PATH', help='Start from this snapshot file; Shift+F1 overwrites it (Shift+F1-F4 save, F1-F4 restore)')
+    parser.add_argument('--backend', choices=['widget', 'scene'], default='widget', help='Draw with QPainter in paintEvent (widget) or with cached QGraphicsItems (scene)')
+    parser.add_argument('--stream', type=int, metavar='PORT', help='Serve the display to browsers on http://127.0.0.1:PORT/ (tile-diff WebSocket stream)')
+    parser.add_argument('--metrics', type=int, metavar='PORT', help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--latency', action='store_true', help='Time inputs (keys, heading knob, UDP) to the first frame showing them; report printed on close')
+    parser.add_argument('--nav-data', metavar='PATH', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Navigation', 'Runways.csv'),
+                        help='Runway CSV or navigation database (Nav_Database.py convert) for the ILS deviation (default: the bundled sample)')
+    parser.add_argument('--ils', type=float, metavar='MHZ', help='Tune this ILS frequency instead of receiving the nearest ILS')
+    parser.add_argument('--approach', metavar='AIRPORT/RUNWAY', help='Start on an 8 NM final to this runway, e.g. EGLL/27R')
+    parser.add_argument('--traffic', type=int, metavar='PORT', help='Receive traffic reports on this local UDP port (Traffic_Sender.py) and annunciate traffic advisories')
+    parser.add_argument('--quality', choices=['auto'] + LEVEL_NAMES, default='auto',
+                        help='Render quality level, or auto to step between them with the measured frame time (default: auto)')
+    parser.add_argument('--best-quality', choices=LEVEL_NAMES, default='standard',
+                        help='Auto quality: highest level to step up to; above standard is antialiased (default: standard)')
+    parser.add_argument('--threaded-layers', action='store_true', help='Widget backend: draw the instrument layers on a thread pool and composite them (timings printed on close)')
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    horizon = PrimaryFlightDisplay(telemetry_port=args.udp, publish_telemetry=args.publish,
+                                   attach_state=args.attach, share_state=args.share, record_path=args.record,
+                                   replay_path=args.replay, record_inputs_path=args.record_inputs,
+                                   snapshot_path=args.snapshot, backend=args.backend,
+                                   threaded_layers=args.threaded_layers, stream_port=args.stream,
+                                   latency_probe=args.latency, metrics_port=args.metrics,
+                                   nav_data=args.nav_data, ils_frequency=args.ils, approach=args.approach,
+                                   traffic_port=args.traffic, quality=args.quality, best_quality=args.best_quality)
+    if args.replay and args.find:
+        horizon.input_control.set_marks(parse_query(args.find)(horizon.input_control.recording))
     app.lastWindowClosed.connect(app.quit)
     sys.exit(app.exec_())
\ No newline at end of file
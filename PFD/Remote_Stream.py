@@ -0,0 +1,377 @@
+import argparse
+import base64
+import hashlib
+import queue
+import socket
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QTimer
+from PyQt5.QtGui import QImage
+
+# Streams the rendered display to browsers over a WebSocket. Each frame is cut into square tiles; a client gets
+# a keyframe with every tile, then only the tiles whose hash differs from what it already has, each compressed
+# with zlib. Frame message, little-endian, 18 bytes followed by the tiles:
+#
+#   offset  size  type     field
+#   0       4     char[4]  magic b'PFDT'
+#   4       1     uint8    format version, currently 1
+#   5       1     uint8    kind, 0 keyframe, 1 delta
+#   6       2     uint16   frame width in pixels
+#   8       2     uint16   frame height in pixels
+#   10      2     uint16   tile size in pixels, edge tiles are cut to the frame
+#   12      2     uint16   number of tiles in this message
+#   14      4     uint32   frame number
+#
+# Each tile is a 6-byte header (uint16 tile index in row-major order, uint32 compressed length) followed by
+# the zlib-compressed RGBA rows of the tile. The browser acknowledges every frame it has drawn; the server keeps
+# at most STREAM_WINDOW frames unacknowledged per client and renders only while some client is waiting, so the
+# frame rate follows the clients and a slow one never holds up the display or the others.
+FRAME_MAGIC = b'PFDT'
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<4sBBHHHHI')
+TILE_HEADER = struct.Struct('<HI')
+KEYFRAME = 0
+DELTA = 1
+STREAM_WINDOW = 2
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><title>PFD repeater</title><style>body { margin: 0; background: #000; } canvas { display: block; margin: auto; }</style></head>
+<body><canvas id="pfd"></canvas><script>
+const canvas = document.getElementById('pfd');
+const context = canvas.getContext('2d');
+let pending = Promise.resolve();
+
+async function inflate(bytes) {
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    return new Uint8ClampedArray(await new Response(stream).arrayBuffer());
+}
+
+async function draw(buffer) {
+    const view = new DataView(buffer);
+    const kind = view.getUint8(5), width = view.getUint16(6, true), height = view.getUint16(8, true);
+    const tileSize = view.getUint16(10, true), count = view.getUint16(12, true);
+    if (kind === 0 && (canvas.width !== width || canvas.height !== height)) {
+        canvas.width = width;
+        canvas.height = height;
+    }
+    const columns = Math.ceil(width / tileSize);
+    const tiles = [];
+    let offset = 18;
+    for (let i = 0; i < count; i++) {
+        const index = view.getUint16(offset, true), length = view.getUint32(offset + 2, true);
+        tiles.push([index, new Uint8Array(buffer, offset + 6, length)]);
+        offset += 6 + length;
+    }
+    const pixels = await Promise.all(tiles.map(([index, data]) => inflate(data)));
+    tiles.forEach(([index], i) => {
+        const x = (index % columns) * tileSize, y = Math.floor(index / columns) * tileSize;
+        context.putImageData(new ImageData(pixels[i], Math.min(tileSize, width - x)), x, y);
+    });
+}
+
+function connect() {
+    const socket = new WebSocket(`ws://${location.host}/stream`);
+    socket.binaryType = 'arraybuffer';
+    socket.onmessage = event => {
+        pending = pending.then(() => draw(event.data)).then(() => socket.send('ack'));
+    };
+    socket.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script></body></html>
+"""
+
+class TileHasher:
+    # 64-bit hash per tile: every pixel times a fixed random odd weight, summed per tile modulo 2**64.
+    # A handful of numpy passes over the frame instead of copying and hashing each tile.
+    def __init__(self, tile_size):
+        self.tile_size = tile_size
+        self.weights = None
+
+    def hashes(self, pixels):
+        height, width = pixels.shape[:2]
+        if self.weights is None or self.weights.shape != (height, width):
+            self.weights = np.random.default_rng(0).integers(0, 2**64, (height, width), dtype=np.uint64, endpoint=False) | np.uint64(1)
+        words = pixels.view(np.uint32).reshape(height, width).astype(np.uint64)
+        words *= self.weights  # Wraps around, as intended
+        sums = np.add.reduceat(words, np.arange(0, height, self.tile_size), axis=0)
+        return np.add.reduceat(sums, np.arange(0, width, self.tile_size), axis=1).ravel()
+
+class Frame:
+    def __init__(self, number, pixels, tile_size, hashes):
+        self.number = number
+        self.pixels = pixels  # height x width x BGRA, as captured
+        self.tile_size = tile_size
+        self.height, self.width = pixels.shape[:2]
+        self.columns = -(-self.width // tile_size)
+        self.hashes = hashes
+        self.compressed = {}  # Tile index -> zlib data, shared by every client sending this frame
+        self.lock = threading.Lock()
+
+    def tile(self, index):
+        row, column = divmod(index, self.columns)
+        size = self.tile_size
+        return self.pixels[row * size:(row + 1) * size, column * size:(column + 1) * size]
+
+    def compressed_tile(self, index):
+        with self.lock:
+            data = self.compressed.get(index)
+            if data is None:
+                data = zlib.compress(self.tile(index)[:, :, [2, 1, 0, 3]].tobytes(), 1)  # RGBA for the browser's ImageData
+                self.compressed[index] = data
+        return data
+
+def encode_frame(frame, sent_hashes, sent_size):
+    # Message with the tiles the client lacks; sent_hashes is None for a client that has nothing yet.
+    # A resize sends a keyframe even when the tile grid stays the same, since the page only resizes its canvas on one.
+    if sent_hashes is None or (frame.width, frame.height) != sent_size:
+        kind, changed = KEYFRAME, range(len(frame.hashes))
+    else:
+        kind, changed = DELTA, np.flatnonzero(sent_hashes != frame.hashes).tolist()
+    parts = [FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, kind, frame.width, frame.height, frame.tile_size,
+                               len(changed), frame.number % 2**32)]
+    for index in changed:
+        data = frame.compressed_tile(index)
+        parts.append(TILE_HEADER.pack(index, len(data)))
+        parts.append(data)
+    return b''.join(parts), len(changed)
+
+def capture_pixels(display, image):
+    # GUI thread: render the display into image (Format_RGB32, the display's size) and copy out the BGRA pixels
+    display.render(image)
+    bits = image.constBits().asarray(image.sizeInBytes())
+    return np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)[:, :image.width()].copy()
+
+def websocket_header(opcode, length):
+    if length < 126:
+        return struct.pack('!BB', 0x80 | opcode, length)
+    if length < 2**16:
+        return struct.pack('!BBH', 0x80 | opcode, 126, length)
+    return struct.pack('!BBQ', 0x80 | opcode, 127, length)
+
+def read_websocket_message(stream):
+    # Returns (opcode, payload) of the next client frame, or (None, b'') once the connection is gone
+    header = stream.read(2)
+    if len(header) < 2:
+        return None, b''
+    opcode, length = header[0] & 0x0F, header[1] & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', stream.read(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', stream.read(8))
+    mask = stream.read(4) if header[1] & 0x80 else b'\0\0\0\0'  # Browsers always mask
+    payload = stream.read(length)
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+class StreamClient:
+    def __init__(self, address):
+        self.address = address
+        self.frames = 0  # Messages sent
+        self.skipped = 0  # Frames rendered while this client was busy
+        self.tiles = 0
+        self.bytes = 0
+        self.connected = time.monotonic()
+
+class StreamRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Browsers refuse a WebSocket upgrade answered in HTTP/1.0
+
+    def do_GET(self):
+        if self.path == '/':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == '/stream' and self.headers.get('Upgrade', '').lower() == 'websocket':
+            accept = base64.b64encode(hashlib.sha1(self.headers['Sec-WebSocket-Key'].encode() + WEBSOCKET_GUID).digest())
+            self.send_response(101)
+            self.send_header('Upgrade', 'websocket')
+            self.send_header('Connection', 'Upgrade')
+            self.send_header('Sec-WebSocket-Accept', accept.decode())
+            self.end_headers()
+            self.wfile.flush()
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                self.server.remote_stream.serve_client(self)
+            except OSError:
+                pass  # The browser went away
+        else:
+            self.send_error(404)
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionError:
+            pass  # Browsers drop idle keep-alive connections without notice
+
+    def log_message(self, format, *args):
+        pass
+
+class RemoteStream(QObject):
+    def __init__(self, primary_flight_display, port, host='127.0.0.1', max_fps=30, tile_size=64):
+        super().__init__()
+        self.primary_flight_display = primary_flight_display
+        self.tile_size = tile_size
+        self.image = None
+        self.frame = None  # Newest hashed frame
+        self.frame_ready = threading.Condition()
+        self.frame_wanted = threading.Event()  # Set by clients ready for a frame; nothing is rendered while clear
+        self.captures = queue.Queue(maxsize=1)  # Newest captured pixels for the hashing thread
+        self.clients = []
+        self.frames_captured = 0
+        self.closed = False
+
+        self.server = ThreadingHTTPServer((host, port), StreamRequestHandler)
+        self.server.daemon_threads = True
+        self.server.remote_stream = self
+        threading.Thread(target=self.server.serve_forever, name='stream-server', daemon=True).start()
+        threading.Thread(target=self.hash_frames, name='stream-hashing', daemon=True).start()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.capture)
+        self.timer.start(int(1000 / max_fps))
+        print(f"Streaming the display on http://{host}:{self.server.server_address[1]}/")
+
+    def capture(self):
+        # GUI thread, at most max_fps: render only when a client has room for another frame
+        if not self.frame_wanted.is_set():
+            return
+        self.frame_wanted.clear()
+        display = self.primary_flight_display
+        if self.image is None or self.image.size() != display.size():
+            self.image = QImage(display.size(), QImage.Format_RGB32)
+        pixels = capture_pixels(display, self.image)
+        self.frames_captured += 1
+        try:
+            self.captures.get_nowait()  # Not hashed yet, superseded by this one
+        except queue.Empty:
+            pass
+        self.captures.put_nowait(pixels)
+
+    def hash_frames(self):
+        hasher = TileHasher(self.tile_size)
+        number = 0
+        while True:
+            pixels = self.captures.get()
+            if pixels is None:
+                break
+            number += 1
+            frame = Frame(number, pixels, self.tile_size, hasher.hashes(pixels))
+            with self.frame_ready:
+                self.frame = frame
+                self.frame_ready.notify_all()
+
+    def serve_client(self, handler):
+        client = StreamClient(handler.client_address)
+        self.clients.append(client)
+        sent_hashes = sent_size = None
+        sent_number = 0
+        in_flight = 0
+        try:
+            while not self.closed:
+                if in_flight >= STREAM_WINDOW:
+                    opcode, _ = read_websocket_message(handler.rfile)  # Blocks this client only
+                    if opcode is None or opcode == 0x8:
+                        break
+                    if opcode in (0x1, 0x2):
+                        in_flight -= 1
+                    continue
+                self.frame_wanted.set()
+                with self.frame_ready:
+                    self.frame_ready.wait_for(lambda: self.closed or (self.frame is not None and self.frame.number > sent_number), 1.0)
+                    frame = self.frame
+                if frame is None or frame.number <= sent_number:
+                    continue
+                client.skipped += max(0, frame.number - sent_number - 1) if sent_hashes is not None else 0
+                sent_number = frame.number
+                message, tiles = encode_frame(frame, sent_hashes, sent_size)
+                sent_hashes, sent_size = frame.hashes, (frame.width, frame.height)
+                if tiles == 0:
+                    continue  # Nothing changed on screen
+                handler.connection.sendall(websocket_header(0x2, len(message)) + message)
+                in_flight += 1
+                client.frames += 1
+                client.tiles += tiles
+                client.bytes += len(message)
+        finally:
+            self.clients.remove(client)
+
+    def statistics(self):
+        return {
+            'captured': self.frames_captured,
+            'clients': [{'address': f"{client.address[0]}:{client.address[1]}", 'frames': client.frames,
+                         'skipped': client.skipped, 'tiles': client.tiles, 'bytes': client.bytes}
+                        for client in list(self.clients)],
+        }
+
+    def close(self):
+        self.timer.stop()
+        self.closed = True
+        with self.frame_ready:
+            self.frame_ready.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+        try:
+            self.captures.get_nowait()
+        except queue.Empty:
+            pass
+        self.captures.put_nowait(None)
+
+def jpeg_size(image, quality):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'JPG', quality)
+    return data.size()
+
+def compare(frames, tile_size, quality):
+    # Bytes and encode time per frame: tile diff against full-frame JPEG, in cruise and while manoeuvring
+    from Render_Benchmark import create_application, create_display, flight_states
+    from Simulation import FlightState
+    app = create_application()
+    display = create_display('widget')
+    image = QImage(display.size(), QImage.Format_RGB32)
+    sequences = {
+        'cruise': [FlightState(i, i / 100, 2.0, 0.0, (120 + i * 0.05) % 360) for i in range(frames)],
+        'manoeuvring': flight_states(frames),
+    }
+    print(f"{display.width()}x{display.height()}, {tile_size} px tiles, JPEG quality {quality}, {frames} frames")
+    for name, states in sequences.items():
+        tile_bytes = jpeg_bytes = tiles = 0
+        tile_time = jpeg_time = 0.0
+        hasher = TileHasher(tile_size)
+        sent_hashes = sent_size = None
+        for number, state in enumerate(states, 1):
+            display.simulation.state = state
+            display.update_horizon()
+            pixels = capture_pixels(display, image)
+            start = time.perf_counter()
+            frame = Frame(number, pixels, tile_size, hasher.hashes(pixels))
+            message, changed = encode_frame(frame, sent_hashes, sent_size)
+            tile_time += time.perf_counter() - start
+            sent_hashes, sent_size = frame.hashes, (frame.width, frame.height)
+            if number > 1:  # Every client pays for the keyframe once
+                tile_bytes += len(message) if changed else 0
+                tiles += changed
+            start = time.perf_counter()
+            size = jpeg_size(image, quality)
+            jpeg_time += time.perf_counter() - start
+            if number > 1:
+                jpeg_bytes += size
+        count = len(states) - 1
+        print(f"[{name}]")
+        print(f"  tiles  {tile_bytes / count / 1024:7.1f} KiB/frame  {tile_time / len(states) * 1000:6.2f} ms encode  {tiles / count:5.1f} of {len(frame.hashes)} tiles")
+        print(f"  jpeg   {jpeg_bytes / count / 1024:7.1f} KiB/frame  {jpeg_time / len(states) * 1000:6.2f} ms encode")
+    return app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare tile-diff streaming with full-frame JPEG (stream with Primary_Flight_Display.py --stream PORT)')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--tile-size', type=int, default=64)
+    parser.add_argument('--quality', type=int, default=75, help='JPEG quality')
+    args = parser.parse_args()
+    compare(args.frames, args.tile_size, args.quality)
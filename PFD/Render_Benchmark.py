@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from Simulation import FlightState
+from Snapshot import restore_snapshot, take_snapshot
+
+# Renders the same flight states with every display backend, compares the frames pixel by pixel against
+# the immediate backend (PrimaryFlightDisplay.paintEvent drawing everything itself) and reports the time
+# per frame of each backend:
+#   render   the whole display into an image, every instrument painted
+#   live     the display's own repaint of what changed (update_horizon, then the pending paint events),
+#            while manoeuvring and with a steady attitude where only the heading moves
+# The threaded backend must match the immediate one exactly; its per-layer timings are printed at the end.
+BACKENDS = ['immediate', 'widget', 'scene', 'threaded']  # immediate: the widget backend without display lists
+MODE_SEQUENCES = {  # FCU buttons pressed, in order, to reach each mode combination
+    'manual': [],
+    'ap1': ['toggle_ap1'],
+    'ap1 hdg': ['toggle_ap1', 'toggle_hdg_trk'],
+    'ap1 hdg appr': ['toggle_ap1', 'toggle_hdg_trk', 'toggle_appr_visibility'],
+    'ap2 alt loc': ['toggle_alt_hold', 'toggle_loc_visibility', 'toggle_ap2'],
+}
+
+def create_display(backend):
+    from Primary_Flight_Display import PrimaryFlightDisplay
+    if backend == 'immediate':
+        return PrimaryFlightDisplay(run_simulation=False, display_lists=False)
+    if backend == 'threaded':
+        return PrimaryFlightDisplay(run_simulation=False, threaded_layers=True)
+    return PrimaryFlightDisplay(run_simulation=False, backend=backend)
+
+def create_application():
+    # Keep the returned application referenced; the displays are deleted along with it
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+def flight_states(count):
+    # A deterministic sweep over pitch, roll and heading
+    return [FlightState(i, i / 100, (i * 7 % 41) - 20.0 + (i % 3) * 0.3, (i * 13 % 61) - 30.0 + (i % 5) * 0.2, (i * 37.3) % 360)
+            for i in range(count)]
+
+def set_modes(display, initial_state, sequence):
+    restore_snapshot(display, initial_state)
+    for name in sequence:
+        getattr(display.flight_control_unit, name)()
+
+def render(display, state, image):
+    display.simulation.state = state
+    display.update_horizon()  # The scene backend syncs its items here
+    image.fill(0)
+    display.render(image)
+    return np.frombuffer(image.constBits().asarray(image.sizeInBytes()), dtype=np.uint8).reshape(image.height(), image.bytesPerLine() // 4, 4)[:, :image.width(), :3].copy()
+
+def compare(reference, frame):
+    difference = np.abs(reference.astype(np.int16) - frame.astype(np.int16)).max(axis=2)
+    return int(difference.max()), float((difference > 16).mean())  # Largest channel difference, share of visibly different pixels
+
+def benchmark(display, states, image):
+    times = []
+    for state in states:
+        start = time.perf_counter()
+        display.simulation.state = state
+        display.update_horizon()
+        display.render(image)
+        times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+    return float(times.mean()), float(np.percentile(times, 95))
+
+def live_frames(app, display, states):
+    app.processEvents()
+    start = time.perf_counter()
+    for state in states:
+        display.simulation.state = state
+        display.update_horizon()
+        app.processEvents()
+    return (time.perf_counter() - start) * 1000 / len(states)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare and time the PFD rendering backends')
+    parser.add_argument('--frames', type=int, default=200, help='Frames per mode combination')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--save-worst', metavar='DIR', help='Save the frame with the largest difference per backend as PNG')
+    args = parser.parse_args()
+
+    app = create_application()
+    from PyQt5.QtGui import QImage
+    displays = {backend: create_display(backend) for backend in ['immediate'] + [b for b in args.backends if b != 'immediate']}
+    initial_states = {backend: take_snapshot(display) for backend, display in displays.items()}
+    states = flight_states(args.frames)
+    image = QImage(displays['immediate'].size(), QImage.Format_RGB32)
+    print(f"{displays['immediate'].width()}x{displays['immediate'].height()}, {len(states)} frames per mode combination")
+    for name, sequence in MODE_SEQUENCES.items():
+        for backend, display in displays.items():
+            set_modes(display, initial_states[backend], sequence)
+        results = []
+        for backend, display in displays.items():
+            mean, p95 = benchmark(display, states, image)
+            manoeuvring = live_frames(app, display, states)
+            steady = live_frames(app, display, [state._replace(pitch=2.0, roll=0.0) for state in states])
+            line = f"{backend:9} render {mean:5.2f} ms (p95 {p95:5.2f})  live {manoeuvring:5.2f} ms, steady {steady:5.2f} ms"
+            if backend != 'immediate':
+                worst = (0, 0.0, None)
+                for state in states[::max(1, len(states) // 20)]:
+                    max_difference, share = compare(render(displays['immediate'], state, image), render(display, state, image))
+                    if share >= worst[1]:
+                        worst = (max_difference, share, state)
+                line += f"  max diff {worst[0]:3d}, worst frame {worst[1] * 100:.2f}% pixels differ"
+                if args.save_worst and worst[2] is not None:
+                    os.makedirs(args.save_worst, exist_ok=True)
+                    for saved in ('immediate', backend):
+                        render(displays[saved], worst[2], image)
+                        image.save(os.path.join(args.save_worst, f"{name.replace(' ', '_')}_{saved}.png"))
+            results.append(line)
+        print(f"[{name}]")
+        for line in results:
+            print(f"  {line}")
+    if 'threaded' in displays:
+        print(displays['threaded'].layer_compositor.report())
+
+if __name__ == '__main__':
+    main()
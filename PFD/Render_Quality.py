@@ -0,0 +1,125 @@
+import argparse
+import time
+from collections import namedtuple
+
+# Quality tiers of the PFD renderer, best first, and the governor choosing one from the measured frame time.
+# 'standard' is the original look. Above it, antialiasing is turned on for the layers where edges rotate or
+# slope; below it the display first gives up the sky and ground gradients and heading label density, then the
+# minor pitch ladder lines. Every draw method reads display.quality_level, which only changes between frames.
+# The governor steps no higher than its best level, 'standard' unless another is asked for, so by default it
+# only ever trades the original look away under load.
+#   antialiased   layers drawn with QPainter.Antialiasing: 'attitude' (sphere, horizon, ladder, aircraft
+#                 symbol), 'bank' (bank scale and roll pointer) and 'scales' (deviation scales, heading tape)
+#   gradients     sky and ground gradients, or flat fills in their middle colours
+#   full_ladder   every 2.5 degree pitch line, or only the 5 and 10 degree lines
+#   heading_label_step  a number on every Nth degree of the heading tape
+QualityLevel = namedtuple('QualityLevel', ['name', 'antialiased', 'gradients', 'full_ladder', 'heading_label_step'])
+LEVELS = (
+    QualityLevel('high', frozenset({'attitude', 'bank', 'scales'}), True, True, 1),
+    QualityLevel('medium', frozenset({'attitude', 'bank'}), True, True, 1),
+    QualityLevel('standard', frozenset(), True, True, 1),
+    QualityLevel('reduced', frozenset(), False, True, 2),
+    QualityLevel('minimum', frozenset(), False, False, 2),
+)
+LEVEL_NAMES = [level.name for level in LEVELS]
+FLAT_SKY = "#417EF0"  # Middle stop of the sky gradient
+FLAT_GROUND = "#7A471E"  # Halfway between the ground gradient's stops
+
+# Governor thresholds, as fractions of the frame period
+DEGRADE_PAINT = 0.7  # Painting takes most of the frame
+DEGRADE_LATE = 1.2  # Or frames arrive late (the GUI thread is busy with more than painting)
+PROMOTE_PAINT = 0.3  # Painting leaves plenty of headroom
+PROMOTE_LATE = 1.05
+DEGRADE_AFTER = 0.5  # Seconds overloaded before stepping down
+PROMOTE_AFTER = 3.0  # Seconds of headroom before stepping up, doubled each time a step up has to be undone
+PROMOTE_AFTER_MAX = 60.0
+SETTLED = 30.0  # Seconds at one level after which a failed step up is forgotten
+SMOOTHING = 0.1  # Weight of the newest frame in the averages
+
+def quality_level(name):
+    return LEVELS[LEVEL_NAMES.index(name)]
+
+class AdaptiveQuality:
+    # Steps down one level when the display is overloaded, up one when there is headroom. The thresholds are
+    # far apart, each direction must hold for a while, and a level that could not be held is retried less often,
+    # so the display settles instead of flickering between two levels.
+    def __init__(self, primary_flight_display, period=0.030, start='standard', best='standard'):
+        self.primary_flight_display = primary_flight_display
+        self.period = period  # Seconds between frames requested by the display timer
+        self.best = LEVEL_NAMES.index(best)  # Highest level stepped up to
+        self.index = max(LEVEL_NAMES.index(start), self.best)
+        self.paint_time = None  # Smoothed seconds per paint
+        self.interval = None  # Smoothed seconds between display timer ticks
+        self.last_tick = None
+        self.overloaded_since = None
+        self.headroom_since = None
+        self.changed = time.monotonic()
+        self.promoted = False  # The last change was a step up
+        self.promote_after = PROMOTE_AFTER
+        self.changes = 0
+        primary_flight_display.quality_level = LEVELS[self.index]
+
+    def tick(self):
+        # Display timer, GUI thread
+        now = time.monotonic()
+        if self.last_tick is not None:
+            interval = now - self.last_tick
+            self.interval = interval if self.interval is None else self.interval + SMOOTHING * (interval - self.interval)
+        self.last_tick = now
+
+    def frame_rendered(self, duration):
+        # After each paint, GUI thread
+        self.paint_time = duration if self.paint_time is None else self.paint_time + SMOOTHING * (duration - self.paint_time)
+        now = time.monotonic()
+        if now - self.changed >= SETTLED:
+            self.promote_after = PROMOTE_AFTER
+        if self.interval is None:
+            return
+        load = self.paint_time / self.period
+        lateness = self.interval / self.period
+        overloaded = load > DEGRADE_PAINT or lateness > DEGRADE_LATE
+        headroom = load < PROMOTE_PAINT and lateness < PROMOTE_LATE
+        self.overloaded_since = (self.overloaded_since or now) if overloaded else None
+        self.headroom_since = (self.headroom_since or now) if headroom else None
+        if self.overloaded_since is not None and now - self.overloaded_since >= DEGRADE_AFTER and self.index < len(LEVELS) - 1:
+            if self.promoted and now - self.changed < SETTLED:
+                self.promote_after = min(2 * self.promote_after, PROMOTE_AFTER_MAX)  # The step up did not hold
+            self.change(self.index + 1, now, False)
+        elif self.headroom_since is not None and now - self.headroom_since >= self.promote_after and self.index > self.best:
+            self.change(self.index - 1, now, True)
+
+    def change(self, index, now, promoted):
+        print(f"Render quality {LEVELS[index].name}: paint {self.paint_time * 1000:.1f} ms, "
+              f"frames every {self.interval * 1000:.1f} ms of {self.period * 1000:.0f} ms")
+        self.index = index
+        self.primary_flight_display.quality_level = LEVELS[index]
+        self.changed = now
+        self.promoted = promoted
+        self.changes += 1
+        self.paint_time = self.interval = None  # The new level paints at a different cost
+        self.last_tick = self.overloaded_since = self.headroom_since = None
+
+def main():
+    # Paint time of every level over the same attitude sweep, with the approach modes engaged
+    parser = argparse.ArgumentParser(description='Time the PFD at each render quality level')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--backend', choices=['widget', 'scene', 'threaded'], default='widget')
+    args = parser.parse_args()
+
+    from Render_Benchmark import MODE_SEQUENCES, benchmark, create_application, create_display, flight_states
+    app = create_application()
+    from PyQt5.QtGui import QImage
+    display = create_display(args.backend)
+    for name in MODE_SEQUENCES['ap1 hdg appr']:
+        getattr(display.flight_control_unit, name)()
+    states = flight_states(args.frames)
+    image = QImage(display.size(), QImage.Format_RGB32)
+    print(f"{args.backend} backend, {display.width()}x{display.height()}, {len(states)} frames per level")
+    for level in LEVELS:
+        display.quality_level = level
+        mean, p95 = benchmark(display, states, image)
+        print(f"  {level.name:9} {mean:6.2f} ms mean {p95:6.2f} ms p95")
+    display.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from PyQt5.QtCore import QTimer
+
+# Records a bounded window of profile data from a running display, started and stopped with F9, SIGUSR1
+# or at launch with PFD_PROFILE=[sample:|cprofile:]SECONDS (files go to PFD_PROFILE_DIR, default the working
+# directory).
+#   sample    a background thread reads the Python stack of every thread each few milliseconds; writes a
+#             report and a collapsed-stack file (one "thread;frame;frame count" line per stack) for flamegraph.pl
+#             or speedscope
+#   cprofile  deterministic cProfile of the GUI thread; writes a report and the .pstats file
+# Samples are attributed to the subsystem of their innermost frame in one of the modules below. The GUI thread
+# with no Python frame above app.exec_() is inside Qt: event dispatch, native painting or idle.
+# One profiler serves the whole process (process_profiler), however many displays it hosts: the sampler sees
+# every thread anyway, and the switch interval it shortens is process-wide too.
+SUBSYSTEMS = {
+    'Primary_Flight_Display.py': 'PFD drawing',
+    'Scene_Display.py': 'PFD drawing',
+    'Layer_Compositor.py': 'PFD drawing',
+    'Display_Lists.py': 'PFD drawing',
+    'Flight_Control_Unit.py': 'FCU widgets',
+    'Simulation.py': 'Simulation and animations',
+    'Input_Control.py': 'Simulation and animations',
+    'Controller.py': 'Controller',
+    'ILS_Receiver.py': 'Navigation',
+    'Nav_Database.py': 'Navigation',
+    'Traffic.py': 'Traffic',
+    'Telemetry_Input.py': 'Telemetry and I/O',
+    'Telemetry_Publisher.py': 'Telemetry and I/O',
+    'Shared_State.py': 'Telemetry and I/O',
+    'Flight_Recorder.py': 'Telemetry and I/O',
+    'Flight_Replay.py': 'Telemetry and I/O',
+    'Input_Recorder.py': 'Telemetry and I/O',
+    'Remote_Stream.py': 'Telemetry and I/O',
+    'Metrics_Exporter.py': 'Telemetry and I/O',
+}
+IDLE_FUNCTIONS = {'wait', 'select', 'poll', 'accept', 'recv', 'recv_into', 'readinto', 'get', 'serve_forever', '_wait_for_tstate_lock'}
+QT_EVENT_LOOP = 'Qt event loop'
+IDLE = 'idle'
+
+def frame_name(filename, function):
+    return f"{os.path.basename(filename)}:{function}"
+
+def subsystem(stack, main_thread):
+    # stack holds (filename, function) from the outermost to the innermost frame
+    if stack and stack[-1][1] in IDLE_FUNCTIONS:
+        return IDLE
+    for filename, function in reversed(stack):
+        name = SUBSYSTEMS.get(os.path.basename(filename))
+        if name is not None and function != '<module>':
+            return name
+    return QT_EVENT_LOOP if main_thread else 'other'
+
+def parse_setting(value):
+    # PFD_PROFILE: "10", "sample:10" or "cprofile:10"
+    mode, _, seconds = value.rpartition(':')
+    return mode or 'sample', float(seconds)
+
+profiler = None  # The process's RuntimeProfiler, created by the first display
+
+def process_profiler():
+    global profiler
+    if profiler is None:
+        profiler = RuntimeProfiler()
+    return profiler
+
+class RuntimeProfiler:
+    def __init__(self, interval=0.005, max_samples=200000):
+        self.interval = interval
+        self.max_samples = max_samples  # Per window, bounds memory if a window is left running
+        self.directory = os.environ.get('PFD_PROFILE_DIR', '.')
+        self.mode = None  # Recording mode, None while idle
+        self.windows = 0  # Recorded so far, numbers the files of each
+        self.stop_timer = QTimer()
+        self.stop_timer.setSingleShot(True)
+        self.stop_timer.timeout.connect(self.stop)
+        if threading.current_thread() is threading.main_thread() and hasattr(signal, 'SIGUSR1'):
+            # Python runs the handler on the GUI thread at the next bytecode, which the 30 ms repaint timer provides
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.toggle())
+        setting = os.environ.get('PFD_PROFILE')
+        if setting:
+            mode, seconds = parse_setting(setting)
+            self.start(mode, seconds)
+
+    def toggle(self, mode='sample', seconds=10.0):
+        if self.mode is None:
+            self.start(mode, seconds)
+        else:
+            self.stop()
+
+    def start(self, mode='sample', seconds=10.0):
+        if self.mode is not None:
+            return
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError(f"Unknown profiling mode {mode!r}")
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == 'sample':
+            # The sampler needs the GIL; without a shorter switch interval it would mostly get it once a paint is over
+            self.switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(self.interval / 10)
+            self.samples = Counter()  # (thread name, main thread, stack) -> samples
+            self.sample_count = 0
+            self.stop_event = threading.Event()
+            self.sampler = threading.Thread(target=self.sample, name='profiler', daemon=True)
+            self.sampler.start()
+        else:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.stop_timer.start(int(seconds * 1000))
+        print(f"Profiling ({mode}) for {seconds:g} s, F9 stops early")
+
+    def sample(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        while not self.stop_event.wait(self.interval) and self.sample_count < self.max_samples:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_code.co_filename, frame.f_code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(ident, str(ident)), ident == main, tuple(stack))] += 1
+            self.sample_count += 1
+
+    def stop(self):
+        if self.mode is None:
+            return
+        self.stop_timer.stop()
+        elapsed = time.perf_counter() - self.started
+        os.makedirs(self.directory, exist_ok=True)
+        self.windows += 1
+        base = os.path.join(self.directory, time.strftime('pfd-profile-%Y%m%d-%H%M%S') + f"-{os.getpid()}-{self.windows}")
+        if self.mode == 'sample':
+            self.stop_event.set()
+            self.sampler.join()
+            sys.setswitchinterval(self.switch_interval)
+            report = self.sample_report(elapsed)
+            with open(base + '.collapsed', 'w') as collapsed:
+                for (thread, _, stack), count in self.samples.most_common():
+                    collapsed.write(';'.join([thread] + [frame_name(*frame) for frame in stack]) + f" {count}\n")
+            written = [base + '.txt', base + '.collapsed']
+        else:
+            self.profile.disable()
+            self.profile.dump_stats(base + '.pstats')
+            report = self.cprofile_report(elapsed)
+            written = [base + '.txt', base + '.pstats']
+        with open(base + '.txt', 'w') as report_file:
+            report_file.write(report)
+        self.mode = None
+        print(report)
+        print("Profile written to " + ', '.join(written))
+
+    def sample_report(self, elapsed):
+        lines = [f"Sampling profile, {elapsed:.1f} s, {self.sample_count} samples every {self.interval * 1000:g} ms"]
+        threads = {}
+        functions = Counter()
+        for (thread, main_thread, stack), count in self.samples.items():
+            name = subsystem(stack, main_thread)
+            threads.setdefault(thread, Counter())[name] += count
+            if name not in (IDLE, QT_EVENT_LOOP) and stack:
+                functions[frame_name(*stack[-1])] += count
+        for thread, subsystems in sorted(threads.items(), key=lambda item: -sum(item[1].values())):
+            total = sum(subsystems.values())
+            lines.append(f"[{thread}] {total} samples")
+            for name, count in subsystems.most_common():
+                lines.append(f"  {name:28} {count / total * 100:5.1f}%")
+        busy = sum(functions.values())
+        if busy:
+            lines.append("Innermost Python frames, all threads, idle and Qt excluded")
+            for function, count in functions.most_common(20):
+                lines.append(f"  {count / busy * 100:5.1f}%  {function}")
+        return '\n'.join(lines) + '\n'
+
+    def cprofile_report(self, elapsed):
+        stats = pstats.Stats(self.profile)
+        subsystems = Counter()
+        for (filename, _, function), (_, _, own_time, _, _) in stats.stats.items():
+            name = SUBSYSTEMS.get(os.path.basename(filename))
+            subsystems[name if name is not None and function != '<module>' else 'Qt and library code'] += own_time
+        total = sum(subsystems.values()) or 1
+        lines = [f"cProfile of the GUI thread, {elapsed:.1f} s, {total:.3f} s in Python"]
+        for name, own_time in subsystems.most_common():
+            lines.append(f"  {name:28} {own_time / total * 100:5.1f}%  {own_time * 1000:8.1f} ms")
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats('cumulative').print_stats(25)
+        return '\n'.join(lines) + '\n' + stream.getvalue()
@@ -0,0 +1,271 @@
+import argparse
+import glob
+import math
+import os
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from Flight_Query import COMPARISONS, mode_bit
+from Snapshot import restore_snapshot, take_snapshot
+from Telemetry import encode_modes
+
+# Scenario file, one statement per line, '#' starts a comment. Times are simulation seconds:
+#
+#   scenario Intercept heading 030
+#   at 0     set heading 17           set the aircraft heading, pitch or roll outright
+#   at 0     press ap1                press an FCU button: ap1 ap2 athr alt_hold loc appr hdg_trk
+#   at 1     select hdg 30            turn the HDG (or SPD) knob to a value
+#   at 1     key down left            hold an arrow key (key up left releases it)
+#   at 5     snapshot                 save the display state (restore goes back to it, or to the start without one)
+#   at 8     restore
+#   at 2     expect ap1 on            check a mode flag, or a value, at that moment
+#   by 60    expect heading 30 within 2    must hold at least once before the deadline
+#   from 70 to 90 expect |roll| < 1        must hold on every tick of the interval
+#
+# Values: pitch, roll and heading (heading differences wrap at 360), optionally as |value|.
+# The scenario runs until its latest time; every scenario starts from the state of a freshly built display.
+# Times count the ticks the runner has stepped, so they run on through a restore that sets the simulation back.
+ScenarioStep = namedtuple('ScenarioStep', ['line', 'kind', 'start', 'end', 'action', 'text'])
+ScenarioResult = namedtuple('ScenarioResult', ['path', 'name', 'sim_time', 'wall_time', 'failures', 'error'])
+
+BUTTONS = {'ap1': 'toggle_ap1', 'ap2': 'toggle_ap2', 'athr': 'toggle_athr', 'alt_hold': 'toggle_alt_hold',
+           'loc': 'toggle_loc_visibility', 'appr': 'toggle_appr_visibility', 'hdg_trk': 'toggle_hdg_trk'}
+TIMING = re.compile(r'^(at|by)\s+(\d+(?:\.\d*)?)\s+(.*)$|^from\s+(\d+(?:\.\d*)?)\s+to\s+(\d+(?:\.\d*)?)\s+(.*)$')
+SET_ACTION = re.compile(r'^set\s+(pitch|roll|heading)\s+(-?\d+(?:\.\d*)?)$')
+PRESS_ACTION = re.compile(r'^press\s+(\w+)$')
+SELECT_ACTION = re.compile(r'^select\s+(hdg|spd)\s+(\d+)$')
+KEY_ACTION = re.compile(r'^key\s+(down|up)\s+(left|right|up|down)$')
+SNAPSHOT_ACTION = re.compile(r'^(snapshot|restore)$')
+MODE_CHECK = re.compile(r'^expect\s+(\w+)\s+(on|off)$')
+WITHIN_CHECK = re.compile(r'^expect\s+(\|?)(pitch|roll|heading)\1\s+(-?\d+(?:\.\d*)?)\s+within\s+(\d+(?:\.\d*)?)$')
+COMPARE_CHECK = re.compile(r'^expect\s+(\|?)(pitch|roll|heading)\1\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d*)?)$')
+
+def state_value(state, field, absolute):
+    value = getattr(state, field)
+    return abs(value) if absolute else value
+
+def parse_action(text):
+    # Actions are (name, arguments), applied by ScenarioRun.apply
+    match = SET_ACTION.match(text)
+    if match:
+        return 'set', (match.group(1), float(match.group(2)))
+    match = PRESS_ACTION.match(text)
+    if match:
+        if match.group(1) not in BUTTONS:
+            raise ValueError(f"unknown button '{match.group(1)}', expected one of: {', '.join(BUTTONS)}")
+        return 'press', (BUTTONS[match.group(1)],)
+    match = SELECT_ACTION.match(text)
+    if match:
+        return 'select', (match.group(1), int(match.group(2)))
+    match = KEY_ACTION.match(text)
+    if match:
+        return 'key', (match.group(1), match.group(2))
+    match = SNAPSHOT_ACTION.match(text)
+    if match:
+        return match.group(1), ()
+    raise ValueError(f"cannot parse action '{text}'")
+
+def parse_check(text):
+    # Checks are predicates over (FlightState, mode flags)
+    match = MODE_CHECK.match(text)
+    if match:
+        bit = mode_bit(match.group(1))
+        wanted = match.group(2) == 'on'
+        return lambda state, modes: bool(modes & bit) == wanted
+    match = WITHIN_CHECK.match(text)
+    if match:
+        absolute, field, target, tolerance = bool(match.group(1)), match.group(2), float(match.group(3)), float(match.group(4))
+        if field == 'heading':
+            return lambda state, modes: abs((state_value(state, field, absolute) - target + 180) % 360 - 180) <= tolerance
+        return lambda state, modes: abs(state_value(state, field, absolute) - target) <= tolerance
+    match = COMPARE_CHECK.match(text)
+    if match:
+        absolute, field, op, value = bool(match.group(1)), match.group(2), match.group(3), float(match.group(4))
+        compare = COMPARISONS[op]
+        return lambda state, modes: compare(state_value(state, field, absolute), value)
+    raise ValueError(f"cannot parse check '{text}'")
+
+def load_scenario(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    steps = []
+    with open(path) as scenario:
+        for number, line in enumerate(scenario, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('scenario '):
+                name = line[len('scenario '):].strip()
+                continue
+            match = TIMING.match(line)
+            if not match:
+                raise ValueError(f"{path}:{number}: expected 'at T', 'by T' or 'from T to T', got '{line}'")
+            when, at_time, at_text, start, end, interval_text = match.groups()
+            text = re.sub(r'\s+', ' ', (at_text or interval_text).strip().lower())
+            try:
+                if text.startswith('expect '):
+                    kind = 'during' if when is None else 'at' if when == 'at' else 'by'
+                    start_time = float(start) if when is None else float(at_time)
+                    end_time = float(end) if when is None else start_time
+                    steps.append(ScenarioStep(number, kind, start_time, end_time, parse_check(text), text))
+                elif when == 'at':
+                    steps.append(ScenarioStep(number, 'do', float(at_time), float(at_time), parse_action(text), text))
+                else:
+                    raise ValueError(f"actions are timed with 'at', got '{line}'")
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: {error}") from None
+    return name, steps
+
+class ScenarioRun:
+    def __init__(self, display):
+        self.display = display
+        self.simulation = display.simulation
+        self.flight_control_unit = display.flight_control_unit
+        self.snapshot = take_snapshot(display)
+
+    def apply(self, action):
+        from PyQt5.QtCore import Qt
+        name, args = action
+        if name == 'set':
+            field, value = args
+            if field == 'heading':
+                self.simulation.heading = value % 360
+            else:
+                animation = self.simulation.pitch_animation if field == 'pitch' else self.simulation.roll_animation
+                animation.value = value
+                animation.stop()
+        elif name == 'press':
+            self.flight_control_unit.press_button(getattr(self.flight_control_unit, args[0]))
+        elif name == 'select':
+            knob, value = args
+            if knob == 'hdg':
+                self.flight_control_unit.update_heading(value % 360, self.flight_control_unit.heading_managed)
+            else:
+                self.flight_control_unit.update_speed_mach(value)
+        elif name == 'key':
+            direction, key_name = args
+            key = getattr(Qt, 'Key_' + key_name.capitalize())
+            if direction == 'down':
+                self.display.input_control.press_key(key)
+            else:
+                self.display.input_control.release_key(key)
+        elif name == 'snapshot':
+            self.snapshot = take_snapshot(self.display)
+        elif name == 'restore':
+            restore_snapshot(self.display, self.snapshot)
+
+    def run(self, steps):
+        # Step the simulation as fast as it goes; checks see the state published by each tick
+        tick_seconds = self.simulation.tick_ms / 1000
+        actions = sorted((step for step in steps if step.kind == 'do'), key=lambda step: step.start)
+        checks = [step for step in steps if step.kind != 'do']
+        end_time = max((step.end for step in steps), default=0)
+        failures = []
+        passed = set()  # 'by' checks that have held
+        next_action = 0
+        ticks = 0
+        while True:
+            while next_action < len(actions) and actions[next_action].start <= ticks * tick_seconds + tick_seconds / 2:
+                self.apply(actions[next_action].action)
+                next_action += 1
+            self.simulation.step()
+            ticks += 1
+            state = self.simulation.state
+            clock = ticks * tick_seconds
+            now = clock + tick_seconds / 2  # Tolerate float error in ticks * tick_ms / 1000
+            modes = encode_modes(self.flight_control_unit)
+            for index, check in enumerate(checks):
+                if index in passed or now < check.start:
+                    continue
+                if check.kind == 'by':
+                    if check.action(state, modes):
+                        passed.add(index)
+                    elif now >= check.end + tick_seconds:
+                        failures.append(self.failure(check, clock, state, 'never held'))
+                        passed.add(index)
+                elif clock <= check.end + tick_seconds / 2:
+                    if not check.action(state, modes):
+                        failures.append(self.failure(check, clock, state, 'failed'))
+                        passed.add(index)  # Report each check once
+                    elif check.kind == 'at':
+                        passed.add(index)
+            if now >= end_time + tick_seconds:
+                return clock, failures
+
+    def failure(self, check, clock, state, reason):
+        window = f"at {check.start:g} s" if check.kind == 'at' else (
+            f"by {check.end:g} s" if check.kind == 'by' else f"from {check.start:g} to {check.end:g} s")
+        return (f"line {check.line}: {window}: '{check.text}' {reason} "
+                f"(t={clock:.2f} s heading={state.heading:.2f} roll={state.roll:.2f} pitch={state.pitch:.2f})")
+
+worker_display = None  # (application, display, snapshot of its initial state), built once per pool worker
+
+def run_scenario(path):
+    # Runs in a pool worker; each worker keeps its own offscreen QApplication and display
+    global worker_display
+    start = time.perf_counter()
+    try:
+        name, steps = load_scenario(path)
+    except (OSError, ValueError) as error:
+        return ScenarioResult(path, os.path.basename(path), 0.0, time.perf_counter() - start, [], str(error))
+    if worker_display is None:
+        from Input_Recorder import create_headless_display
+        app, display = create_headless_display()
+        worker_display = app, display, take_snapshot(display)
+    _, display, initial_state = worker_display
+    restore_snapshot(display, initial_state)  # Much cheaper than rebuilding the widgets for every scenario
+    try:
+        sim_time, failures = ScenarioRun(display).run(steps)
+        error = None
+    except Exception as exception:
+        sim_time, failures, error = display.simulation.state.time, [], f"{type(exception).__name__}: {exception}"
+    return ScenarioResult(path, name, sim_time, time.perf_counter() - start, failures, error)
+
+def write_junit_report(results, path, wall_time):
+    suite = ElementTree.Element('testsuite', name='pfd-scenarios', tests=str(len(results)),
+                                failures=str(sum(1 for result in results if result.failures)),
+                                errors=str(sum(1 for result in results if result.error)),
+                                time=f"{wall_time:.3f}")
+    for result in results:
+        case = ElementTree.SubElement(suite, 'testcase', name=result.name,
+                                      classname=os.path.splitext(os.path.basename(result.path))[0],
+                                      file=result.path, time=f"{result.wall_time:.3f}")
+        if result.error:
+            ElementTree.SubElement(case, 'error', message=result.error).text = result.error
+        elif result.failures:
+            failure = ElementTree.SubElement(case, 'failure', message=result.failures[0])
+            failure.text = '\n'.join(result.failures)
+        ElementTree.SubElement(case, 'system-out').text = f"{result.sim_time:.2f} s simulated"
+    ElementTree.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run PFD scenarios headless and in parallel')
+    parser.add_argument('scenarios', nargs='+', help='Scenario files or directories of *.scn files')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Worker processes (default: one per CPU)')
+    parser.add_argument('--junit', metavar='PATH', help='Write a JUnit XML report to this file')
+    args = parser.parse_args()
+
+    paths = []
+    for entry in args.scenarios:
+        paths.extend(sorted(glob.glob(os.path.join(entry, '*.scn'))) if os.path.isdir(entry) else [entry])
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(paths)))) as pool:
+        results = list(pool.map(run_scenario, paths))
+    wall_time = time.perf_counter() - start
+
+    for result in results:
+        status = 'ERROR' if result.error else 'FAIL' if result.failures else 'ok'
+        print(f"{status:5} {result.name} ({result.sim_time:.0f} s simulated in {result.wall_time:.2f} s)")
+        for message in ([result.error] if result.error else result.failures):
+            print(f"      {message}")
+    failed = sum(1 for result in results if result.error or result.failures)
+    simulated = sum(result.sim_time for result in results)
+    print(f"{len(results) - failed}/{len(results)} scenarios passed, {simulated:.0f} s simulated in {wall_time:.2f} s "
+          f"({simulated / wall_time if wall_time else math.inf:.0f}x real time)")
+    if args.junit:
+        write_junit_report(results, args.junit, wall_time)
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import time
+from PyQt5.QtWidgets import QFrame, QGraphicsItem, QGraphicsScene, QGraphicsView
+from PyQt5.QtGui import QColor, QLinearGradient, QPainterPath, QPen, QPolygonF, QTransform
+from PyQt5.QtCore import QPoint, QRectF, Qt
+from Render_Quality import FLAT_GROUND, FLAT_SKY
+
+class InstrumentItem(QGraphicsItem):
+    # One instrument drawn with the widget backend's own draw code. bounds names its bounding rectangle in the
+    # display's DisplayLayout (Display_Layout.py), which follows the display size and includes a few pixels for
+    # pen widths and text, since cached items are cut to it.
+    def __init__(self, display, draw, bounds, cache_mode=QGraphicsItem.NoCache, parent=None):
+        super().__init__(parent)
+        self.display = display
+        self.draw = draw
+        self.bounds = bounds
+        self.setCacheMode(cache_mode)
+
+    def boundingRect(self):
+        return getattr(self.display.instrument_layout, self.bounds)
+
+    def paint(self, painter, option, widget=None):
+        self.draw(painter, self.display.instrument_layout.center)
+
+    def relayout(self):
+        self.prepareGeometryChange()
+        self.update()
+
+class SphereItem(InstrumentItem):
+    # Clips the attitude art to the circle, like the clip path in drawHorizon
+    def __init__(self, display):
+        super().__init__(display, lambda painter, center: None, 'sphere_bounds')
+        self.setFlag(QGraphicsItem.ItemClipsChildrenToShape)
+        self.setFlag(QGraphicsItem.ItemHasNoContents)
+
+    def shape(self):
+        return self.display.instrument_layout.circle_path
+
+class GradientItem(InstrumentItem):
+    # Sky or ground gradient at zero pitch. draw_horizon keeps the gradients vertical on screen whatever the roll,
+    # so these layers are only ever translated by the pitch offset and their cached pixmaps are reused as they are.
+    # Each is clipped to its rotated rectangle of draw_horizon, which ends a circle diameter from the horizon.
+    # Filled flat with the given colour when the quality level has no gradients.
+    def __init__(self, display, stops, flat, above_horizon, parent):
+        super().__init__(display, self.draw_gradient, 'gradient_bounds', QGraphicsItem.ItemCoordinateCache, parent)
+        self.stops = stops
+        self.flat = flat
+        self.above_horizon = above_horizon
+        self.setFlag(QGraphicsItem.ItemClipsToShape)
+        self.clip = QPainterPath()
+
+    def set_attitude(self, rotation, pitch_offset):
+        layout = self.display.instrument_layout
+        center = layout.center
+        width = height = 2 * layout.circle_radius
+        top = center.y() - height if self.above_horizon else center.y()
+        area = QPolygonF(QRectF(center.x() - width, top + pitch_offset, 2 * width, height))
+        self.clip = QPainterPath()
+        self.clip.addPolygon(rotation.map(area).translated(0, -pitch_offset))  # Into this layer's coordinates
+        self.setTransform(QTransform().translate(0, pitch_offset))
+
+    def shape(self):
+        return self.clip
+
+    def draw_gradient(self, painter, center):
+        self.display.antialias(painter, 'attitude')
+        painter.setPen(Qt.NoPen)
+        if self.display.quality_level.gradients:
+            height = 2 * self.display.instrument_layout.circle_radius
+            top = center.y() - height if self.above_horizon else center.y()
+            gradient = QLinearGradient(0, top, 0, top + height)
+            for position, color in self.stops:
+                gradient.setColorAt(position, QColor(color))
+            painter.setBrush(gradient)
+        else:
+            painter.setBrush(QColor(self.flat))
+        painter.drawRect(self.boundingRect())
+
+class HorizonLineItem(InstrumentItem):
+    # The separator line at zero pitch and roll; attitude is applied as the item transform
+    def __init__(self, display, parent):
+        super().__init__(display, self.draw_line, 'horizon_line_bounds', QGraphicsItem.ItemCoordinateCache, parent)
+
+    def draw_line(self, painter, center):
+        layout = self.display.instrument_layout
+        width = 2 * layout.circle_radius
+        self.display.antialias(painter, 'attitude')
+        painter.setPen(QPen(Qt.white, layout.pen(2)))
+        painter.drawLine(center.x() + width, center.y(), center.x() - width, center.y())
+
+class HorizonTicksItem(InstrumentItem):
+    # Heading ticks on the horizon line; a child of the line so it follows the same transform
+    def __init__(self, display, parent):
+        super().__init__(display, self.draw_ticks, 'horizon_line_bounds', parent=parent)  # Heading changes repaint only the strip
+
+    def draw_ticks(self, painter, center):
+        layout = self.display.instrument_layout
+        center_x, center_y = center.x(), center.y()
+        radius = layout.circle_radius
+        tick_length = layout.horizon_tick
+        tick_spacing = layout.heading_tick_spacing
+        total_ticks = 360 * tick_spacing
+        scroll_offset = int(self.display.current_heading * tick_spacing) % total_ticks
+        self.display.antialias(painter, 'attitude')
+        painter.setPen(QPen(Qt.white, layout.pen(2)))
+        for i in range(0, total_ticks, tick_spacing):
+            x_pos = int(center_x + (i - scroll_offset + radius) % total_ticks - radius)
+            if center_x - radius <= x_pos <= center_x + radius:
+                painter.drawLine(QPoint(x_pos, center_y), QPoint(x_pos, center_y + tick_length))
+
+def draw_localizer(display, painter):
+    display.drawLocalizerDeviation(painter)
+    display.draw_localizer_diamond(painter)
+
+def draw_glideslope(display, painter):
+    display.drawVerticalDeviationScale(painter)
+    display.draw_glideslope_diamond(painter)
+
+def mode_key(display):
+    # Everything the annunciator, deviation scales and heading bug draw from besides the attitude
+    return (display.ap_status, display.alt_hold_active, display.alt_hold_armed, display.hdg_trk_active,
+            display.show_gs_loc_labels, display.appr_active, display.ap1_active, display.ap2_active,
+            display.localizer_visible, display.vertical_deviation_visible, getattr(display, 'selected_heading', None),
+            display.traffic_advisories)
+
+class SceneView(QGraphicsView):
+    def __init__(self, display):
+        super().__init__(display)
+        self.display = display
+        self.graphics_scene = QGraphicsScene(self)
+        self.setScene(self.graphics_scene)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self.setFocusPolicy(Qt.NoFocus)  # Keys go to the display and its input control
+        self.setBackgroundBrush(QColor("black"))
+        # Every draw method sets the pen, brush and antialiasing it uses; antialiased edges stay inside the item bounds
+        self.setOptimizationFlags(QGraphicsView.DontSavePainterState | QGraphicsView.DontAdjustForAntialiasing)
+
+        # Painting order and clipping follow PrimaryFlightDisplay.paintEvent
+        self.annunciator = InstrumentItem(display, lambda painter, center: display.drawFlightModeAnnunciator(painter),
+                                          'annunciator_bounds', QGraphicsItem.DeviceCoordinateCache)
+        self.sphere = SphereItem(display)
+        self.sky = GradientItem(display, [(0, "#3267EC"), (0.5, "#417EF0"), (1, "#5EB8E1")], FLAT_SKY, True, self.sphere)
+        self.ground = GradientItem(display, [(0, "#904C1C"), (1, "#654321")], FLAT_GROUND, False, self.sphere)
+        self.horizon_line = HorizonLineItem(display, self.sphere)
+        self.horizon_ticks = HorizonTicksItem(display, self.horizon_line)
+        self.pitch_ladder = InstrumentItem(display, lambda painter, center: display.draw_pitch_lines_and_ladder(painter, center.x(), center.y()),
+                                           'sphere_bounds', parent=self.sphere)
+        self.aircraft_symbol = InstrumentItem(display, lambda painter, center: display.draw_aircraft_symbol(painter, center.x(), center.y()),
+                                              'sphere_bounds', QGraphicsItem.DeviceCoordinateCache, self.sphere)
+        self.roll_pointer = InstrumentItem(display, lambda painter, center: display.draw_roll_pointer(painter, center.x(), center.y(), display.instrument_layout.circle_radius),
+                                           'sphere_bounds', QGraphicsItem.ItemCoordinateCache, self.sphere)
+        self.side_masks = InstrumentItem(display, lambda painter, center: display.draw_side_masks(painter, center, display.instrument_layout.circle_radius),
+                                         'sphere_bounds', QGraphicsItem.DeviceCoordinateCache, self.sphere)
+        self.bank_scale = InstrumentItem(display, lambda painter, center: display.draw_bank_scale(painter, center.x(), center.y()),
+                                         'bank_scale_bounds', QGraphicsItem.DeviceCoordinateCache)
+        self.localizer = InstrumentItem(display, lambda painter, center: draw_localizer(display, painter),
+                                        'localizer_bounds', QGraphicsItem.DeviceCoordinateCache)
+        self.vertical_deviation = InstrumentItem(display, lambda painter, center: draw_glideslope(display, painter),
+                                                 'glideslope_bounds', QGraphicsItem.DeviceCoordinateCache)
+        self.heading_tape = InstrumentItem(display, lambda painter, center: display.drawHeadingIndicator(painter), 'heading_bounds')
+        self.qnh = InstrumentItem(display, lambda painter, center: display.drawQNH(painter), 'qnh_bounds', QGraphicsItem.DeviceCoordinateCache)
+        self.top_items = [self.annunciator, self.sphere, self.bank_scale, self.localizer, self.vertical_deviation,
+                          self.heading_tape, self.qnh]
+        for z, item in enumerate(self.top_items):
+            item.setZValue(z)
+            self.graphics_scene.addItem(item)
+        for z, item in enumerate([self.sky, self.ground, self.horizon_line, self.pitch_ladder, self.aircraft_symbol, self.roll_pointer, self.side_masks]):
+            item.setZValue(z)
+        self.items_to_relayout = self.top_items + [self.sky, self.ground, self.horizon_line, self.horizon_ticks, self.pitch_ladder,
+                                                   self.aircraft_symbol, self.roll_pointer, self.side_masks]
+        self.quality_level = display.quality_level
+        self.modes = None
+        self.attitude = None
+        self.heading = None
+        self.deviation = None
+        self.state = None  # Drawn by the next paint
+
+    def sync(self):
+        # Called once per display frame: read the state once, then touch only the items that changed
+        display = self.display
+        state = display.state_source.state
+        self.state = state
+        display.pitch = state.pitch
+        display.roll = state.roll
+        display.current_heading = state.heading
+        if display.traffic is not None:
+            display.traffic_advisories = display.traffic.advisories
+        if display.quality_level != self.quality_level:
+            self.quality_level = display.quality_level
+            for item in self.items_to_relayout:
+                item.update()  # Redraw the cached pixmaps at the new level
+        modes = mode_key(display)
+        if modes != self.modes:
+            self.modes = modes
+            self.annunciator.update()
+            self.localizer.setVisible(display.localizer_visible)
+            self.vertical_deviation.setVisible(display.vertical_deviation_visible)
+            self.heading_tape.update()  # Heading bug
+        if (state.pitch, state.roll) != self.attitude:
+            self.attitude = (state.pitch, state.roll)
+            center = display.instrument_layout.center
+            rotation = QTransform().translate(center.x(), center.y()).rotate(state.roll).translate(-center.x(), -center.y())
+            pitch_offset = int(-state.pitch * 2 * display.instrument_layout.circle_radius / 50)  # Same sensitivity as draw_horizon
+            self.sky.set_attitude(rotation, pitch_offset)
+            self.ground.set_attitude(rotation, pitch_offset)
+            self.horizon_line.setTransform(QTransform().translate(0, pitch_offset) * rotation)
+            self.roll_pointer.setTransform(rotation)
+            self.pitch_ladder.update()  # Ladder lines fade with their distance from the centre; also repaints the sphere for the new ground clip
+        if state.heading != self.heading:
+            self.heading = state.heading
+            self.horizon_ticks.update()
+            self.heading_tape.update()
+        if display.ils_receiver is not None and display.ils_receiver.deviation != self.deviation:
+            self.deviation = display.ils_deviation = display.ils_receiver.deviation
+            self.localizer.update()  # Both scales are small, their cached pixmaps are redrawn with the diamonds
+            self.vertical_deviation.update()
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        if self.display.latency_probe is not None and self.state is not None:
+            self.display.latency_probe.painted(self.state)
+        if self.display.metrics is not None:
+            self.display.metrics.frame_rendered(time.perf_counter() - start)
+        if self.display.quality is not None:
+            self.display.quality.frame_rendered(time.perf_counter() - start)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.graphics_scene.setSceneRect(0, 0, self.width(), self.height())
+        for item in self.items_to_relayout:
+            item.relayout()
+        self.modes = self.attitude = self.heading = None  # Transforms depend on the centre
@@ -0,0 +1,140 @@
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from Simulation import FlightState
+from Telemetry import STATE_RECORD, encode_modes
+
+# Shared state segment, native byte order (writer and readers share one machine):
+#
+#   offset  size  type     field
+#   0       4     char[4]  magic b'PFDM'
+#   4       4     uint32   layout version, currently 2
+#   8       4     uint32   seqlock counter, odd while the writer is updating the record
+#   12      4     uint32   process ID of the writer (version 2; padding in version 1)
+#   16      40    record   STATE_RECORD, see Telemetry.py
+SEGMENT_MAGIC = b'PFDM'
+SEGMENT_VERSION = 2
+SEGMENT_HEADER = struct.Struct('=4sI')
+SEQUENCE = struct.Struct('=I')
+SEQUENCE_OFFSET = 8
+WRITER = struct.Struct('=I')
+WRITER_OFFSET = 12
+HEARTBEAT_WAIT = 0.1  # Seconds; a running simulation advances the seqlock counter every tick
+RECORD_OFFSET = 16
+SEGMENT_SIZE = RECORD_OFFSET + STATE_RECORD.size
+
+def process_alive(pid):
+    if pid == 0:
+        return False
+    try:
+        os.kill(pid, 0)  # Signal 0 only checks that the process exists
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    return True
+
+def writer_alive(memory):
+    # Whether a simulation still writes to an existing segment: its writer process exists or the counter moves
+    if os.name == 'nt':
+        return True  # Windows frees a segment with its last handle, so one that exists is still open somewhere
+    magic, version = SEGMENT_HEADER.unpack_from(memory.buf, 0)
+    if magic != SEGMENT_MAGIC:
+        raise ValueError(f"'{memory.name}' exists and is not a PFD shared state segment")
+    pid = WRITER.unpack_from(memory.buf, WRITER_OFFSET)[0] if version >= 2 else 0
+    if process_alive(pid):
+        return True
+    sequence = SEQUENCE.unpack_from(memory.buf, SEQUENCE_OFFSET)[0]
+    time.sleep(HEARTBEAT_WAIT)
+    return SEQUENCE.unpack_from(memory.buf, SEQUENCE_OFFSET)[0] != sequence
+
+class SharedStateWriter:
+    def __init__(self, simulation, flight_control_unit, name):
+        self.flight_control_unit = flight_control_unit
+        try:
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+        except FileExistsError:
+            existing = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(existing._name, 'shared_memory')  # Unlinked below only if stale
+            try:
+                in_use = writer_alive(existing)
+            finally:
+                existing.close()
+            if in_use:
+                # Replacing it would split the repeaters between two simulations
+                raise FileExistsError(f"Shared state '{name}' is in use by a running simulation")
+            # Left behind by a simulation that did not shut down cleanly
+            shared_memory.SharedMemory(name=name).unlink()
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+        self.buffer = self.memory.buf
+        self.sequence = 0
+        SEGMENT_HEADER.pack_into(self.buffer, 0, SEGMENT_MAGIC, SEGMENT_VERSION)
+        SEQUENCE.pack_into(self.buffer, SEQUENCE_OFFSET, self.sequence)
+        WRITER.pack_into(self.buffer, WRITER_OFFSET, os.getpid())
+        simulation.observe(self.capture)  # Runs on the simulation thread
+
+    def capture(self, state):
+        fcu = self.flight_control_unit
+        # Seqlock: readers retry while the counter is odd or changes under them
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buffer, SEQUENCE_OFFSET, self.sequence & 0xFFFFFFFF)
+        STATE_RECORD.pack_into(self.buffer, RECORD_OFFSET,
+                               state.tick, state.time, state.pitch, state.roll, state.heading,
+                               fcu.heading_select, fcu.speed_digits, fcu.altitude_select, fcu.vertical_speed_digits,
+                               encode_modes(fcu))
+        self.sequence += 1
+        SEQUENCE.pack_into(self.buffer, SEQUENCE_OFFSET, self.sequence & 0xFFFFFFFF)
+
+    def close(self):
+        self.buffer = None
+        self.memory.close()
+        self.memory.unlink()
+
+class SharedStateReader:
+    def __init__(self, primary_flight_display, name, max_retries=1000):
+        self.primary_flight_display = primary_flight_display
+        self.memory = shared_memory.SharedMemory(name=name)
+        # Only the writer may unlink the segment; stop this process's tracker from doing it on exit
+        resource_tracker.unregister(self.memory._name, 'shared_memory')
+        self.buffer = self.memory.buf
+        magic, version = SEGMENT_HEADER.unpack_from(self.buffer, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            self.memory.close()
+            raise ValueError(f"'{name}' is not a PFD shared state segment")
+        self.max_retries = max_retries
+        self.record = None
+        self.torn_reads = 0  # Reads retried because the writer was mid-update
+
+    def read(self):
+        for _ in range(self.max_retries):
+            sequence = SEQUENCE.unpack_from(self.buffer, SEQUENCE_OFFSET)[0]
+            if sequence & 1:
+                self.torn_reads += 1
+                continue
+            record = STATE_RECORD.unpack_from(self.buffer, RECORD_OFFSET)
+            if SEQUENCE.unpack_from(self.buffer, SEQUENCE_OFFSET)[0] == sequence:
+                self.record = record
+                break
+            self.torn_reads += 1
+        return self.record  # Falls back to the last consistent record if the writer never settled
+
+    @property
+    def state(self):
+        # Read once per frame, straight from the segment
+        record = self.read()
+        if record is None:
+            return FlightState(0, 0.0, 0.0, 0.0, 0.0)
+        tick, time, pitch, roll, heading, heading_select, speed_digits, _, _, flags = record
+        self.primary_flight_display.apply_mode_flags(flags, heading_select)
+        return FlightState(tick, time, pitch, roll, heading)
+
+    def handle_key_press(self, event):
+        pass  # Attitude comes from the simulation process
+
+    def handle_key_release(self, event):
+        pass
+
+    def close(self):
+        self.buffer = None
+        self.memory.close()
@@ -0,0 +1,169 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+from Atmosphere import mach_number, true_airspeed
+
+# Immutable snapshot of the aircraft state, published once per simulation tick
+FlightState = namedtuple('FlightState', ['tick', 'time', 'pitch', 'roll', 'heading'])
+
+class AngleAnimation:
+    # Linear ramp from the current value to a target, equivalent to the QPropertyAnimation it replaces
+    def __init__(self, value=0.0):
+        self.value = value
+        self.start_value = value
+        self.end_value = value
+        self.duration = 0
+        self.elapsed = 0
+
+    def start(self, end_value, duration):
+        self.start_value = self.value
+        self.end_value = end_value
+        self.duration = duration
+        self.elapsed = 0
+
+    def stop(self):
+        self.start_value = self.end_value = self.value
+        self.duration = self.elapsed = 0
+
+    def is_running(self):
+        return self.elapsed < self.duration
+
+    def advance(self, dt_ms):
+        if not self.is_running():
+            return False
+        self.elapsed = min(self.elapsed + dt_ms, self.duration)
+        self.value = self.start_value + (self.end_value - self.start_value) * self.elapsed / self.duration
+        return True
+
+class Simulation:
+    def __init__(self, tick_ms=10):
+        self.tick_ms = tick_ms  # Fixed simulation step in milliseconds
+        self.tick = 0
+        self.true_airspeed = 150  # True airspeed in knots
+        self.mach = 0.0
+        self.altitude = 0.0  # Feet, held by the autopilot: there is no vertical model
+        self.latitude = 0.0  # Degrees, flown along the heading at the true airspeed
+        self.longitude = 0.0
+        self.turn_rate_scale = 0.01 / 30  # Heading change per millisecond of turn rate (0.01 per 30 ms frame)
+        self.pitch_animation = AngleAnimation()
+        self.roll_animation = AngleAnimation()
+        self.heading = 0
+        self.tasks = []  # (period in ticks, callback) run from the simulation thread
+        self.observers = []  # Callbacks receiving each published FlightState, run from the simulation thread
+        self.commands = deque()  # Callbacks posted from other threads, run at the start of the next tick
+        self.overruns = 0  # Ticks that started later than their deadline
+        self.input_recorder = None  # Captures pilot inputs with the tick they arrived at, see Input_Recorder.py
+        self.state = FlightState(0, 0.0, 0.0, 0.0, 0.0)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.set_air_data(150, 0)
+
+    def set_air_data(self, indicated_airspeed, altitude):
+        # ISA conversion when the FCU speed or altitude changes; each tick only reads the result
+        self.altitude = altitude
+        self.true_airspeed = float(true_airspeed(indicated_airspeed, altitude))
+        self.mach = float(mach_number(indicated_airspeed, altitude))
+
+    @property
+    def pitch(self):
+        return self.pitch_animation.value
+
+    @property
+    def roll(self):
+        return self.roll_animation.value
+
+    def schedule(self, period_ms, callback):
+        self.tasks.append((max(1, round(period_ms / self.tick_ms)), callback))
+
+    def observe(self, callback):
+        self.observers.append(callback)
+
+    def post(self, callback):
+        self.commands.append(callback)
+
+    def call(self, callback):
+        # Run callback between two ticks and return its result; directly when the simulation thread is not running
+        if self._thread is None or threading.current_thread() is self._thread:
+            return callback()
+        done = threading.Event()
+        result = []
+
+        def run():
+            try:
+                result.append(callback())
+            finally:
+                done.set()  # Never leave the caller waiting, even if the callback fails
+        self.post(run)
+        done.wait()
+        return result[0]
+
+    def record_input(self, target, action, *args):
+        if self.input_recorder is not None:
+            self.input_recorder.record(self.tick, target, action, args)
+
+    def animate_pitch(self, pitch, duration):
+        self.pitch_animation.start(pitch, duration)
+
+    def animate_roll(self, roll, duration):
+        self.roll_animation.start(roll, duration)
+
+    def calculate_turn_rate(self):
+        if self.true_airspeed == 0:
+            return 0  # Prevent division by zero by returning 0 turn rate
+        # 1091 tan(roll) / (TAS * load factor) with a load factor of 1 / cos(roll): the cosine cancels, one sine per tick
+        return 1091 * math.sin(math.radians(self.roll)) / self.true_airspeed
+
+    def step(self):
+        while self.commands:
+            self.commands.popleft()()
+        self.tick += 1
+        for period, callback in self.tasks:
+            if self.tick % period == 0:
+                callback()
+
+        self.pitch_animation.advance(self.tick_ms)
+        if self.roll_animation.advance(self.tick_ms) and abs(self.roll_animation.value) < 0.18:
+            self.roll_animation.value = 0  # Round down to 0 if close to 0
+
+        if self.roll != 0:
+            # Update heading based on the turn rate for this bank angle
+            self.heading = (self.heading - self.calculate_turn_rate() * self.turn_rate_scale * self.tick_ms) % 360
+
+        # One step of great circle along the heading is a straight line at this scale; 1 NM is one minute of latitude
+        distance = self.true_airspeed * self.tick_ms / 3600000 / 60
+        heading = math.radians(self.heading)
+        self.latitude = min(max(self.latitude + distance * math.cos(heading), -89.9), 89.9)
+        self.longitude = (self.longitude + distance * math.sin(heading) / math.cos(math.radians(self.latitude)) + 180) % 360 - 180
+
+        # Publishing a new tuple is a single reference swap, so readers never see a partial update
+        self.state = FlightState(self.tick, self.tick * self.tick_ms / 1000, self.pitch, self.roll, self.heading)
+        for observer in self.observers:
+            observer(self.state)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='Simulation', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self):
+        period = self.tick_ms / 1000
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            self.step()
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                self.overruns += 1
+                if delay < -10 * period:
+                    next_tick = time.perf_counter()  # Too far behind: drop ticks instead of spiralling
@@ -0,0 +1,117 @@
+import struct
+from Simulation import FlightState
+from Telemetry import encode_modes
+
+# Full simulator state snapshot, little-endian, 196 bytes:
+#
+#   offset  size  type        field
+#   0       8     char[8]     magic b'PFDSNAP1'
+#   8       4     uint32      format version, currently 2
+#   12      4     uint32      simulation tick
+#   16      8     float64     heading
+#   24      8     float64     true airspeed, informative: a restore derives it from the FCU speed and the altitude
+#   32      40    float64[5]  pitch animation: value, start value, end value, duration, elapsed
+#   72      40    float64[5]  roll animation, same fields
+#   112     2     uint16      FCU heading select
+#   114     2     uint16      FCU speed/mach digits
+#   116     4     int32       FCU altitude select
+#   120     4     int32       FCU vertical speed digits
+#   124     2     uint16      mode flags, see MODE_FLAGS in Telemetry.py
+#   126     1     bool        heading select managed
+#   127     1     bool        controller HDG/TRK latch
+#   128     1     bool        controller heading printed
+#   129     3                 padding
+#   132     8     float64     heading knob angle
+#   140     8     float64     heading knob fractional rotation
+#   148     8     float64     speed knob angle
+#   156     8     float64     speed knob fractional rotation
+#   164     8                 reserved
+#   172     8     float64     latitude
+#   180     8     float64     longitude
+#   188     8     float64     altitude
+#
+# Everything the display draws is derived from these fields, so a restore never rebuilds widgets.
+# Version 1 snapshots end at offset 172; restoring one keeps the current position and flies the FCU altitude.
+SNAPSHOT_MAGIC = b'PFDSNAP1'
+SNAPSHOT_VERSION = 2
+SNAPSHOT = struct.Struct('<8sIIdd5d5dHHiiH???3xdddd8xddd')
+SNAPSHOT_V1 = struct.Struct('<8sIIdd5d5dHHiiH???3xdddd8x')
+
+def animation_fields(animation):
+    return animation.value, animation.start_value, animation.end_value, animation.duration, animation.elapsed
+
+def restore_animation(animation, fields):
+    animation.value, animation.start_value, animation.end_value, animation.duration, animation.elapsed = fields
+
+def take_snapshot(primary_flight_display):
+    simulation = primary_flight_display.simulation
+    fcu = primary_flight_display.flight_control_unit
+    controller = fcu.controller
+
+    def capture():
+        return SNAPSHOT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, simulation.tick, simulation.heading, simulation.true_airspeed,
+                             *animation_fields(simulation.pitch_animation), *animation_fields(simulation.roll_animation),
+                             fcu.heading_select, fcu.speed_digits, fcu.altitude_select, fcu.vertical_speed_digits,
+                             encode_modes(fcu), fcu.heading_managed, controller.hdg_trk_active, controller.heading_printed,
+                             fcu.knob.knob_angle, fcu.knob.total_rotation, fcu.spd_knob.knob_angle, fcu.spd_knob.total_rotation,
+                             simulation.latitude, simulation.longitude, simulation.altitude)
+    return simulation.call(capture)  # Between two ticks, so heading and attitude belong to the same step
+
+def restore_snapshot(primary_flight_display, snapshot):
+    if len(snapshot) == SNAPSHOT_V1.size:
+        magic, version, tick, heading, true_airspeed, *fields = SNAPSHOT_V1.unpack(snapshot)
+        position = None
+    else:
+        magic, version, tick, heading, true_airspeed, *fields = SNAPSHOT.unpack(snapshot)
+        position, fields = fields[-3:], fields[:-3]
+    if magic != SNAPSHOT_MAGIC or version != (1 if position is None else SNAPSHOT_VERSION):
+        raise ValueError("Not a PFD snapshot")
+    pitch_fields, roll_fields = fields[0:5], fields[5:10]
+    (heading_select, speed_digits, altitude_select, vertical_speed_digits, flags, heading_managed,
+     hdg_trk_latch, heading_printed, knob_angle, knob_rotation, spd_knob_angle, spd_knob_rotation) = fields[10:]
+    simulation = primary_flight_display.simulation
+    altitude = altitude_select if position is None else position[2]
+    fcu = primary_flight_display.flight_control_unit
+    controller = fcu.controller
+
+    def restore():
+        simulation.record_input('snapshot', 'restore', snapshot.hex())  # Logged at the tick it abandons
+        simulation.commands.clear()  # Inputs posted before the restore belong to the abandoned timeline
+        simulation.tick = tick
+        simulation.heading = heading
+        if position is not None:
+            simulation.latitude, simulation.longitude = position[:2]
+        simulation.set_air_data(speed_digits, altitude)
+        restore_animation(simulation.pitch_animation, pitch_fields)
+        restore_animation(simulation.roll_animation, roll_fields)
+        simulation.state = FlightState(tick, tick * simulation.tick_ms / 1000, simulation.pitch, simulation.roll, heading)
+        primary_flight_display.input_control.keys_pressed.clear()  # Arrow keys and scenario key actions
+        fcu.input_control.keys_pressed.clear()
+        controller.hdg_trk_active = hdg_trk_latch
+        controller.heading_printed = heading_printed
+        fcu.altitude_select = altitude_select
+        fcu.vertical_speed_digits = vertical_speed_digits
+    simulation.call(restore)
+
+    # Widgets belong to the GUI thread; digit rows are only rebuilt when a selection differs
+    fcu.show_modes(flags)
+    if (heading_select, heading_managed) != (fcu.heading_select, fcu.heading_managed):
+        fcu.heading_select, fcu.heading_managed = heading_select, heading_managed
+        fcu.add_segment_digits(fcu.hdg_layout, heading_select, heading_managed)
+    if speed_digits != fcu.speed_digits:
+        fcu.speed_digits = speed_digits
+        fcu.add_segment_digits(fcu.spd_layout, speed_digits)
+    fcu.knob.managed_mode = heading_managed
+    fcu.knob.knob_angle, fcu.knob.total_rotation = knob_angle, knob_rotation
+    fcu.spd_knob.knob_angle, fcu.spd_knob.total_rotation = spd_knob_angle, spd_knob_rotation
+    primary_flight_display.apply_mode_flags(flags, heading_select)
+    fcu.update()
+    primary_flight_display.update()
+
+def save_snapshot(path, snapshot):
+    with open(path, 'wb') as snapshot_file:
+        snapshot_file.write(snapshot)
+
+def load_snapshot(path):
+    with open(path, 'rb') as snapshot_file:
+        return snapshot_file.read(SNAPSHOT.size)
@@ -0,0 +1,93 @@
+import argparse
+import time
+from collections import namedtuple
+from Render_Benchmark import create_application
+
+# Stress check of the simulation thread against a stalled GUI thread. Runs the display with its simulation
+# thread and makes every paint take STALL milliseconds longer, then checks that the simulation kept its tick
+# rate and rarely missed a deadline:
+#   python Stall_Check.py                       stalls of 0, 20, 50, 100 and 250 ms, exit status 1 on any failure
+#   python Stall_Check.py --stalls 500 --seconds 10 --spin
+# By default the paint sleeps, as a GUI thread waiting on a modal dialog or a slow driver does; --spin busies it
+# in Python instead, so the simulation thread also has to win the interpreter lock back every tick.
+# The tick rate must be within TOLERANCE of 1000 / tick_ms, and at most OVERRUNS of the ticks may start late.
+STALLS_MS = [0, 20, 50, 100, 250]
+SECONDS = 5.0
+TOLERANCE = 0.02  # Share of the nominal tick rate
+OVERRUNS = 0.05  # Share of the ticks; a spinning GUI thread makes 1 to 2% late on one core
+
+StallResult = namedtuple('StallResult', ['stall_ms', 'frames', 'ticks', 'expected', 'overruns'])
+
+def stalled_display(backend, stall_ms, spin):
+    from Primary_Flight_Display import PrimaryFlightDisplay
+
+    class StalledDisplay(PrimaryFlightDisplay):
+        frames = 0
+
+        def paintEvent(self, event):
+            super().paintEvent(event)
+            self.frames += 1
+            if not spin:
+                time.sleep(stall_ms / 1000)
+                return
+            end = time.perf_counter() + stall_ms / 1000
+            while time.perf_counter() < end:
+                pass
+
+    if backend == 'immediate':
+        return StalledDisplay(display_lists=False)
+    if backend == 'threaded':
+        return StalledDisplay(threaded_layers=True)
+    return StalledDisplay()
+
+def run_stall(app, backend, stall_ms, seconds, spin):
+    from PyQt5.QtCore import QTimer
+    display = stalled_display(backend, stall_ms, spin)
+    simulation = display.simulation
+    display.show()
+    start = {}
+
+    def begin():
+        # After the first frames, once the window is up
+        start.update(time=time.perf_counter(), tick=simulation.tick, overruns=simulation.overruns, frames=display.frames)
+        QTimer.singleShot(int(seconds * 1000), app.quit)
+
+    QTimer.singleShot(500, begin)
+    app.exec_()
+    elapsed = time.perf_counter() - start['time']
+    ticks = simulation.tick - start['tick']
+    overruns = simulation.overruns - start['overruns']
+    frames = display.frames - start['frames']
+    display.close()
+    return StallResult(stall_ms, frames / elapsed, ticks / elapsed, 1000 / simulation.tick_ms, overruns / max(ticks, 1))
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the simulation tick rate while the GUI thread stalls on every paint')
+    parser.add_argument('--stalls', type=float, nargs='+', default=STALLS_MS, metavar='MS', help='Extra milliseconds per paint')
+    parser.add_argument('--seconds', type=float, default=SECONDS, help='Measured time at each stall')
+    parser.add_argument('--backend', choices=['immediate', 'widget', 'threaded'], default='widget')
+    parser.add_argument('--spin', action='store_true', help='Busy the GUI thread instead of sleeping')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help=f'Allowed tick rate error (default: {TOLERANCE:g})')
+    parser.add_argument('--overruns', type=float, default=OVERRUNS, help=f'Allowed share of late ticks (default: {OVERRUNS:g})')
+    args = parser.parse_args()
+
+    app = create_application()
+    failed = 0
+    for stall_ms in args.stalls:
+        result = run_stall(app, args.backend, stall_ms, args.seconds, args.spin)
+        errors = []
+        if abs(result.ticks / result.expected - 1) > args.tolerance:
+            errors.append(f"{result.ticks:.1f} ticks/s, {result.expected:g} ± {args.tolerance:.0%} expected")
+        if result.overruns > args.overruns:
+            errors.append(f"{result.overruns:.1%} of the ticks late, {args.overruns:.0%} allowed")
+        status = 'FAIL' if errors else 'ok'
+        failed += bool(errors)
+        print(f"{status:5} stall {stall_ms:g} ms: {result.frames:.1f} frames/s, {result.ticks:.1f} ticks/s, "
+              f"{result.overruns:.1%} late")
+        for message in errors:
+            print(f"      {message}")
+    print(f"{len(args.stalls) - failed}/{len(args.stalls)} stalls passed on the {args.backend} backend")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
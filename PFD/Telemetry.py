@@ -0,0 +1,94 @@
+import struct
+
+# Flight state datagram, little-endian, 28 bytes:
+#
+#   offset  size  type     field
+#   0       4     char[4]  magic b'PFDS'
+#   4       4     uint32   sequence number, incremented per packet, wraps at 2**32
+#   8       4     float32  pitch in degrees, nose up positive
+#   12      4     float32  roll in degrees, same sign convention as the display
+#   16      4     float32  heading in degrees [0, 360)
+#   20      4     float32  indicated airspeed in knots
+#   24      2     uint16   selected heading in degrees
+#   26      2     uint16   mode flags, see MODE_FLAGS
+FLIGHT_STATE_MAGIC = b'PFDS'
+FLIGHT_STATE = struct.Struct('<4sIffffHH')
+
+# FCU mode attribute -> bit in the mode flags field
+MODE_FLAGS = (
+    ('ap1_active', 1 << 0),
+    ('ap2_active', 1 << 1),
+    ('alt_hold_armed', 1 << 2),
+    ('alt_hold_active', 1 << 3),
+    ('hdg_trk_active', 1 << 4),
+    ('loc_active', 1 << 5),
+    ('appr_active', 1 << 6),
+    ('athr_armed', 1 << 7),
+    ('athr_active', 1 << 8),
+)
+
+def encode_modes(flight_control_unit):
+    flags = 0
+    for name, bit in MODE_FLAGS:
+        if getattr(flight_control_unit, name):
+            flags |= bit
+    return flags
+
+def decode_modes(flags):
+    return {name: bool(flags & bit) for name, bit in MODE_FLAGS}
+
+def sequence_gap(last_sequence, sequence):
+    # Packets between two sequence numbers, negative or zero for duplicates and reordering
+    gap = (sequence - last_sequence) % 2**32
+    return gap - 2**32 if gap >= 2**31 else gap
+
+# Full state batch datagram published by the simulation, little-endian:
+#
+#   header, 12 bytes
+#   0       4     char[4]  magic b'PFDB'
+#   4       2     uint16   format version, currently 1
+#   6       2     uint16   number of records that follow
+#   8       4     uint32   datagram sequence number, wraps at 2**32
+#
+#   record, 40 bytes each
+#   0       4     uint32   simulation tick
+#   4       8     float64  simulation time in seconds
+#   12      4     float32  pitch in degrees
+#   16      4     float32  roll in degrees
+#   20      4     float32  heading in degrees
+#   24      2     uint16   FCU heading_select
+#   26      2     uint16   FCU speed_digits
+#   28      4     int32    FCU altitude_select
+#   32      4     int32    FCU vertical_speed_digits
+#   36      2     uint16   mode flags, see MODE_FLAGS
+#   38      2              padding
+STATE_BATCH_MAGIC = b'PFDB'
+STATE_BATCH_VERSION = 1
+STATE_BATCH_HEADER = struct.Struct('<4sHHI')
+STATE_RECORD = struct.Struct('<IdfffHHiiHxx')
+
+TELEMETRY_GROUP = '239.255.42.99'
+TELEMETRY_PORT = 49006
+
+# Traffic datagram, position reports of other aircraft, little-endian:
+#
+#   header, 12 bytes
+#   0       4     char[4]  magic b'PFDX'
+#   4       2     uint16   format version, currently 1
+#   6       2     uint16   number of reports that follow, at most TRAFFIC_BATCH
+#   8       4     uint32   datagram sequence number, wraps at 2**32
+#
+#   report, 36 bytes each
+#   0       4     uint32   aircraft address (24-bit ICAO address)
+#   4       8     float64  latitude in degrees
+#   12      8     float64  longitude in degrees
+#   20      4     float32  altitude in feet
+#   24      4     float32  track in degrees true
+#   28      4     float32  ground speed in knots
+#   32      4     float32  vertical speed in feet per minute
+TRAFFIC_MAGIC = b'PFDX'
+TRAFFIC_VERSION = 1
+TRAFFIC_HEADER = struct.Struct('<4sHHI')
+TRAFFIC_REPORT = struct.Struct('<Iddffff')
+TRAFFIC_BATCH = 40  # Reports per datagram, 1452 bytes: one Ethernet frame
+TRAFFIC_PORT = 49007
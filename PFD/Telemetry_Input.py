@@ -0,0 +1,110 @@
+import socket
+import time
+from PyQt5.QtCore import QObject, QSocketNotifier
+from Simulation import FlightState
+from Telemetry import FLIGHT_STATE, FLIGHT_STATE_MAGIC, sequence_gap
+
+# A sender that restarts counts from 0 again. Packets further behind the last one than REORDER_WINDOW, or any
+# packet after RESYNC_AFTER seconds without one accepted, start the count over instead of being dropped as stale.
+REORDER_WINDOW = 64
+RESYNC_AFTER = 1.0
+
+class TelemetryInput(QObject):
+    def __init__(self, primary_flight_display, port, host='127.0.0.1'):
+        super().__init__()
+        self.primary_flight_display = primary_flight_display
+        self.state = FlightState(0, 0.0, 0.0, 0.0, 0.0)
+        self.last_sequence = None
+        self.last_accepted = None  # time.monotonic() of the last packet in sequence
+        self.buffer = bytearray(2048)  # Larger than any valid datagram so oversized packets are detected
+
+        # Statistics
+        self.received = 0  # Datagrams read from the socket
+        self.applied = 0  # Datagrams that reached the display
+        self.superseded = 0  # Valid datagrams replaced by a newer one in the same drain
+        self.dropped = 0  # Sequence numbers never seen
+        self.stale = 0  # Duplicated or reordered datagrams
+        self.resyncs = 0  # Sequence restarts, e.g. the sender was restarted
+        self.malformed = 0
+        self.start_time = time.monotonic()
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        self.notifier = QSocketNotifier(self.socket.fileno(), QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self.read_pending)
+
+    def read_pending(self):
+        # Drain everything queued since the last wakeup and keep only the newest packet
+        arrival = time.perf_counter()
+        now = time.monotonic()
+        newest = None
+        while True:
+            try:
+                size = self.socket.recv_into(self.buffer)
+            except BlockingIOError:
+                break
+            except OSError:
+                break  # e.g. ICMP errors reported on the socket, nothing to read
+            self.received += 1
+            if self.primary_flight_display.metrics is not None:
+                self.primary_flight_display.metrics.input_event('udp')
+            if size != FLIGHT_STATE.size or self.buffer[:4] != FLIGHT_STATE_MAGIC:
+                self.malformed += 1
+                continue
+            packet = FLIGHT_STATE.unpack_from(self.buffer)
+            sequence = packet[1]
+            if self.last_sequence is not None:
+                gap = sequence_gap(self.last_sequence, sequence)
+                if gap < -REORDER_WINDOW or (gap <= 0 and now - self.last_accepted > RESYNC_AFTER):
+                    self.resyncs += 1
+                elif gap <= 0:
+                    self.stale += 1
+                    continue
+                else:
+                    self.dropped += gap - 1
+            self.last_sequence = sequence
+            self.last_accepted = now
+            if newest is not None:
+                self.superseded += 1
+            newest = packet
+        if newest is not None:
+            latency_probe = self.primary_flight_display.latency_probe
+            if latency_probe is not None:
+                latency_probe.input('udp', arrival)
+            self.apply(newest)
+            if latency_probe is not None:
+                latency_probe.consume('udp', self.state)
+
+    def apply(self, packet):
+        _, sequence, pitch, roll, heading, airspeed, selected_heading, flags = packet
+        self.state = FlightState(sequence, time.monotonic() - self.start_time, pitch, roll, heading)
+        self.applied += 1
+        self.primary_flight_display.speed = airspeed
+        self.primary_flight_display.apply_mode_flags(flags, selected_heading)
+        self.primary_flight_display.update()
+
+    def handle_key_press(self, event):
+        pass  # Attitude comes from the external simulator
+
+    def handle_key_release(self, event):
+        pass
+
+    def statistics(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            'received': self.received,
+            'applied': self.applied,
+            'superseded': self.superseded,
+            'dropped': self.dropped,
+            'stale': self.stale,
+            'resyncs': self.resyncs,
+            'malformed': self.malformed,
+            'packet_rate': self.received / elapsed,
+        }
+
+    def close(self):
+        self.notifier.setEnabled(False)
+        self.socket.close()
+        print(f"Telemetry input: {self.statistics()}")
@@ -0,0 +1,47 @@
+import socket
+from Telemetry import (STATE_BATCH_HEADER, STATE_BATCH_MAGIC, STATE_BATCH_VERSION, STATE_RECORD,
+                       TELEMETRY_GROUP, TELEMETRY_PORT, encode_modes)
+
+class TelemetryPublisher:
+    def __init__(self, simulation, flight_control_unit, group=TELEMETRY_GROUP, port=TELEMETRY_PORT, batch_ticks=2):
+        self.flight_control_unit = flight_control_unit
+        self.address = (group, port)
+        self.batch_ticks = batch_ticks  # Records per datagram (2 ticks = 50 datagrams per second at 100 Hz)
+        self.buffer = bytearray(STATE_BATCH_HEADER.size + STATE_RECORD.size * batch_ticks)
+        self.view = memoryview(self.buffer)
+        self.count = 0
+        self.sequence = 0
+        self.sent = 0
+        self.send_failures = 0  # Datagrams dropped because the socket would block or the network refused them
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)  # Stay on the local network
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)  # Deliver to subscribers on this machine
+        self.socket.setblocking(False)
+        simulation.observe(self.capture)  # Runs on the simulation thread, never on the GUI thread
+
+    def capture(self, state):
+        fcu = self.flight_control_unit
+        STATE_RECORD.pack_into(self.buffer, STATE_BATCH_HEADER.size + self.count * STATE_RECORD.size,
+                               state.tick, state.time, state.pitch, state.roll, state.heading,
+                               fcu.heading_select, fcu.speed_digits, fcu.altitude_select, fcu.vertical_speed_digits,
+                               encode_modes(fcu))
+        self.count += 1
+        if self.count == self.batch_ticks:
+            self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        self.sequence = (self.sequence + 1) % 2**32
+        STATE_BATCH_HEADER.pack_into(self.buffer, 0, STATE_BATCH_MAGIC, STATE_BATCH_VERSION, self.count, self.sequence)
+        try:
+            self.socket.sendto(self.view[:STATE_BATCH_HEADER.size + self.count * STATE_RECORD.size], self.address)
+            self.sent += 1
+        except OSError:
+            self.send_failures += 1  # Never wait for the network; the next batch supersedes this one
+        self.count = 0
+
+    def close(self):
+        self.flush()
+        self.socket.close()
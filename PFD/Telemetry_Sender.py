@@ -0,0 +1,75 @@
+import argparse
+import math
+import random
+import socket
+import time
+from Telemetry import FLIGHT_STATE, FLIGHT_STATE_MAGIC, MODE_FLAGS
+
+# Stand-in for an external simulator: streams a synthetic flight to the PFD's UDP input.
+# Run the display with `python Primary_Flight_Display.py --udp 49005`, then this script.
+
+def synthetic_state(t):
+    roll = 25 * math.sin(t * 2 * math.pi / 40)  # Gentle S-turns
+    pitch = 3 * math.sin(t * 2 * math.pi / 15)
+    heading = (t * 3) % 360
+    airspeed = 250 + 10 * math.sin(t * 2 * math.pi / 60)
+    selected_heading = int(heading + 30) % 360
+    modes = dict(MODE_FLAGS)
+    # Cycle through AP1 + HDG, AP1 + LOC and AP1 + APPR every 20 seconds
+    phase = int(t // 20) % 3
+    flags = modes['ap1_active'] | modes['hdg_trk_active']
+    if phase == 1:
+        flags |= modes['loc_active']
+    elif phase == 2:
+        flags |= modes['appr_active']
+    return pitch, roll, heading, airspeed, selected_heading, flags
+
+def main():
+    parser = argparse.ArgumentParser(description='Send synthetic flight state datagrams to the PFD')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=49005)
+    parser.add_argument('--rate', type=float, default=120, help='Packets per second')
+    parser.add_argument('--duration', type=float, default=0, help='Seconds to run, 0 for forever')
+    parser.add_argument('--loss', type=float, default=0, help='Fraction of packets to skip, to exercise drop accounting')
+    args = parser.parse_args()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    buffer = bytearray(FLIGHT_STATE.size)
+    period = 1 / args.rate
+    start = time.perf_counter()
+    next_send = start
+    report_time = start + 1
+    sequence = 0
+    sent = skipped = send_errors = 0
+    sent_since_report = 0
+
+    try:
+        while not args.duration or time.perf_counter() - start < args.duration:
+            now = time.perf_counter()
+            if now < next_send:
+                time.sleep(next_send - now)
+                continue
+            next_send += period
+            sequence = (sequence + 1) % 2**32
+            if args.loss and random.random() < args.loss:
+                skipped += 1
+                continue
+            FLIGHT_STATE.pack_into(buffer, 0, FLIGHT_STATE_MAGIC, sequence, *synthetic_state(now - start))
+            try:
+                sock.sendto(buffer, (args.host, args.port))
+                sent += 1
+                sent_since_report += 1
+            except (BlockingIOError, ConnectionRefusedError):
+                send_errors += 1
+            if now >= report_time:
+                print(f"sent {sent}  rate {sent_since_report / (now - report_time + 1):.1f}/s  skipped {skipped}  send errors {send_errors}")
+                report_time = now + 1
+                sent_since_report = 0
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"Total: sent {sent} in {elapsed:.1f} s ({sent / elapsed:.1f}/s), skipped {skipped}, send errors {send_errors}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import socket
+import struct
+import time
+from collections import namedtuple
+from Telemetry import (STATE_BATCH_HEADER, STATE_BATCH_MAGIC, STATE_BATCH_VERSION, STATE_RECORD,
+                       TELEMETRY_GROUP, TELEMETRY_PORT, decode_modes, sequence_gap)
+
+# Decoded STATE_RECORD, fields in packet order
+StateRecord = namedtuple('StateRecord', ['tick', 'time', 'pitch', 'roll', 'heading', 'heading_select',
+                                         'speed_digits', 'altitude_select', 'vertical_speed_digits', 'mode_flags'])
+
+def decode_batch(view, size):
+    # Decode records straight out of the receive buffer, without slicing or copying it
+    if size < STATE_BATCH_HEADER.size:
+        return None, []
+    magic, version, count, sequence = STATE_BATCH_HEADER.unpack_from(view, 0)
+    if magic != STATE_BATCH_MAGIC or version != STATE_BATCH_VERSION or size != STATE_BATCH_HEADER.size + count * STATE_RECORD.size:
+        return None, []
+    return sequence, [StateRecord._make(STATE_RECORD.unpack_from(view, STATE_BATCH_HEADER.size + i * STATE_RECORD.size))
+                      for i in range(count)]
+
+class TelemetrySubscriber:
+    def __init__(self, group=TELEMETRY_GROUP, port=TELEMETRY_PORT, interface='0.0.0.0'):
+        self.buffer = bytearray(65536)
+        self.view = memoryview(self.buffer)
+        self.last_sequence = None
+        self.dropped = 0  # Datagrams never received
+        self.malformed = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Several subscribers on one machine
+        self.socket.bind(('', port))
+        membership = struct.pack('4s4s', socket.inet_aton(group), socket.inet_aton(interface))
+        self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def receive(self, timeout=None):
+        # Block up to timeout seconds for the next batch; returns its records, oldest first
+        self.socket.settimeout(timeout)
+        try:
+            size = self.socket.recv_into(self.buffer)
+        except (socket.timeout, BlockingIOError):
+            return []
+        sequence, records = decode_batch(self.view, size)
+        if sequence is None:
+            self.malformed += 1
+            return []
+        if self.last_sequence is not None:
+            gap = sequence_gap(self.last_sequence, sequence)
+            if gap <= 0:
+                return []  # Duplicate or reordered batch
+            self.dropped += gap - 1
+        self.last_sequence = sequence
+        return records
+
+    def close(self):
+        self.socket.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the state published by a running PFD simulation')
+    parser.add_argument('--group', default=TELEMETRY_GROUP)
+    parser.add_argument('--port', type=int, default=TELEMETRY_PORT)
+    args = parser.parse_args()
+
+    subscriber = TelemetrySubscriber(args.group, args.port)
+    records = 0
+    report_time = time.monotonic() + 1
+    latest = None
+    try:
+        while True:
+            batch = subscriber.receive(timeout=1)
+            records += len(batch)
+            if batch:
+                latest = batch[-1]
+            if time.monotonic() >= report_time:
+                if latest is not None:
+                    modes = [name for name, active in decode_modes(latest.mode_flags).items() if active]
+                    print(f"{records} records/s  dropped {subscriber.dropped}  t={latest.time:.2f}  "
+                          f"hdg {latest.heading:.1f}  roll {latest.roll:.1f}  pitch {latest.pitch:.1f}  "
+                          f"sel {latest.heading_select:03d}  {' '.join(modes)}")
+                records = 0
+                report_time += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import math
+import socket
+import time
+from collections import namedtuple
+import numpy as np
+from ILS_Receiver import cell_key, cells_around
+from Telemetry import TRAFFIC_BATCH, TRAFFIC_HEADER, TRAFFIC_MAGIC, TRAFFIC_REPORT, TRAFFIC_VERSION
+
+# Traffic from a local UDP feed of position reports (format in Telemetry.py, stand-in feed in Traffic_Sender.py).
+# Everything runs on the simulation thread after each tick: the socket is drained, the reports are written into
+# the store, and only the grid cells around the aircraft are assessed, so the per-tick cost follows the traffic
+# density near the aircraft rather than the number of aircraft tracked. The display reads the published results.
+# Advisories follow the TCAS traffic advisory test: an intruder is a threat when it is closing to within TA_TAU
+# seconds or inside TA_RANGE, and is within TA_ALTITUDE or closing vertically within TA_TAU seconds.
+REPORT_DTYPE = np.dtype({  # NumPy view of TRAFFIC_REPORT
+    'names': ['address', 'latitude', 'longitude', 'altitude', 'track', 'speed', 'vertical_speed'],
+    'formats': ['<u4', '<f8', '<f8', '<f4', '<f4', '<f4', '<f4'],
+    'offsets': [0, 4, 12, 20, 24, 28, 32],
+    'itemsize': TRAFFIC_REPORT.size,
+})
+CELL = 0.25  # Grid cell size in degrees, 15 NM of latitude
+SURVEILLANCE_RANGE = 15.0  # NM assessed around the aircraft; a 1200 kt closure covers 13 NM in TA_TAU
+DISPLAY_ALTITUDE = 2700.0  # Feet above or below, intruders farther away are not listed
+TA_TAU = 40.0  # Seconds
+TA_RANGE = 0.55  # NM
+TA_ALTITUDE = 850.0  # Feet
+EXPIRY = 10.0  # Seconds without a report before an intruder is dropped
+THREATS_LISTED = 4
+MAX_DATAGRAMS_PER_TICK = 256  # Bounds the work of one tick; the rest waits in the socket buffer
+
+# Most urgent first; range and bearing in NM and degrees true, tau in seconds (inf when not closing)
+Threat = namedtuple('Threat', ['address', 'range', 'bearing', 'relative_altitude', 'tau', 'advisory'])
+
+def valid_reports(reports):
+    # Positions on the globe and finite motion; anything else would land outside the grid and never expire
+    values = [reports[name] for name in ('latitude', 'longitude', 'altitude', 'track', 'speed', 'vertical_speed')]
+    return bool(np.isfinite(values).all() and (np.abs(reports['latitude']) <= 90).all() and
+                (np.abs(reports['longitude']) <= 180).all())
+
+class TrafficStore:
+    # Intruders in parallel arrays indexed by slot, grown by doubling; released slots are reused.
+    # The grid maps a cell key to the set of slots in it and only changes when an intruder crosses a cell edge.
+    def __init__(self, capacity=1024):
+        self.slots = {}  # Address -> slot
+        self.free = []
+        self.count = 0  # Slots ever used
+        self.grid = {}
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        def grow(array, dtype, fill=0):
+            grown = np.full(capacity, fill, dtype=dtype)
+            if array is not None:
+                grown[:len(array)] = array
+            return grown
+        previous = getattr(self, 'addresses', None) is not None
+        get = (lambda name: getattr(self, name)) if previous else (lambda name: None)
+        self.addresses = grow(get('addresses'), np.uint32)
+        self.latitudes = grow(get('latitudes'), np.float64)
+        self.longitudes = grow(get('longitudes'), np.float64)
+        self.altitudes = grow(get('altitudes'), np.float64)
+        self.tracks = grow(get('tracks'), np.float64)
+        self.speeds = grow(get('speeds'), np.float64)
+        self.vertical_speeds = grow(get('vertical_speeds'), np.float64)
+        self.updated = grow(get('updated'), np.float64)
+        self.cells = grow(get('cells'), np.int64, -1)  # -1 for a free slot
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.slots)
+
+    def slot(self, address):
+        slot = self.slots.get(address)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                if self.count == self.capacity:
+                    self.allocate(2 * self.capacity)
+                slot = self.count
+                self.count += 1
+            self.slots[address] = slot
+            self.addresses[slot] = address
+        return slot
+
+    def update(self, reports, now):
+        # reports: REPORT_DTYPE array; a batch is written column by column
+        slots = np.fromiter((self.slot(address) for address in reports['address'].tolist()), np.int64, len(reports))
+        self.latitudes[slots] = reports['latitude']
+        self.longitudes[slots] = reports['longitude']
+        self.altitudes[slots] = reports['altitude']
+        self.tracks[slots] = reports['track']
+        self.speeds[slots] = reports['speed']
+        self.vertical_speeds[slots] = reports['vertical_speed']
+        self.updated[slots] = now
+        keys = cell_key(reports['latitude'], reports['longitude'], CELL)
+        for slot, key in zip(slots[keys != self.cells[slots]].tolist(), keys[keys != self.cells[slots]].tolist()):
+            self.move(slot, key)
+
+    def move(self, slot, key):
+        old = int(self.cells[slot])
+        if old == key:
+            return  # Reported twice in one batch
+        if old >= 0:
+            cell = self.grid[old]
+            cell.discard(slot)
+            if not cell:
+                del self.grid[old]
+        if key >= 0:
+            self.grid.setdefault(key, set()).add(slot)
+        self.cells[slot] = key
+
+    def expire(self, now):
+        stale = np.nonzero((self.cells[:self.count] >= 0) & (self.updated[:self.count] < now - EXPIRY))[0]
+        for slot in stale.tolist():
+            self.move(slot, -1)
+            del self.slots[int(self.addresses[slot])]
+            self.free.append(slot)
+        return len(stale)
+
+    def nearby(self, latitude, longitude, range_nm):
+        slots = []
+        for key in cells_around(latitude, longitude, range_nm, CELL):
+            cell = self.grid.get(key)
+            if cell:
+                slots.extend(cell)
+        return np.array(slots, dtype=np.int64)
+
+def assess(store, slots, latitude, longitude, altitude, heading, true_airspeed, now):
+    # Threats among slots, most urgent first, and the number of them raising an advisory
+    if len(slots) == 0:
+        return (), 0
+    age = (now - store.updated[slots]) / 3600  # Hours since the report, positions are extrapolated to now
+    tracks = np.radians(store.tracks[slots])
+    speeds = store.speeds[slots]
+    cos_latitude = math.cos(math.radians(latitude))
+    north = (store.latitudes[slots] - latitude) * 60 + speeds * np.cos(tracks) * age  # NM
+    east = ((store.longitudes[slots] - longitude + 180) % 360 - 180) * 60 * cos_latitude + speeds * np.sin(tracks) * age
+    relative_altitude = store.altitudes[slots] + store.vertical_speeds[slots] * age * 60 - altitude
+    nearby = (np.abs(relative_altitude) <= DISPLAY_ALTITUDE) & (np.hypot(north, east) <= SURVEILLANCE_RANGE)
+    if not nearby.any():
+        return (), 0
+    slots, north, east, relative_altitude = slots[nearby], north[nearby], east[nearby], relative_altitude[nearby]
+    tracks, speeds = tracks[nearby], speeds[nearby]
+    heading = math.radians(heading)
+    closing_north = speeds * np.cos(tracks) - true_airspeed * math.cos(heading)  # Knots
+    closing_east = speeds * np.sin(tracks) - true_airspeed * math.sin(heading)
+    ranges = np.hypot(north, east)
+    range_rate = (north * closing_north + east * closing_east) / np.maximum(ranges, 1e-6)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.where(range_rate < 0, -ranges / range_rate * 3600, np.inf)
+        vertical_speeds = store.vertical_speeds[slots]  # The aircraft holds its altitude
+        vertical_tau = np.where(relative_altitude * vertical_speeds < 0, -relative_altitude / vertical_speeds * 60, np.inf)
+    advisory = ((tau < TA_TAU) | (ranges < TA_RANGE)) & ((np.abs(relative_altitude) < TA_ALTITUDE) | (vertical_tau < TA_TAU))
+    order = np.lexsort((ranges, tau, ~advisory))[:THREATS_LISTED]
+    bearings = np.degrees(np.arctan2(east, north)) % 360
+    threats = tuple(Threat(int(store.addresses[slots[i]]), float(ranges[i]), float(bearings[i]), float(relative_altitude[i]),
+                           float(tau[i]), bool(advisory[i])) for i in order)
+    return threats, int(advisory.sum())
+
+class TrafficMonitor:
+    def __init__(self, simulation, port, host='127.0.0.1', metrics=None):
+        self.simulation = simulation
+        self.metrics = metrics
+        self.store = TrafficStore()
+        self.threats = ()  # Published each tick for the display, replaced as a whole
+        self.advisories = 0  # Intruders raising a traffic advisory
+        self.buffer = bytearray(2048)  # Larger than any valid datagram so oversized packets are detected
+
+        # Statistics
+        self.datagrams = 0
+        self.reports = 0
+        self.malformed = 0  # Datagrams dropped: bad header or size, or a report off the globe or not finite
+        self.assessed = 0  # Intruders in the cells around the aircraft at the last tick
+        self.tick_time = 0.0  # Seconds spent in update, summed
+        self.ticks = 0
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)  # Several seconds of a dense feed
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+        simulation.observe(self.update)
+        simulation.schedule(1000, lambda: self.store.expire(time.monotonic()))
+
+    def update(self, state):
+        # Simulation thread, after every tick
+        start = time.perf_counter()
+        now = time.monotonic()
+        self.drain(now)
+        simulation = self.simulation
+        slots = self.store.nearby(simulation.latitude, simulation.longitude, SURVEILLANCE_RANGE)
+        self.assessed = len(slots)
+        self.threats, self.advisories = assess(self.store, slots, simulation.latitude, simulation.longitude,
+                                               simulation.altitude, state.heading, simulation.true_airspeed, now)
+        self.tick_time += time.perf_counter() - start
+        self.ticks += 1
+
+    def drain(self, now):
+        for _ in range(MAX_DATAGRAMS_PER_TICK):
+            try:
+                size = self.socket.recv_into(self.buffer)
+            except (BlockingIOError, OSError):
+                return
+            self.datagrams += 1
+            if size < TRAFFIC_HEADER.size:
+                self.malformed += 1
+                continue
+            magic, version, count, sequence = TRAFFIC_HEADER.unpack_from(self.buffer)
+            if magic != TRAFFIC_MAGIC or version != TRAFFIC_VERSION or count > TRAFFIC_BATCH or \
+                    size != TRAFFIC_HEADER.size + count * TRAFFIC_REPORT.size:
+                self.malformed += 1
+                continue
+            reports = np.frombuffer(self.buffer, dtype=REPORT_DTYPE, count=count, offset=TRAFFIC_HEADER.size)
+            if not valid_reports(reports):
+                self.malformed += 1
+                continue
+            self.store.update(reports, now)
+            self.reports += count
+            if self.metrics is not None:
+                self.metrics.input_event('traffic', count)
+
+    def statistics(self):
+        return {'tracked': len(self.store), 'assessed': self.assessed, 'datagrams': self.datagrams, 'reports': self.reports,
+                'malformed': self.malformed, 'mean_tick_us': self.tick_time / self.ticks * 1e6 if self.ticks else 0.0}
+
+    def close(self):
+        self.socket.close()
+
+def benchmark(totals, local, ticks):
+    # The same number of intruders around the aircraft, ever more traffic elsewhere
+    generator = np.random.default_rng(0)
+    print(f"{'tracked':>8} {'nearby':>7} {'ingest/report':>14} {'assess/tick':>12}")
+    for total in totals:
+        store = TrafficStore()
+        reports = np.zeros(total, dtype=REPORT_DTYPE)
+        reports['address'] = np.arange(1, total + 1)
+        far = total - local
+        reports['latitude'][:far] = generator.uniform(-60, 60, far)
+        reports['longitude'][:far] = generator.uniform(20, 180, far)  # Nowhere near the aircraft
+        reports['latitude'][far:] = 51.5 + generator.uniform(-0.2, 0.2, local)
+        reports['longitude'][far:] = generator.uniform(-0.3, 0.3, local)
+        reports['altitude'] = generator.uniform(1000, 4000, total)
+        reports['track'] = generator.uniform(0, 360, total)
+        reports['speed'] = generator.uniform(120, 300, total)
+        now = time.monotonic()
+        start = time.perf_counter()
+        for first in range(0, total, TRAFFIC_BATCH):
+            store.update(reports[first:first + TRAFFIC_BATCH], now)
+        ingest = (time.perf_counter() - start) / total
+        start = time.perf_counter()
+        for _ in range(ticks):
+            slots = store.nearby(51.5, 0.0, SURVEILLANCE_RANGE)
+            assess(store, slots, 51.5, 0.0, 2500, 270, 250, now)
+        tick = (time.perf_counter() - start) / ticks
+        print(f"{total:8d} {len(slots):7d} {ingest * 1e6:11.2f} us {tick * 1e6:9.1f} us")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time traffic ingest and the per-tick threat assessment')
+    parser.add_argument('--totals', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--local', type=int, default=200, help='Intruders within a few miles of the aircraft')
+    parser.add_argument('--ticks', type=int, default=1000)
+    args = parser.parse_args()
+    benchmark(args.totals, args.local, args.ticks)
@@ -0,0 +1,112 @@
+import argparse
+import math
+import os
+import socket
+import time
+import numpy as np
+from ILS_Receiver import approach_position, find_runway, load_runways
+from Telemetry import TRAFFIC_BATCH, TRAFFIC_HEADER, TRAFFIC_MAGIC, TRAFFIC_PORT, TRAFFIC_VERSION
+from Traffic import REPORT_DTYPE
+
+# Stand-in for a traffic receiver: reports a crowd of synthetic aircraft to the PFD's traffic input.
+# Run the display with `python Primary_Flight_Display.py --approach EGLL/27R --traffic 49007`, then this script
+# with the same approach. Every aircraft is reported about once a second; the first --conflicts of them fly
+# towards where the aircraft on the approach will be in 20 to 60 seconds, the rest anywhere within --radius.
+
+def synthetic_traffic(count, conflicts, center, altitude, track, speed, radius, seed=0):
+    # Initial positions and constant velocities (north and east in NM, feet, knots, feet per minute)
+    generator = np.random.default_rng(seed)
+    distance = radius * np.sqrt(generator.uniform(0, 1, count))
+    direction = generator.uniform(0, 2 * math.pi, count)
+    north, east = distance * np.cos(direction), distance * np.sin(direction)
+    altitudes = generator.uniform(500, 15000, count)
+    tracks = generator.uniform(0, 360, count)
+    speeds = generator.uniform(100, 450, count)
+    vertical_speeds = generator.choice([0, 0, -1000, 1000], count) * generator.uniform(0.5, 1.5, count)
+
+    # Conflicts converge on the aircraft's predicted position, from any direction and within a few hundred feet
+    meet = generator.uniform(20, 60, conflicts) / 3600  # Hours
+    course = math.radians(track)
+    meet_north, meet_east = speed * math.cos(course) * meet, speed * math.sin(course) * meet
+    approach = generator.uniform(0, 2 * math.pi, conflicts)
+    speeds[:conflicts] = generator.uniform(120, 250, conflicts)
+    north[:conflicts] = meet_north - speeds[:conflicts] * meet * np.cos(approach)
+    east[:conflicts] = meet_east - speeds[:conflicts] * meet * np.sin(approach)
+    tracks[:conflicts] = np.degrees(approach) % 360
+    altitudes[:conflicts] = altitude + generator.uniform(-500, 500, conflicts)
+    vertical_speeds[:conflicts] = 0
+
+    reports = np.zeros(count, dtype=REPORT_DTYPE)
+    reports['address'] = generator.choice(np.arange(1, 1 << 24, dtype=np.uint32), count, replace=False)
+    reports['track'] = tracks
+    reports['speed'] = speeds
+    reports['vertical_speed'] = vertical_speeds
+    start = (center[0] + north / 60, center[1] + east / (60 * math.cos(math.radians(center[0]))), altitudes)
+    return reports, start
+
+def main():
+    parser = argparse.ArgumentParser(description='Send synthetic traffic reports to the PFD')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=TRAFFIC_PORT)
+    parser.add_argument('--aircraft', type=int, default=5000, help='Aircraft reported, each about once a second')
+    parser.add_argument('--conflicts', type=int, default=3, help='Aircraft converging on the approach')
+    parser.add_argument('--approach', default='EGLL/27R', help='Runway the PFD was started on with --approach, from the bundled sample')
+    parser.add_argument('--center', type=float, nargs=2, metavar=('LAT', 'LON'), help='Centre the traffic here instead of on the approach')
+    parser.add_argument('--altitude', type=float, help='Altitude of the conflicts, feet (default: the approach start)')
+    parser.add_argument('--track', type=float, help='Track of the aircraft, degrees (default: the runway course)')
+    parser.add_argument('--speed', type=float, default=155, help='True airspeed of the aircraft, knots')
+    parser.add_argument('--radius', type=float, default=200, help='NM around the centre the rest of the traffic is spread over')
+    parser.add_argument('--duration', type=float, default=0, help='Seconds to run, 0 for forever')
+    args = parser.parse_args()
+
+    runway = find_runway(load_runways(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Navigation', 'Runways.csv')), args.approach)
+    latitude, longitude, altitude = approach_position(runway, 8.0)  # Where Primary_Flight_Display.py --approach starts
+    center = tuple(args.center) if args.center else (latitude, longitude)
+    altitude = args.altitude if args.altitude is not None else altitude
+    track = args.track if args.track is not None else runway.course
+    reports, (latitudes, longitudes, altitudes) = synthetic_traffic(args.aircraft, min(args.conflicts, args.aircraft), center,
+                                                                   altitude, track, args.speed, args.radius)
+    tracks = np.radians(reports['track'].astype(float))
+    north_rate = reports['speed'] * np.cos(tracks) / 3600 / 60  # Degrees per second
+    east_rate = reports['speed'] * np.sin(tracks) / 3600 / (60 * np.cos(np.radians(latitudes)))
+    climb_rate = reports['vertical_speed'] / 60
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    batches = range(0, len(reports), TRAFFIC_BATCH)
+    period = 1 / len(batches)  # Every aircraft once a second
+    start = time.perf_counter()
+    next_send = start
+    report_time = start + 1
+    sequence = 0
+    sent = send_errors = 0
+
+    try:
+        while not args.duration or time.perf_counter() - start < args.duration:
+            for first in batches:
+                now = time.perf_counter()
+                if now < next_send:
+                    time.sleep(next_send - now)
+                next_send += period
+                elapsed = time.perf_counter() - start
+                batch = reports[first:first + TRAFFIC_BATCH]
+                batch['latitude'] = latitudes[first:first + TRAFFIC_BATCH] + north_rate[first:first + TRAFFIC_BATCH] * elapsed
+                batch['longitude'] = longitudes[first:first + TRAFFIC_BATCH] + east_rate[first:first + TRAFFIC_BATCH] * elapsed
+                batch['altitude'] = altitudes[first:first + TRAFFIC_BATCH] + climb_rate[first:first + TRAFFIC_BATCH] * elapsed
+                sequence = (sequence + 1) % 2**32
+                try:
+                    sock.sendto(TRAFFIC_HEADER.pack(TRAFFIC_MAGIC, TRAFFIC_VERSION, len(batch), sequence) + batch.tobytes(),
+                                (args.host, args.port))
+                    sent += len(batch)
+                except (BlockingIOError, ConnectionRefusedError):
+                    send_errors += 1
+            if time.perf_counter() >= report_time:
+                print(f"sent {sent} reports  send errors {send_errors}")
+                report_time += 1
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"Total: sent {sent} reports in {elapsed:.1f} s ({sent / elapsed:.0f}/s), send errors {send_errors}")
+
+if __name__ == '__main__':
+    main()